@@ -60,8 +60,10 @@ private[spark] class PythonRDD(
 
   val asJavaRDD: JavaRDD[Array[Byte]] = JavaRDD.fromRDD(this)
 
+  private val workerMetrics = PythonWorkerMetrics(sparkContext)
+
   override def compute(split: Partition, context: TaskContext): Iterator[Array[Byte]] = {
-    val runner = PythonRunner(func)
+    val runner = PythonRunner(func, workerMetrics)
     runner.compute(firstParent.iterator(split, context), split.index, context)
   }
 
@@ -208,6 +210,16 @@ private[spark] object PythonRDD extends Logging {
    *         server object that can be used to join the JVM serving thread in Python.
    */
   def toLocalIteratorAndServe[T](rdd: RDD[T], prefetchPartitions: Boolean = false): Array[Any] = {
+    toLocalIteratorAndServe(rdd, if (prefetchPartitions) 1 else 0)
+  }
+
+  /**
+   * Same as above, but collects up to `prefetchPartitions` partitions ahead of the one being
+   * served, so that at most `prefetchPartitions + 1` partitions are held by the driver.
+   */
+  def toLocalIteratorAndServe[T](rdd: RDD[T], prefetchPartitions: Int): Array[Any] = {
+    require(prefetchPartitions >= 0,
+      s"The number of partitions to prefetch must be non-negative, got $prefetchPartitions")
     val handleFunc = (sock: Socket) => {
       val out = new DataOutputStream(sock.getOutputStream)
       val in = new DataInputStream(sock.getInputStream)
@@ -222,7 +234,8 @@ private[spark] object PythonRDD extends Logging {
             (_, res: Array[Any]) => result = res,
             result)
         }
-        val prefetchIter = collectPartitionIter.buffered
+        // Jobs submitted for the next partitions, in order of index
+        val pendingPartitions = mutable.Queue.empty[FutureAction[Array[Any]]]
 
         // Write data until iteration is complete, client stops iteration, or error occurs
         var complete = false
@@ -231,13 +244,16 @@ private[spark] object PythonRDD extends Logging {
           // Read request for data, value of zero will stop iteration or non-zero to continue
           if (in.readInt() == 0) {
             complete = true
-          } else if (prefetchIter.hasNext) {
+          } else if (pendingPartitions.nonEmpty || collectPartitionIter.hasNext) {
 
             // Client requested more data, attempt to collect the next partition
-            val partitionFuture = prefetchIter.next()
-            // Cause the next job to be submitted if prefetchPartitions is enabled.
-            if (prefetchPartitions) {
-              prefetchIter.headOption
+            if (pendingPartitions.isEmpty) {
+              pendingPartitions.enqueue(collectPartitionIter.next())
+            }
+            val partitionFuture = pendingPartitions.dequeue()
+            // Cause the jobs of the partitions to prefetch to be submitted.
+            while (pendingPartitions.length < prefetchPartitions && collectPartitionIter.hasNext) {
+              pendingPartitions.enqueue(collectPartitionIter.next())
             }
             val partitionArray = ThreadUtils.awaitResult(partitionFuture, Duration.Inf)
 
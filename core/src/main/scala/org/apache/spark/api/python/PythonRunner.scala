@@ -43,6 +43,7 @@ private[spark] object PythonEvalType {
   val NON_UDF = 0
 
   val SQL_BATCHED_UDF = 100
+  val SQL_ARROW_BATCHED_UDF = 101
 
   val SQL_SCALAR_PANDAS_UDF = 200
   val SQL_GROUPED_MAP_PANDAS_UDF = 201
@@ -55,6 +56,7 @@ private[spark] object PythonEvalType {
   def toString(pythonEvalType: Int): String = pythonEvalType match {
     case NON_UDF => "NON_UDF"
     case SQL_BATCHED_UDF => "SQL_BATCHED_UDF"
+    case SQL_ARROW_BATCHED_UDF => "SQL_ARROW_BATCHED_UDF"
     case SQL_SCALAR_PANDAS_UDF => "SQL_SCALAR_PANDAS_UDF"
     case SQL_GROUPED_MAP_PANDAS_UDF => "SQL_GROUPED_MAP_PANDAS_UDF"
     case SQL_GROUPED_AGG_PANDAS_UDF => "SQL_GROUPED_AGG_PANDAS_UDF"
@@ -74,7 +76,8 @@ private[spark] object PythonEvalType {
 private[spark] abstract class BasePythonRunner[IN, OUT](
     funcs: Seq[ChainedPythonFunctions],
     evalType: Int,
-    argOffsets: Array[Array[Int]])
+    argOffsets: Array[Array[Int]],
+    workerMetrics: Map[String, AccumulatorV2[Long, Long]] = Map.empty)
   extends Logging {
 
   require(funcs.length == argOffsets.length, "argOffsets should have the same length as funcs")
@@ -83,6 +86,11 @@ private[spark] abstract class BasePythonRunner[IN, OUT](
   protected val bufferSize: Int = conf.get(BUFFER_SIZE)
   protected val authSocketTimeout = conf.get(PYTHON_AUTH_SOCKET_TIMEOUT)
   private val reuseWorker = conf.get(PYTHON_WORKER_REUSE)
+  private val commandCacheSize = conf.get(PYTHON_WORKER_COMMAND_CACHE_SIZE)
+  private val daemonPreloadModules = conf.get(PYTHON_DAEMON_PRELOAD_MODULES)
+  private val daemonPoolSize = conf.get(PYTHON_DAEMON_POOL_SIZE)
+  private val daemonThreads = conf.get(PYTHON_DAEMON_THREADS)
+  private val compressionCodec = conf.get(PYTHON_COMPRESSION_CODEC)
   protected val simplifiedTraceback: Boolean = false
 
   // All the Python functions should have the same exec, version and envvars.
@@ -104,8 +112,9 @@ private[spark] abstract class BasePythonRunner[IN, OUT](
 
   // each python worker gets an equal part of the allocation. the worker pool will grow to the
   // number of concurrent tasks, which is determined by the number of cores in this executor.
+  // a daemon which runs the tasks in threads is a single process that gets the whole allocation.
   private def getWorkerMemoryMb(mem: Option[Long], cores: Int): Option[Long] = {
-    mem.map(_ / cores)
+    if (daemonThreads > 0) mem else mem.map(_ / cores)
   }
 
   def compute(
@@ -128,12 +137,25 @@ private[spark] abstract class BasePythonRunner[IN, OUT](
       execCoresProp.foreach(envVars.put("OMP_NUM_THREADS", _))
     }
     envVars.put("SPARK_LOCAL_DIRS", localdir) // it's also used in monitor thread
+    envVars.put("PYSPARK_COMPRESSION_CODEC", compressionCodec)
     if (reuseWorker) {
       envVars.put("SPARK_REUSE_WORKER", "1")
+      if (commandCacheSize > 0) {
+        envVars.put("PYSPARK_COMMAND_CACHE_SIZE", commandCacheSize.toString)
+      }
     }
     if (simplifiedTraceback) {
       envVars.put("SPARK_SIMPLIFIED_TRACEBACK", "1")
     }
+    if (daemonPreloadModules.nonEmpty) {
+      envVars.put("PYSPARK_DAEMON_PRELOAD_MODULES", daemonPreloadModules.mkString(","))
+    }
+    if (daemonPoolSize > 0) {
+      envVars.put("PYSPARK_DAEMON_POOL_SIZE", daemonPoolSize.toString)
+    }
+    if (daemonThreads > 0) {
+      envVars.put("PYSPARK_DAEMON_THREADS", daemonThreads.toString)
+    }
     // SPARK-30299 this could be wrong with standalone mode when executor
     // cores might not be correct because it defaults to all cores on the box.
     val execCores = execCoresProp.map(_.toInt).getOrElse(conf.get(EXECUTOR_CORES))
@@ -402,6 +424,7 @@ private[spark] abstract class BasePythonRunner[IN, OUT](
         }
         dataOut.flush()
 
+        dataOut.writeBoolean(workerMetrics.nonEmpty)
         dataOut.writeInt(evalType)
         writeCommand(dataOut)
         writeIteratorToStream(dataOut)
@@ -516,6 +539,24 @@ private[spark] abstract class BasePythonRunner[IN, OUT](
       val diskBytesSpilled = stream.readLong()
       context.taskMetrics.incMemoryBytesSpilled(memoryBytesSpilled)
       context.taskMetrics.incDiskBytesSpilled(diskBytesSpilled)
+      // Batches of records the worker wrote with automatically chosen batch sizes
+      val frames = stream.readLong()
+      val records = stream.readLong()
+      val bytes = stream.readLong()
+      val minBatchSize = stream.readLong()
+      val maxBatchSize = stream.readLong()
+      if (frames > 0) {
+        logInfo(("Auto batches: frames = %s, records = %s, bytes = %s, " +
+          "records per frame = %s..%s").format(frames, records, bytes, minBatchSize, maxBatchSize))
+      }
+      Seq(frames, records, bytes).zip(PythonWorkerMetrics.autoBatchNames).foreach {
+        case (value, name) => workerMetrics.get(name).foreach(_.add(value))
+      }
+      // Time breakdown and sizes the worker measured if asked to, see PythonWorkerMetrics
+      PythonWorkerMetrics.names.foreach { name =>
+        val value = stream.readLong()
+        workerMetrics.get(name).foreach(_.add(value))
+      }
     }
 
     protected def handlePythonException(): PythonException = {
@@ -615,17 +656,68 @@ private[spark] object PythonRunner {
   // already running worker monitor threads for worker and task attempts ID pairs
   val runningMonitorThreads = ConcurrentHashMap.newKeySet[(Socket, Long)]()
 
-  def apply(func: PythonFunction): PythonRunner = {
-    new PythonRunner(Seq(ChainedPythonFunctions(Seq(func))))
+  def apply(
+      func: PythonFunction,
+      workerMetrics: Map[String, AccumulatorV2[Long, Long]] = Map.empty): PythonRunner = {
+    new PythonRunner(Seq(ChainedPythonFunctions(Seq(func))), workerMetrics)
+  }
+}
+
+/**
+ * The metrics a Python worker measures for a task when asked to by a runner which is given
+ * accumulators for them, keyed by name, with their descriptions. Times are in milliseconds.
+ */
+private[spark] object PythonWorkerMetrics {
+
+  val descriptions: Seq[(String, String)] = Seq(
+    "pythonReadTime" -> "time reading input in Python workers",
+    "pythonDeserializeTime" -> "time deserializing input in Python workers",
+    "pythonFunctionTime" -> "time in Python functions",
+    "pythonSerializeTime" -> "time serializing output in Python workers",
+    "pythonWriteTime" -> "time writing output in Python workers",
+    "pythonBytesIn" -> "bytes read by Python workers",
+    "pythonBytesOut" -> "bytes written by Python workers",
+    "pythonRecordsIn" -> "records read by Python workers",
+    "pythonRecordsOut" -> "records written by Python workers")
+
+  /** The names of the metrics, in the order the worker reports them. */
+  val names: Seq[String] = descriptions.map(_._1)
+
+  /**
+   * Frames the worker wrote with automatically chosen batch sizes, which it always reports, see
+   * AutoBatchedSerializer. Only Python RDDs write their output in such frames.
+   */
+  val autoBatchDescriptions: Seq[(String, String)] = Seq(
+    "pythonAutoBatchFrames" -> "auto-batched frames written by Python workers",
+    "pythonAutoBatchRecords" -> "records in auto-batched frames written by Python workers",
+    "pythonAutoBatchBytes" -> "bytes in auto-batched frames written by Python workers")
+
+  /** The names of the auto batching metrics, in the order the worker reports them. */
+  val autoBatchNames: Seq[String] = autoBatchDescriptions.map(_._1)
+
+  /**
+   * Registers named accumulators for the metrics, and the auto batching ones, if enabled by
+   * `spark.python.worker.metrics.enabled`. Must be called on the driver.
+   */
+  def apply(sc: SparkContext): Map[String, AccumulatorV2[Long, Long]] = {
+    if (sc.conf.get(PYTHON_WORKER_METRICS_ENABLED)) {
+      (descriptions ++ autoBatchDescriptions).map { case (name, description) =>
+        name -> (sc.longAccumulator(description): AccumulatorV2[Long, Long])
+      }.toMap
+    } else {
+      Map.empty
+    }
   }
 }
 
 /**
  * A helper class to run Python mapPartition in Spark.
  */
-private[spark] class PythonRunner(funcs: Seq[ChainedPythonFunctions])
+private[spark] class PythonRunner(
+    funcs: Seq[ChainedPythonFunctions],
+    workerMetrics: Map[String, AccumulatorV2[Long, Long]] = Map.empty)
   extends BasePythonRunner[Array[Byte], Array[Byte]](
-    funcs, PythonEvalType.NON_UDF, Array(Array(0))) {
+    funcs, PythonEvalType.NON_UDF, Array(Array(0)), workerMetrics) {
 
   protected override def newWriterThread(
       env: SparkEnv,
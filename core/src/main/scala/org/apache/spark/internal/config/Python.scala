@@ -16,6 +16,7 @@
  */
 package org.apache.spark.internal.config
 
+import java.util.Locale
 import java.util.concurrent.TimeUnit
 
 import org.apache.spark.network.util.ByteUnit
@@ -26,6 +27,56 @@ private[spark] object Python {
     .booleanConf
     .createWithDefault(true)
 
+  val PYTHON_WORKER_COMMAND_CACHE_SIZE = ConfigBuilder("spark.python.worker.commandCacheSize")
+    .doc("Number of deserialized Python functions, including UDFs, a reused Python worker " +
+      "keeps in memory, so that a function shipped again by later tasks is not unpickled " +
+      "again. Module-level state of a cached function persists across those tasks. " +
+      "0 disables the cache. Only has an effect when 'spark.python.worker.reuse' is true.")
+    .version("3.2.0")
+    .intConf
+    .checkValue(_ >= 0, "The cache size must not be negative.")
+    .createWithDefault(0)
+
+  val PYTHON_WORKER_METRICS_ENABLED = ConfigBuilder("spark.python.worker.metrics.enabled")
+    .doc("Whether Python workers measure where the time of a task goes, i.e. reading, " +
+      "deserializing, the Python function, serializing and writing, and the records and " +
+      "bytes in and out, and report them as accumulators of the stage. This costs some " +
+      "time for every record.")
+    .version("3.2.0")
+    .booleanConf
+    .createWithDefault(false)
+
+  val PYTHON_BROADCAST_MMAP_ENABLED = ConfigBuilder("spark.python.broadcast.mmap.enabled")
+    .doc("If true, Python broadcast variables are pickled with protocol 5 and the buffers of " +
+      "their values that support out-of-band pickling, e.g. NumPy arrays, are stored aligned " +
+      "after the pickled data. Python workers memory-map these buffers read-only instead of " +
+      "unpickling a private copy. Requires Python 3.8 or above.")
+    .version("3.2.0")
+    .booleanConf
+    .createWithDefault(false)
+
+  val PYTHON_AUTO_BATCH_TARGET_BYTES =
+    ConfigBuilder("spark.python.serializer.autoBatch.targetBytes")
+      .doc("Target size of the frames PySpark writes when it batches Python objects " +
+        "automatically, e.g. between Python workers and the JVM. The number of objects per " +
+        "frame is chosen from the measured serialized size of the previous objects.")
+      .version("3.2.0")
+      .bytesConf(ByteUnit.BYTE)
+      .checkValue(v => v > 0 && v <= Int.MaxValue,
+        "The target size must be positive and less than 2 GiB.")
+      .createWithDefaultString("64k")
+
+  val PYTHON_COMPRESSION_CODEC = ConfigBuilder("spark.python.compression.codec")
+    .doc("The codec used by Python workers to compress data they spill to disk, e.g. in " +
+      "groupByKey and sortByKey. Supported codecs are lz4, zstd, snappy and zlib. Codecs " +
+      "whose Python library is not installed fall back to zlib, which was always used before " +
+      "Spark 3.2.")
+    .version("3.2.0")
+    .stringConf
+    .transform(_.toLowerCase(Locale.ROOT))
+    .checkValues(Set("lz4", "zstd", "snappy", "zlib"))
+    .createWithDefault("lz4")
+
   val PYTHON_TASK_KILL_TIMEOUT = ConfigBuilder("spark.python.task.killTimeout")
     .version("2.2.2")
     .timeConf(TimeUnit.MILLISECONDS)
@@ -41,6 +92,30 @@ private[spark] object Python {
     .stringConf
     .createOptional
 
+  val PYTHON_DAEMON_PRELOAD_MODULES = ConfigBuilder("spark.python.daemon.preloadModules")
+    .doc("Comma-separated list of Python modules the PySpark daemon imports once before " +
+      "forking workers, so that workers do not import them again for every task.")
+    .version("3.2.0")
+    .stringConf
+    .toSequence
+    .createWithDefault(Nil)
+
+  val PYTHON_DAEMON_POOL_SIZE = ConfigBuilder("spark.python.daemon.poolSize")
+    .doc("Number of idle Python workers the PySpark daemon keeps forked ahead of time to " +
+      "serve new connections. 0 means workers are forked on demand.")
+    .version("3.2.0")
+    .intConf
+    .checkValue(_ >= 0, "The pool size must not be negative.")
+    .createWithDefault(0)
+
+  val PYTHON_DAEMON_THREADS = ConfigBuilder("spark.python.daemon.threads")
+    .doc("Number of threads of the PySpark daemon which run the tasks of its connections, " +
+      "instead of forking a Python worker for every connection. 0 means workers are forked.")
+    .version("3.2.0")
+    .intConf
+    .checkValue(_ >= 0, "The number of threads must not be negative.")
+    .createWithDefault(0)
+
   val PYTHON_WORKER_MODULE = ConfigBuilder("spark.python.worker.module")
     .version("2.4.0")
     .stringConf
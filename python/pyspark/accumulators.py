@@ -21,6 +21,7 @@ import struct
 import socketserver as SocketServer
 import threading
 from pyspark.serializers import read_int, PickleSerializer
+from pyspark.util import TaskLocalDict
 
 
 __all__ = ['Accumulator', 'AccumulatorParam']
@@ -29,8 +30,9 @@ __all__ = ['Accumulator', 'AccumulatorParam']
 pickleSer = PickleSerializer()
 
 # Holds accumulators registered on the current machine, keyed by ID. This is then used to send
-# the local accumulator updates back to the driver program at the end of a task.
-_accumulatorRegistry = {}
+# the local accumulator updates back to the driver program at the end of a task. Workers which
+# run tasks in concurrent threads keep one per thread.
+_accumulatorRegistry = TaskLocalDict()
 
 
 def _deserialize_accumulator(aid, zero_value, accum_param):
@@ -16,18 +16,20 @@
 # specific language governing permissions and limitations
 # under the License.
 
-from typing import Callable, Dict, Generic, Tuple, Type, TypeVar
+from typing import Callable, Generic, Tuple, Type, TypeVar
 
 import socketserver.BaseRequestHandler  # type: ignore
 
 from pyspark._typing import SupportsIAdd
 
+from pyspark.util import TaskLocalDict
+
 T = TypeVar("T")
 U = TypeVar("U", bound=SupportsIAdd)
 
 import socketserver as SocketServer
 
-_accumulatorRegistry: Dict[int, Accumulator]
+_accumulatorRegistry: TaskLocalDict
 
 class Accumulator(Generic[T]):
     aid: int
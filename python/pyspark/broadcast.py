@@ -16,22 +16,31 @@
 #
 
 import gc
+import mmap
 import os
+import struct
 import sys
 from tempfile import NamedTemporaryFile
 import threading
 import pickle
 
 from pyspark.java_gateway import local_connect_and_auth
-from pyspark.serializers import ChunkedStream, pickle_protocol
-from pyspark.util import print_exec
+from pyspark.serializers import ChunkedStream, pickle_protocol, _pickle_out_of_band
+from pyspark.util import print_exec, TaskLocalDict
 
 
 __all__ = ['Broadcast']
 
 
-# Holds broadcasted data received from Java, keyed by its id.
-_broadcastRegistry = {}
+# Holds broadcasted data received from Java, keyed by its id. Workers which run tasks in
+# concurrent threads keep one per thread.
+_broadcastRegistry = TaskLocalDict()
+
+# Starts a broadcast file which stores the buffers of the value, e.g., of NumPy arrays, out of
+# band after the pickled value, aligned, so that Python workers can memory-map them instead of
+# unpickling a private copy. A pickle of protocol 2 or higher never starts with a zero byte.
+_OUT_OF_BAND_MAGIC = b"\x00PYSPARK_OOB\x00\x00\x00\x00"
+_OUT_OF_BAND_ALIGNMENT = 64
 
 
 def _from_id(bid):
@@ -41,6 +50,19 @@ def _from_id(bid):
     return _broadcastRegistry[bid]
 
 
+class _BytesBuffer(object):
+    """
+    Pickles bytes or a bytearray as an out-of-band buffer, which is copied back into a value of
+    the same type when loaded, instead of a memoryview of the buffer.
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def __reduce_ex__(self, protocol):
+        return type(self.value), (pickle.PickleBuffer(self.value),)
+
+
 class Broadcast(object):
 
     """
@@ -82,7 +104,9 @@ class Broadcast(object):
             else:
                 # no encryption, we can just write pickled data directly to the file from python
                 broadcast_out = f
-            self.dump(value, broadcast_out)
+            out_of_band = sc._conf.get("spark.python.broadcast.mmap.enabled", "false") \
+                .lower() == "true"
+            self.dump(value, broadcast_out, out_of_band)
             if sc._encryption_enabled:
                 self._python_broadcast.waitTillDataReceived()
             self._jbroadcast = sc._jsc.broadcast(self._python_broadcast)
@@ -102,9 +126,12 @@ class Broadcast(object):
                 assert(path is not None)
                 self._path = path
 
-    def dump(self, value, f):
+    def dump(self, value, f, out_of_band=False):
         try:
-            pickle.dump(value, f, pickle_protocol)
+            if out_of_band and sys.version_info >= (3, 8):
+                self._dump_out_of_band(value, f)
+            else:
+                pickle.dump(value, f, pickle_protocol)
         except pickle.PickleError:
             raise
         except Exception as e:
@@ -114,14 +141,68 @@ class Broadcast(object):
             raise pickle.PicklingError(msg)
         f.close()
 
+    def _dump_out_of_band(self, value, f):
+        if type(value) in (bytes, bytearray):
+            # pickled in band otherwise
+            value = _BytesBuffer(value)
+        data, buffers = _pickle_out_of_band(value)
+        header = _OUT_OF_BAND_MAGIC + struct.pack(
+            "!qq%dq" % len(buffers), len(data), len(buffers), *[b.nbytes for b in buffers])
+        f.write(header)
+        f.write(data)
+        pos = len(header) + len(data)
+        for buf in buffers:
+            padding = -pos % _OUT_OF_BAND_ALIGNMENT
+            f.write(b"\x00" * padding)
+            f.write(buf)
+            pos += padding + buf.nbytes
+
+    def _load_out_of_band(self, read):
+        """
+        Load a value written by :meth:`_dump_out_of_band`, where `read(n)` returns the next `n`
+        bytes. The buffers returned by `read` back the loaded value without a copy.
+        """
+        if bytes(read(len(_OUT_OF_BAND_MAGIC))) != _OUT_OF_BAND_MAGIC:
+            raise ValueError("Invalid broadcast data with out-of-band buffers")
+        pickle_length, num_buffers = struct.unpack("!qq", read(16))
+        lengths = struct.unpack("!%dq" % num_buffers, read(8 * num_buffers))
+        data = read(pickle_length)
+        pos = len(_OUT_OF_BAND_MAGIC) + 16 + 8 * num_buffers + pickle_length
+        buffers = []
+        for length in lengths:
+            padding = -pos % _OUT_OF_BAND_ALIGNMENT
+            read(padding)
+            buffers.append(read(length))
+            pos += padding + length
+        return pickle.loads(data, buffers=buffers)
+
     def load_from_path(self, path):
         with open(path, 'rb', 1 << 20) as f:
-            return self.load(f)
+            if f.peek(1)[:1] != _OUT_OF_BAND_MAGIC[:1]:
+                return self.load(f)
+            # Map the file read-only, so that all Python workers on this host share one copy
+            # of the buffers in the page cache.
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+        pos = 0
+
+        def read(n):
+            nonlocal pos
+            pos += n
+            return view[pos - n:pos]
+
+        gc.disable()
+        try:
+            return self._load_out_of_band(read)
+        finally:
+            gc.enable()
 
     def load(self, file):
         # "file" could also be a socket
         gc.disable()
         try:
+            if file.peek(1)[:1] == _OUT_OF_BAND_MAGIC[:1]:
+                return self._load_out_of_band(file.read)
             return pickle.load(file)
         finally:
             gc.enable()
@@ -17,11 +17,13 @@
 # under the License.
 
 import threading
-from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+from typing import Any, Callable, Generic, Optional, Tuple, TypeVar
+
+from pyspark.util import TaskLocalDict
 
 T = TypeVar("T")
 
-_broadcastRegistry: Dict[int, Broadcast]
+_broadcastRegistry: TaskLocalDict
 
 class Broadcast(Generic[T]):
     def __init__(
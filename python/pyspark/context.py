@@ -43,6 +43,7 @@ from pyspark.taskcontext import TaskContext
 from pyspark.traceback_utils import CallSite, first_spark_call
 from pyspark.status import StatusTracker
 from pyspark.profiler import ProfilerCollector, BasicProfiler
+from pyspark.util import _parse_bytes  # type: ignore
 
 
 __all__ = ['SparkContext']
@@ -168,7 +169,10 @@ class SparkContext(object):
         self._batchSize = batchSize  # -1 represents an unlimited batch size
         self._unbatched_serializer = serializer
         if batchSize == 0:
-            self.serializer = AutoBatchedSerializer(self._unbatched_serializer)
+            self.serializer = AutoBatchedSerializer(
+                self._unbatched_serializer,
+                _parse_bytes(self._conf.get("spark.python.serializer.autoBatch.targetBytes",
+                                            "64k")))
         else:
             self.serializer = BatchedSerializer(self._unbatched_serializer,
                                                 batchSize)
@@ -15,6 +15,11 @@
 # limitations under the License.
 #
 
+import collections
+import functools
+import importlib
+import io
+import itertools
 import numbers
 import os
 import signal
@@ -24,12 +29,16 @@ import sys
 import traceback
 import time
 import gc
+from concurrent.futures import ThreadPoolExecutor
 from errno import EINTR, EAGAIN
-from socket import AF_INET, SOCK_STREAM, SOMAXCONN
+from multiprocessing.reduction import recvfds, sendfds
+from socket import AF_INET, AF_UNIX, SOCK_STREAM, SOMAXCONN
 from signal import SIGHUP, SIGTERM, SIGCHLD, SIG_DFL, SIG_IGN, SIGINT
 
+from pyspark.util import _isolate_tasks, _reset_task_local  # type: ignore
 from pyspark.worker import main as worker_main
-from pyspark.serializers import read_int, write_int, write_with_length, UTF8Deserializer
+from pyspark.serializers import read_int, write_int, write_with_length, UTF8Deserializer, \
+    FrameReader, VectoredWriter
 
 
 def compute_real_exit_code(exit_code):
@@ -50,13 +59,21 @@ def worker(sock, authenticated):
     # restore the handler for SIGINT,
     # it's useful for debugging (show the stacktrace before exit)
     signal.signal(SIGINT, signal.default_int_handler)
+    return serve(sock, authenticated)
 
-    # Read the socket using fdopen instead of socket.makefile() because the latter
-    # seems to be very slow; note that we need to dup() the file descriptor because
-    # otherwise writes also cause a seek that makes us miss data on the read side.
+
+def serve(sock, authenticated):
+    """
+    Authenticates the connection unless already done and runs one task on it.
+    """
+    # Read the socket using file objects over the file descriptor instead of socket.makefile()
+    # because the latter seems to be very slow; note that we need to dup() the file descriptor
+    # because otherwise writes also cause a seek that makes us miss data on the read side.
+    # The reader reuses one buffer for small frames and the writer sends the header and the
+    # payload of large frames in a single writev() call.
     buffer_size = int(os.environ.get("SPARK_BUFFER_SIZE", 65536))
-    infile = os.fdopen(os.dup(sock.fileno()), "rb", buffer_size)
-    outfile = os.fdopen(os.dup(sock.fileno()), "wb", buffer_size)
+    infile = FrameReader(io.FileIO(os.dup(sock.fileno()), "rb"), buffer_size)
+    outfile = VectoredWriter(os.dup(sock.fileno()), buffer_size)
 
     if not authenticated:
         client_secret = UTF8Deserializer().loads(infile)
@@ -82,10 +99,107 @@ def worker(sock, authenticated):
     return exit_code
 
 
+def run_worker(sock, reuse):
+    """
+    Called by a worker process once it owns a connection from the JVM: acknowledges the fork
+    and serves tasks on the connection until it is closed. Never returns.
+    """
+    # It should close the standard input in the child process so that
+    # Python native function executions stay intact.
+    #
+    # Note that if we just close the standard input (file descriptor 0),
+    # the lowest file descriptor (file descriptor 0) will be allocated,
+    # later when other file descriptors should happen to open.
+    #
+    # Therefore, here we redirects it to '/dev/null' by duplicating
+    # another file descriptor for '/dev/null' to the standard input (0).
+    # See SPARK-26175.
+    devnull = open(os.devnull, 'r')
+    os.dup2(devnull.fileno(), 0)
+    devnull.close()
+
+    try:
+        # Acknowledge that the fork was successful
+        outfile = sock.makefile(mode="wb")
+        write_int(os.getpid(), outfile)
+        outfile.flush()
+        outfile.close()
+        authenticated = False
+        while True:
+            code = worker(sock, authenticated)
+            if code == 0:
+                authenticated = True
+            if not reuse or code:
+                # wait for closing
+                try:
+                    while sock.recv(1024):
+                        pass
+                except Exception:
+                    pass
+                break
+            gc.collect()
+    except:
+        traceback.print_exc()
+        os._exit(1)
+    else:
+        os._exit(0)
+
+
+def run_worker_thread(sock, reuse, on_exit):
+    """
+    Called in a worker thread of the daemon, which runs tasks in threads, for a connection from
+    the JVM which was acknowledged already: serves tasks on the connection until it is closed.
+    """
+    _reset_task_local()
+    try:
+        authenticated = False
+        while True:
+            code = serve(sock, authenticated)
+            if code == 0:
+                authenticated = True
+            if not reuse or code:
+                # wait for closing
+                try:
+                    while sock.recv(1024):
+                        pass
+                except Exception:
+                    pass
+                break
+    except (EOFError, OSError):
+        pass  # the connection was shut down to kill the task
+    except Exception:
+        traceback.print_exc()
+    finally:
+        _reset_task_local()
+        on_exit()
+        sock.close()
+
+
+def preload_modules(names):
+    """
+    Import the given comma separated modules in the daemon, so that forked workers share them
+    instead of importing them for every task.
+    """
+    for name in names.split(","):
+        name = name.strip()
+        if name:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                print("Failed to preload module %s in the PySpark daemon:" % name,
+                      file=sys.stderr)
+                traceback.print_exc()
+
+
 def manager():
     # Create a new process group to corral our children
     os.setpgid(0, 0)
 
+    # Run the tasks in threads of the daemon instead of forked workers. The connections are
+    # acknowledged with ids of our own instead of pids, and the JVM kills a task by asking us
+    # to shut its connection down, which stops the task once it reads or writes the connection.
+    threads = int(os.environ.get("PYSPARK_DAEMON_THREADS", "0"))
+
     # Create a listening socket on the AF_INET loopback interface
     listen_sock = socket.socket(AF_INET, SOCK_STREAM)
     listen_sock.bind(('127.0.0.1', 0))
@@ -102,6 +216,9 @@ def manager():
         signal.signal(SIGTERM, SIG_DFL)
         # Send SIGHUP to notify workers of shutdown
         os.kill(0, SIGHUP)
+        if threads > 0:
+            # Do not wait for the tasks still running in threads.
+            os._exit(code)
         sys.exit(code)
 
     def handle_sigterm(*args):
@@ -112,6 +229,68 @@ def manager():
 
     reuse = os.environ.get("SPARK_REUSE_WORKER")
 
+    preload_modules(os.environ.get("PYSPARK_DAEMON_PRELOAD_MODULES", ""))
+
+    if threads > 0:
+        _isolate_tasks()
+        executor = ThreadPoolExecutor(threads, thread_name_prefix="pyspark-worker")
+        connection_ids = itertools.count(1)
+        connections = {}
+
+    # Workers forked ahead of time which wait for the daemon to hand them an accepted
+    # connection, as (pid, socket to send the connection's file descriptor over).
+    pool_size = int(os.environ.get("PYSPARK_DAEMON_POOL_SIZE", "0")) if threads <= 0 else 0
+    idle_workers = collections.deque()
+
+    def fork_idle_worker():
+        parent_sock, child_sock = socket.socketpair(AF_UNIX, SOCK_STREAM)
+        try:
+            pid = os.fork()
+        except OSError:
+            # Connections fall back to forking on demand until the pool is refilled.
+            parent_sock.close()
+            child_sock.close()
+            return False
+
+        if pid == 0:
+            # in child process
+            listen_sock.close()
+            parent_sock.close()
+            for _, s in idle_workers:
+                s.close()
+            # Do not run the daemon's handlers while idle, and die with the daemon.
+            signal.signal(SIGHUP, SIG_DFL)
+            signal.signal(SIGCHLD, SIG_DFL)
+            signal.signal(SIGTERM, SIG_DFL)
+            try:
+                fds = recvfds(child_sock, 1)
+            except (EOFError, OSError):
+                os._exit(0)
+            child_sock.close()
+            run_worker(socket.socket(AF_INET, SOCK_STREAM, fileno=fds[0]), reuse)
+        else:
+            child_sock.close()
+            idle_workers.append((pid, parent_sock))
+            return True
+
+    def hand_over(sock):
+        while idle_workers:
+            _, parent_sock = idle_workers.popleft()
+            try:
+                sendfds(parent_sock, [sock.fileno()])
+                return True
+            except OSError:
+                pass  # the idle worker died, try the next one
+            finally:
+                parent_sock.close()
+        return False
+
+    def fill_pool():
+        while len(idle_workers) < pool_size and fork_idle_worker():
+            pass
+
+    fill_pool()
+
     # Initialization complete
     try:
         while True:
@@ -129,10 +308,18 @@ def manager():
                 except EOFError:
                     # Spark told us to exit by closing stdin
                     shutdown(0)
-                try:
-                    os.kill(worker_pid, signal.SIGKILL)
-                except OSError:
-                    pass  # process already died
+                if threads > 0:
+                    sock = connections.get(worker_pid)
+                    if sock is not None:
+                        try:
+                            sock.shutdown(socket.SHUT_RDWR)
+                        except OSError:
+                            pass  # connection already closed
+                else:
+                    try:
+                        os.kill(worker_pid, signal.SIGKILL)
+                    except OSError:
+                        pass  # process already died
 
             if listen_sock in ready_fds:
                 try:
@@ -142,66 +329,49 @@ def manager():
                         continue
                     raise
 
-                # Launch a worker process
-                try:
-                    pid = os.fork()
-                except OSError as e:
-                    if e.errno in (EAGAIN, EINTR):
-                        time.sleep(1)
-                        pid = os.fork()  # error here will shutdown daemon
+                if threads > 0:
+                    connection_id = next(connection_ids)
+                    outfile = sock.makefile(mode='wb')
+                    write_int(connection_id, outfile)
+                    outfile.flush()
+                    outfile.close()
+                    connections[connection_id] = sock
+                    executor.submit(
+                        run_worker_thread, sock, reuse,
+                        functools.partial(connections.pop, connection_id, None))
+                elif hand_over(sock):
+                    sock.close()
+                else:
+                    # Launch a worker process
+                    try:
+                        pid = os.fork()
+                    except OSError as e:
+                        if e.errno in (EAGAIN, EINTR):
+                            time.sleep(1)
+                            pid = os.fork()  # error here will shutdown daemon
+                        else:
+                            outfile = sock.makefile(mode='wb')
+                            write_int(e.errno, outfile)  # Signal that the fork failed
+                            outfile.flush()
+                            outfile.close()
+                            sock.close()
+                            continue
+
+                    if pid == 0:
+                        # in child process
+                        listen_sock.close()
+                        for _, s in idle_workers:
+                            s.close()
+                        run_worker(sock, reuse)
                     else:
-                        outfile = sock.makefile(mode='wb')
-                        write_int(e.errno, outfile)  # Signal that the fork failed
-                        outfile.flush()
-                        outfile.close()
                         sock.close()
-                        continue
-
-                if pid == 0:
-                    # in child process
-                    listen_sock.close()
-
-                    # It should close the standard input in the child process so that
-                    # Python native function executions stay intact.
-                    #
-                    # Note that if we just close the standard input (file descriptor 0),
-                    # the lowest file descriptor (file descriptor 0) will be allocated,
-                    # later when other file descriptors should happen to open.
-                    #
-                    # Therefore, here we redirects it to '/dev/null' by duplicating
-                    # another file descriptor for '/dev/null' to the standard input (0).
-                    # See SPARK-26175.
-                    devnull = open(os.devnull, 'r')
-                    os.dup2(devnull.fileno(), 0)
-                    devnull.close()
 
-                    try:
-                        # Acknowledge that the fork was successful
-                        outfile = sock.makefile(mode="wb")
-                        write_int(os.getpid(), outfile)
-                        outfile.flush()
-                        outfile.close()
-                        authenticated = False
-                        while True:
-                            code = worker(sock, authenticated)
-                            if code == 0:
-                                authenticated = True
-                            if not reuse or code:
-                                # wait for closing
-                                try:
-                                    while sock.recv(1024):
-                                        pass
-                                except Exception:
-                                    pass
-                                break
-                            gc.collect()
-                    except:
-                        traceback.print_exc()
-                        os._exit(1)
-                    else:
-                        os._exit(0)
-                else:
-                    sock.close()
+            # Refill the pool only while no connection is waiting, so that a burst of connections
+            # is served by the idle workers without waiting for forks. This also retries forks
+            # that failed earlier.
+            if len(idle_workers) < pool_size and \
+                    listen_sock not in select.select([listen_sock], [], [], 0)[0]:
+                fill_pool()
 
     finally:
         shutdown(1)
@@ -20,12 +20,14 @@ import sys
 import os
 import operator
 import shlex
+import struct
 import warnings
 import heapq
 import bisect
 import random
+import weakref
 from subprocess import Popen, PIPE
-from threading import Thread
+from threading import Lock, Thread
 from collections import defaultdict
 from itertools import chain
 from functools import reduce
@@ -34,17 +36,18 @@ from math import sqrt, log, isinf, isnan, pow, ceil
 from pyspark.java_gateway import local_connect_and_auth
 from pyspark.serializers import AutoBatchedSerializer, BatchedSerializer, NoOpSerializer, \
     CartesianDeserializer, CloudPickleSerializer, PairDeserializer, PickleSerializer, \
-    pack_long, read_int, write_int
+    pack_long, read_int, write_int, SpecialLengths
 from pyspark.join import python_join, python_left_outer_join, \
     python_right_outer_join, python_full_outer_join, python_cogroup
-from pyspark.statcounter import StatCounter
-from pyspark.rddsampler import RDDSampler, RDDRangeSampler, RDDStratifiedSampler
+from pyspark.statcounter import StatCounter, _bucket_counts, _chunks, _float_array
+from pyspark.rddsampler import RDDSampler, RDDRangeSampler, RDDReservoirSampler, \
+    RDDStratifiedSampler
 from pyspark.storagelevel import StorageLevel
 from pyspark.resource.requests import ExecutorResourceRequests, TaskResourceRequests
 from pyspark.resource.profile import ResourceProfile
 from pyspark.resultiterable import ResultIterable
 from pyspark.shuffle import Aggregator, ExternalMerger, \
-    get_used_memory, ExternalSorter, ExternalGroupBy
+    ExternalSorter, ExternalGroupBy, _identity, _partition_frames, _combine_locally
 from pyspark.traceback_utils import SCCallSiteSync
 from pyspark.util import fail_on_stopiteration, _parse_memory
 
@@ -62,6 +65,7 @@ class PythonEvalType(object):
     NON_UDF = 0
 
     SQL_BATCHED_UDF = 100
+    SQL_ARROW_BATCHED_UDF = 101
 
     SQL_SCALAR_PANDAS_UDF = 200
     SQL_GROUPED_MAP_PANDAS_UDF = 201
@@ -214,6 +218,147 @@ def _local_iterator_from_socket(sock_info, serializer):
     return iter(PyLocalIterable(sock_info, serializer))
 
 
+def _range_bounds(candidates, numPartitions):
+    """
+    Choose the bounds of at most `numPartitions` ranges from weighted (key, weight) samples,
+    such that the ranges have about the same total weight. A key is used as a bound at most
+    once, so there are fewer ranges when the samples are skewed.
+
+    Examples
+    --------
+    >>> _range_bounds([(k, 1.0) for k in range(10)], 3)
+    [3, 6]
+    >>> _range_bounds([(0, 1.0)] * 9 + [(1, 1.0)], 4)
+    [0, 1]
+    """
+    ordered = sorted(candidates, key=operator.itemgetter(0))
+    step = sum(weight for _, weight in ordered) / numPartitions
+    bounds, cumWeight, target = [], 0.0, step
+    for key, weight in ordered:
+        cumWeight += weight
+        if cumWeight >= target:
+            if not bounds or key > bounds[-1]:
+                bounds.append(key)
+                target += step
+                if len(bounds) == numPartitions - 1:
+                    break
+    return bounds
+
+
+def _prune_counts(counts, capacity):
+    """
+    Keep at most `capacity` counts, subtracting the (capacity + 1)-th largest count from all of
+    them, like the mergeable Misra-Gries summary. The counts are underestimated by at most the
+    total count divided by (capacity + 1).
+
+    Examples
+    --------
+    >>> sorted(_prune_counts({'a': 5, 'b': 3, 'c': 1, 'd': 1}, 2).items())
+    [('a', 4), ('b', 2)]
+    """
+    if len(counts) <= capacity:
+        return counts
+    threshold = heapq.nlargest(capacity + 1, counts.values())[-1]
+    pruned = defaultdict(int)
+    for k, c in counts.items():
+        if c > threshold:
+            pruned[k] = c - threshold
+    return pruned
+
+
+# idle processes of RDD.pipe with reuseProcess, by command, environment and buffer size
+_idle_pipes = defaultdict(list)
+_idle_pipes_lock = Lock()
+
+
+def _pipe_frames(iterator, command, env, checkCode=False, bufferSize=1 << 16, reuse=False):
+    """
+    Pipe byte strings to an external process, each one prefixed by its length as a 4-byte
+    big-endian int, and return an iterator of the byte strings it outputs in the same framing.
+
+    With `reuse`, the process is kept for the next partitions piped to the same command in this
+    Python worker: the end of a partition is written as a length of -1, and the process must
+    write its own -1 after the output for the partition.
+    """
+    key = (command, tuple(sorted(env.items())), bufferSize)
+    pipe = None
+    if reuse:
+        with _idle_pipes_lock:
+            while _idle_pipes[key] and pipe is None:
+                pipe = _idle_pipes[key].pop()
+                if pipe.poll() is not None:
+                    pipe = None
+    if pipe is None:
+        pipe = Popen(shlex.split(command), env=env, stdin=PIPE, stdout=PIPE, bufsize=bufferSize)
+    errors = []
+
+    def pipe_frames(out):
+        pack, write = struct.Struct("!i").pack, out.write
+        try:
+            for obj in iterator:
+                # one buffered write per small record
+                if len(obj) < bufferSize:
+                    write(pack(len(obj)) + obj)
+                else:
+                    write(pack(len(obj)))
+                    write(obj)
+            if reuse:
+                write_int(SpecialLengths.END_OF_DATA_SECTION, out)
+                out.flush()
+                return
+        except Exception as e:
+            errors.append(e)
+        # the process exits at the end of its input
+        try:
+            out.close()
+        except Exception:
+            pass
+    Thread(target=pipe_frames, args=[pipe.stdin]).start()
+
+    def read_frames():
+        unpack, read = struct.Struct("!i").unpack, pipe.stdout.read
+        try:
+            while True:
+                header = read(4)
+                if not header:
+                    break
+                if len(header) < 4:
+                    raise RuntimeError("Pipe function `%s' wrote a truncated frame length"
+                                       % command)
+                length, = unpack(header)
+                if length == SpecialLengths.END_OF_DATA_SECTION and reuse:
+                    release.detach()
+                    with _idle_pipes_lock:
+                        _idle_pipes[key].append(pipe)
+                    return
+                obj = read(length)
+                if len(obj) < length:
+                    raise RuntimeError("Pipe function `%s' wrote a truncated frame of %d bytes "
+                                       "out of %d" % (command, len(obj), length))
+                yield obj
+            pipe.wait()
+            if errors:
+                raise errors[0]
+            if checkCode and pipe.returncode or reuse:
+                raise RuntimeError("Pipe function `%s' exited "
+                                   "with error code %d" % (command, pipe.returncode))
+        finally:
+            release()
+
+    frames = read_frames()
+    # kills the process unless it is returned to the idle ones, also if the iterator is
+    # dropped before its end, or before it is started
+    release = weakref.finalize(frames, _close_pipe, pipe)
+    return frames
+
+
+def _close_pipe(pipe):
+    if pipe.poll() is None:
+        pipe.kill()
+        pipe.wait()
+    pipe.stdout.close()
+
+
 class Partitioner(object):
     def __init__(self, numPartitions, partitionFunc):
         self.numPartitions = numPartitions
@@ -775,19 +920,33 @@ class RDD(object):
 
         # first compute the boundary of each part via sampling: we want to partition
         # the key-space into bins such that the bins have roughly the same
-        # number of (key, value) pairs falling into them
-        rddSize = self.count()
+        # number of (key, value) pairs falling into them. Like Spark's RangePartitioner,
+        # sketch each partition with a reservoir sample in a single pass which also
+        # counts it, and only sample again the partitions with too many items for it.
+        sampleSize = min(20.0 * numPartitions, 1e6)
+        sampleSizePerPartition = int(ceil(3.0 * sampleSize / max(self.getNumPartitions(), 1)))
+        keys = self.map(lambda kv: keyfunc(kv[0]))
+        sketch = keys.mapPartitionsWithIndex(
+            RDDReservoirSampler(sampleSizePerPartition, 1).func).collect()
+        rddSize = sum(count for _, count, _ in sketch)
         if not rddSize:
             return self  # empty RDD
-        maxSampleSize = numPartitions * 20.0  # constant from Spark's RangePartitioner
-        fraction = min(maxSampleSize / max(rddSize, 1), 1.0)
-        samples = self.sample(False, fraction, 1).map(lambda kv: kv[0]).collect()
-        samples = sorted(samples, key=keyfunc)
+        fraction = min(sampleSize / rddSize, 1.0)
+        candidates, imbalanced = [], []
+        for split, count, sample in sketch:
+            if fraction * count > sampleSizePerPartition:
+                imbalanced.append(split)
+            elif sample:
+                weight = count / len(sample)
+                candidates.extend((key, weight) for key in sample)
+        if imbalanced:
+            sampled = keys.mapPartitionsWithIndex(RDDSampler(False, fraction, 1).func)
+            weight = 1.0 / fraction
+            candidates.extend((key, weight) for key in self.ctx.runJob(sampled, iter, imbalanced))
 
         # we have numPartitions many parts but one of the them has
         # an implicit boundary
-        bounds = [samples[int(len(samples) * (i + 1) / numPartitions)]
-                  for i in range(0, numPartitions - 1)]
+        bounds = _range_bounds(candidates, numPartitions)
 
         def rangePartitioner(k):
             p = bisect.bisect_left(bounds, keyfunc(k))
@@ -857,10 +1016,14 @@ class RDD(object):
         """
         return self.map(lambda x: (f(x), x)).groupByKey(numPartitions, partitionFunc)
 
-    def pipe(self, command, env=None, checkCode=False):
+    def pipe(self, command, env=None, checkCode=False, binary=False, bufferSize=1 << 16,
+             reuseProcess=False):
         """
         Return an RDD created by piping elements to a forked external process.
 
+        .. versionchanged:: 3.2.0
+           Added the `binary`, `bufferSize` and `reuseProcess` parameters.
+
         Parameters
         ----------
         command : str
@@ -869,18 +1032,42 @@ class RDD(object):
             environment variables to set.
         checkCode : bool, optional
             whether or not to check the return value of the shell command.
+        binary : bool, optional
+            whether the elements are byte strings, written to the process each
+            prefixed by its length as a 4-byte big-endian int, instead of lines of
+            text. The process must output its records in the same framing.
+        bufferSize : int, optional
+            size of the buffers of the pipes to and from the process, in bytes.
+        reuseProcess : bool, optional
+            whether to keep the process for the next partitions piped to the same
+            command by the same Python worker, when `binary` is True. The end of
+            a partition is then written as a length of -1, and the process must
+            write its own -1 once it has output all the records for it.
 
         Examples
         --------
         >>> sc.parallelize(['1', '2', '', '3']).pipe('cat').collect()
         ['1', '2', '', '3']
+        >>> sc.parallelize([b'1', b'2 2', b'', b'3'], 2).pipe('cat', binary=True).collect()
+        [b'1', b'2 2', b'', b'3']
+        >>> rdd = sc.parallelize([b'1', b'2', b'3'], 3)
+        >>> rdd.pipe('cat', binary=True, reuseProcess=True).collect()
+        [b'1', b'2', b'3']
         """
         if env is None:
             env = dict()
 
+        if reuseProcess and not binary:
+            raise ValueError("reuseProcess is only supported with binary=True")
+
+        if binary:
+            def func(iterator):
+                return _pipe_frames(iterator, command, env, checkCode, bufferSize, reuseProcess)
+            return self.mapPartitions(func)
+
         def func(iterator):
             pipe = Popen(
-                shlex.split(command), env=env, stdin=PIPE, stdout=PIPE)
+                shlex.split(command), env=env, stdin=PIPE, stdout=PIPE, bufsize=bufferSize)
 
             def pipe_objs(out):
                 for obj in iterator:
@@ -1358,14 +1545,23 @@ class RDD(object):
         else:
             raise TypeError("buckets should be a list or tuple or number(int or long)")
 
+        # count numbers with NumPy, chunk by chunk, when buckets are numbers too
+        bounds = _float_array(list(buckets), exact=True)
+
         def histogram(iterator):
             counters = [0] * len(buckets)
-            for i in iterator:
-                if i is None or (type(i) is float and isnan(i)) or i > maxv or i < minv:
+            for chunk in _chunks(iterator):
+                values = _float_array(chunk, exact=True) if bounds is not None else None
+                if values is not None:
+                    counts = _bucket_counts(values, bounds, minv, maxv, inc if even else None)
+                    counters = [c + n for c, n in zip(counters, counts)]
                     continue
-                t = (int((i - minv) / inc) if even
-                     else bisect.bisect_right(buckets, i) - 1)
-                counters[t] += 1
+                for i in chunk:
+                    if i is None or (type(i) is float and isnan(i)) or i > maxv or i < minv:
+                        continue
+                    t = (int((i - minv) / inc) if even
+                         else bisect.bisect_right(buckets, i) - 1)
+                    counters[t] += 1
             # add last two together
             last = counters.pop()
             counters[-1] += last
@@ -1434,27 +1630,55 @@ class RDD(object):
         """
         return self.stats().sampleVariance()
 
-    def countByValue(self):
+    def countByValue(self, depth=1, capacity=None):
         """
         Return the count of each unique value in this RDD as a dictionary of
         (value, count) pairs.
 
+        .. versionchanged:: 3.2.0
+           Added the `depth` and `capacity` parameters.
+
+        Parameters
+        ----------
+        depth : int, optional
+            suggested depth of the tree the counts of the partitions are merged
+            in, as in :meth:`treeAggregate` (default: 1, merged by the driver)
+        capacity : int, optional
+            if given, keep the counts of at most `capacity` values at once, to
+            find the most frequent ones in bounded memory. All the values which
+            are more than 1 / (capacity + 1) of the elements are returned, with
+            counts which may be lower by up to that many elements.
+
         Examples
         --------
         >>> sorted(sc.parallelize([1, 2, 1, 2, 2], 2).countByValue().items())
         [(1, 2), (2, 3)]
+        >>> rdd = sc.parallelize([1] * 50 + [2] * 30 + list(range(3, 23)), 4)
+        >>> sorted(rdd.countByValue(depth=2, capacity=4))
+        [1, 2]
         """
+        if capacity is not None and capacity < 1:
+            raise ValueError("Capacity cannot be smaller than 1 but got %d." % capacity)
+
         def countPartition(iterator):
             counts = defaultdict(int)
-            for obj in iterator:
-                counts[obj] += 1
+            if capacity is None:
+                for obj in iterator:
+                    counts[obj] += 1
+            else:
+                # prune when there are twice as many counts as kept, for amortized O(1) updates
+                for obj in iterator:
+                    counts[obj] += 1
+                    if len(counts) > 2 * capacity:
+                        counts = _prune_counts(counts, capacity)
+                counts = _prune_counts(counts, capacity)
             yield counts
 
         def mergeMaps(m1, m2):
             for k, v in m2.items():
                 m1[k] += v
-            return m1
-        return self.mapPartitions(countPartition).reduce(mergeMaps)
+            return m1 if capacity is None else _prune_counts(m1, capacity)
+        return self.mapPartitions(countPartition).treeReduce(mergeMaps, depth)
 
     def top(self, num, key=None):
         """
@@ -1890,15 +2114,20 @@ class RDD(object):
         >>> sorted(rdd.reduceByKey(add).collect())
         [('a', 2), ('b', 1)]
         """
-        return self.combineByKey(lambda x: x, func, func, numPartitions, partitionFunc)
+        return self.combineByKey(_identity, func, func, numPartitions, partitionFunc)
 
-    def reduceByKeyLocally(self, func):
+    def reduceByKeyLocally(self, func, depth=1):
         """
         Merge the values for each key using an associative and commutative reduce function, but
         return the results immediately to the master as a dictionary.
 
         This will also perform the merging locally on each mapper before
         sending results to a reducer, similarly to a "combiner" in MapReduce.
+        The results of the mappers are merged in a tree of suggested `depth`,
+        as in :meth:`treeAggregate`.
+
+        .. versionchanged:: 3.2.0
+           Added the `depth` parameter.
 
         Examples
         --------
@@ -1919,12 +2148,15 @@ class RDD(object):
             for k, v in m2.items():
                 m1[k] = func(m1[k], v) if k in m1 else v
             return m1
-        return self.mapPartitions(reducePartition).reduce(mergeMaps)
+        return self.mapPartitions(reducePartition).treeReduce(mergeMaps, depth)
 
-    def countByKey(self):
+    def countByKey(self, depth=1, capacity=None):
         """
         Count the number of elements for each key, and return the result to the
-        master as a dictionary.
+        master as a dictionary. See :meth:`countByValue` for `depth` and `capacity`.
+
+        .. versionchanged:: 3.2.0
+           Added the `depth` and `capacity` parameters.
 
         Examples
         --------
@@ -1932,7 +2164,7 @@ class RDD(object):
         >>> sorted(rdd.countByKey().items())
         [('a', 2), ('b', 1)]
         """
-        return self.map(lambda x: x[0]).countByValue()
+        return self.map(lambda x: x[0]).countByValue(depth, capacity)
 
     def join(self, other, numPartitions=None):
         """
@@ -2045,36 +2277,11 @@ class RDD(object):
         limit = (self._memory_limit() / 2)
 
         def add_shuffle_key(split, iterator):
-
-            buckets = defaultdict(list)
-            c, batch = 0, min(10 * numPartitions, 1000)
-
-            for k, v in iterator:
-                buckets[partitionFunc(k) % numPartitions].append((k, v))
-                c += 1
-
-                # check used memory and avg size of chunk of objects
-                if (c % 1000 == 0 and get_used_memory() > limit
-                        or c > batch):
-                    n, size = len(buckets), 0
-                    for split in list(buckets.keys()):
-                        yield pack_long(split)
-                        d = outputSerializer.dumps(buckets[split])
-                        del buckets[split]
-                        yield d
-                        size += len(d)
-
-                    avg = int(size / n) >> 20
-                    # let 1M < avg < 10M
-                    if avg < 1:
-                        batch = min(sys.maxsize, batch * 1.5)
-                    elif avg > 10:
-                        batch = max(int(batch / 1.5), 1)
-                    c = 0
-
-            for split, items in buckets.items():
+            frames = _partition_frames(iterator, numPartitions, partitionFunc,
+                                       outputSerializer, limit)
+            for split, frame in frames:
                 yield pack_long(split)
-                yield outputSerializer.dumps(items)
+                yield frame
 
         keyed = self.mapPartitionsWithIndex(add_shuffle_key, preservesPartitioning=True)
         keyed._bypass_serializer = True
@@ -2088,9 +2295,8 @@ class RDD(object):
         rdd.partitioner = partitioner
         return rdd
 
-    # TODO: add control over map-side aggregation
     def combineByKey(self, createCombiner, mergeValue, mergeCombiners,
-                     numPartitions=None, partitionFunc=portable_hash):
+                     numPartitions=None, partitionFunc=portable_hash, mapSideCombine=None):
         """
         Generic function to combine the elements for each key using a custom
         set of aggregation functions.
@@ -2110,7 +2316,14 @@ class RDD(object):
         To avoid memory allocation, both mergeValue and mergeCombiners are allowed to
         modify and return their first argument instead of creating a new C.
 
-        In addition, users can control the partitioning of the output RDD.
+        In addition, users can control the partitioning of the output RDD, and
+        whether the values are combined within each partition before the shuffle
+        with `mapSideCombine`. By default, they are only if the first keys of the
+        partition are not nearly all distinct, as combining unique keys reduces
+        nothing.
+
+        .. versionchanged:: 3.2.0
+           Added the `mapSideCombine` parameter.
 
         Notes
         -----
@@ -2142,9 +2355,7 @@ class RDD(object):
         agg = Aggregator(createCombiner, mergeValue, mergeCombiners)
 
         def combineLocally(iterator):
-            merger = ExternalMerger(agg, memory * 0.9, serializer)
-            merger.mergeValues(iterator)
-            return merger.items()
+            return _combine_locally(iterator, agg, memory * 0.9, serializer, mapSideCombine)
 
         locally_combined = self.mapPartitions(combineLocally, preservesPartitioning=True)
         shuffled = locally_combined.partitionBy(numPartitions, partitionFunc)
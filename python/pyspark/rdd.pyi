@@ -76,6 +76,7 @@ def portable_hash(x: Hashable) -> int: ...
 class PythonEvalType:
     NON_UDF: Literal[0]
     SQL_BATCHED_UDF: Literal[100]
+    SQL_ARROW_BATCHED_UDF: Literal[101]
     SQL_SCALAR_PANDAS_UDF: PandasScalarUDFType
     SQL_GROUPED_MAP_PANDAS_UDF: PandasGroupedMapUDFType
     SQL_GROUPED_AGG_PANDAS_UDF: PandasGroupedAggUDFType
@@ -212,9 +213,26 @@ class RDD(Generic[T]):
         numPartitions: Optional[int] = ...,
         partitionFunc: Callable[[K], int] = ...,
     ) -> RDD[Tuple[K, Iterable[T]]]: ...
+    @overload
     def pipe(
-        self, command: str, env: Optional[Dict[str, str]] = ..., checkCode: bool = ...
+        self,
+        command: str,
+        env: Optional[Dict[str, str]] = ...,
+        checkCode: bool = ...,
+        binary: Literal[False] = ...,
+        bufferSize: int = ...,
     ) -> RDD[str]: ...
+    @overload
+    def pipe(
+        self: RDD[bytes],
+        command: str,
+        env: Optional[Dict[str, str]] = ...,
+        checkCode: bool = ...,
+        *,
+        binary: Literal[True],
+        bufferSize: int = ...,
+        reuseProcess: bool = ...,
+    ) -> RDD[bytes]: ...
     def foreach(self, f: Callable[[T], None]) -> None: ...
     def foreachPartition(self, f: Callable[[Iterable[T]], None]) -> None: ...
     def collect(self) -> List[T]: ...
@@ -251,7 +269,9 @@ class RDD(Generic[T]):
     def stdev(self: RDD[NumberOrArray]) -> NumberOrArray: ...
     def sampleStdev(self: RDD[NumberOrArray]) -> NumberOrArray: ...
     def sampleVariance(self: RDD[NumberOrArray]) -> NumberOrArray: ...
-    def countByValue(self: RDD[K]) -> Dict[K, int]: ...
+    def countByValue(
+        self: RDD[K], depth: int = ..., capacity: Optional[int] = ...
+    ) -> Dict[K, int]: ...
     @overload
     def top(self: RDD[O], num: int) -> List[O]: ...
     @overload
@@ -313,9 +333,11 @@ class RDD(Generic[T]):
         partitionFunc: Callable[[K], int] = ...,
     ) -> RDD[Tuple[K, V]]: ...
     def reduceByKeyLocally(
-        self: RDD[Tuple[K, V]], func: Callable[[V, V], V]
+        self: RDD[Tuple[K, V]], func: Callable[[V, V], V], depth: int = ...
     ) -> Dict[K, V]: ...
-    def countByKey(self: RDD[Tuple[K, V]]) -> Dict[K, int]: ...
+    def countByKey(
+        self: RDD[Tuple[K, V]], depth: int = ..., capacity: Optional[int] = ...
+    ) -> Dict[K, int]: ...
     def join(
         self: RDD[Tuple[K, V]],
         other: RDD[Tuple[K, U]],
@@ -348,6 +370,7 @@ class RDD(Generic[T]):
         mergeCombiners: Callable[[U, U], U],
         numPartitions: Optional[int] = ...,
         partitionFunc: Callable[[K], int] = ...,
+        mapSideCombine: Optional[bool] = ...,
     ) -> RDD[Tuple[K, U]]: ...
     def aggregateByKey(
         self: RDD[Tuple[K, V]],
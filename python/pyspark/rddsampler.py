@@ -18,6 +18,8 @@
 import sys
 import random
 import math
+from collections import deque
+from itertools import islice
 
 
 class RDDSamplerBase(object):
@@ -62,13 +64,70 @@ class RDDSamplerBase(object):
 
 
 class RDDSampler(RDDSamplerBase):
+    """
+    Samples each element with probability `fraction`, or, with replacement, as many times as
+    drawn from Poisson(fraction).
+
+    For small fractions, instead of drawing a random number for each element, the number of
+    elements to skip before the next one in the sample is drawn from its geometric distribution,
+    like the JVM GapSamplingIterator does. Skipping costs more per sampled element than a draw,
+    so it is only used up to MAX_GAP_SAMPLING_FRACTION, or MAX_GAP_POISSON_SAMPLING_FRACTION
+    with replacement, where a Poisson draw per element costs more.
+    """
+
+    MAX_GAP_SAMPLING_FRACTION = 0.05
+    MAX_GAP_POISSON_SAMPLING_FRACTION = 0.4
+
+    # smallest uniform sample to take the log of
+    EPSILON = 5e-11
 
     def __init__(self, withReplacement, fraction, seed=None):
         RDDSamplerBase.__init__(self, withReplacement, seed)
         self._fraction = fraction
 
+    def getGapSample(self, logSkipProbability):
+        # number of elements to skip, when each one is skipped with the given probability
+        u = max(self._random.random(), self.EPSILON)
+        return min(int(math.log(u) / logSkipProbability), sys.maxsize - 1)
+
+    def getPoissonSampleAtLeastOne(self, mean):
+        # Knuth's algorithm, starting from a first uniform sample that gives at least one
+        q = math.exp(-mean)
+        p = (q + (1.0 - q) * self._random.random()) * self._random.random()
+        k = 1
+        while p > q:
+            k += 1
+            p *= self._random.random()
+        return k
+
     def func(self, split, iterator):
         self.initRandomGenerator(split)
+        if self._withReplacement:
+            maxGapSamplingFraction = self.MAX_GAP_POISSON_SAMPLING_FRACTION
+        else:
+            maxGapSamplingFraction = self.MAX_GAP_SAMPLING_FRACTION
+        if 0.0 < self._fraction <= maxGapSamplingFraction:
+            return self._gapSample(iter(iterator))
+        return self._sample(iterator)
+
+    def _gapSample(self, iterator):
+        fraction = self._fraction
+        # an element is not sampled with probability 1 - fraction, or exp(-fraction) for
+        # a sample of Poisson(fraction) elements
+        logSkipProbability = -fraction if self._withReplacement else math.log1p(-fraction)
+        while True:
+            skip = self.getGapSample(logSkipProbability)
+            for obj in islice(iterator, skip, skip + 1):
+                break
+            else:
+                return
+            if self._withReplacement:
+                for _ in range(self.getPoissonSampleAtLeastOne(fraction)):
+                    yield obj
+            else:
+                yield obj
+
+    def _sample(self, iterator):
         if self._withReplacement:
             for obj in iterator:
                 # For large datasets, the expected number of occurrences of each element in
@@ -97,6 +156,49 @@ class RDDRangeSampler(RDDSamplerBase):
                 yield obj
 
 
+class RDDReservoirSampler(RDDSamplerBase):
+    """
+    Samples `size` elements of each partition uniformly without replacement, in a single pass
+    which also counts them, and yields one (split, count, sample) tuple per partition.
+
+    Instead of drawing a random number for each element, the number of elements to skip before
+    the next one enters the reservoir is drawn from its distribution (Li's Algorithm L).
+    """
+
+    def __init__(self, size, seed=None):
+        RDDSamplerBase.__init__(self, False, seed)
+        self._size = size
+
+    def getOpenUniformSample(self):
+        # a uniform sample in (0, 1), to take its log
+        u = self._random.random()
+        while u == 0.0:
+            u = self._random.random()
+        return u
+
+    def func(self, split, iterator):
+        self.initRandomGenerator(split)
+        size = self._size
+        iterator = enumerate(iterator, 1)
+        reservoir = [obj for _, obj in islice(iterator, size)]
+        count = len(reservoir)
+        if size > 0 and count == size:
+            # log of the largest of the `size` random keys of the elements in the reservoir
+            log_w = math.log(self.getOpenUniformSample()) / size
+            while True:
+                log_p = math.log(-math.expm1(log_w))
+                skip = int(math.log(self.getOpenUniformSample()) / log_p) if log_p < 0 else 0
+                # keep only the last element consumed, with its position
+                last = deque(islice(iterator, min(skip, sys.maxsize - 1) + 1), maxlen=1)
+                if not last or last[0][0] != count + skip + 1:
+                    count = last[0][0] if last else count
+                    break
+                count, obj = last[0]
+                reservoir[self._random.randrange(size)] = obj
+                log_w += math.log(self.getOpenUniformSample()) / size
+        yield split, count, reservoir
+
+
 class RDDStratifiedSampler(RDDSamplerBase):
 
     def __init__(self, withReplacement, fractions, seed=None):
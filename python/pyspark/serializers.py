@@ -22,7 +22,8 @@ performance.
 By default, PySpark uses :class:`PickleSerializer` to serialize objects using Python's
 `cPickle` serializer, which can serialize nearly any Python object.
 Other serializers, like :class:`MarshalSerializer`, support fewer datatypes but can be
-faster.
+faster. :class:`OutOfBandPickleSerializer` avoids copying the data of NumPy arrays and other
+objects that support pickle protocol 5 out-of-band buffers.
 
 
 Examples
@@ -53,22 +54,27 @@ which contains two batches of two objects:
 >>> sc.stop()
 """
 
+import os
 import sys
 from itertools import chain, product
 import marshal
 import struct
 import types
 import collections
+import ctypes
+import io
 import zlib
 import itertools
+from array import array
 import pickle
 pickle_protocol = pickle.HIGHEST_PROTOCOL
 
 from pyspark import cloudpickle
-from pyspark.util import print_exec  # type: ignore
+from pyspark.util import print_exec, TaskLocal  # type: ignore
 
 
-__all__ = ["PickleSerializer", "MarshalSerializer", "UTF8Deserializer"]
+__all__ = ["PickleSerializer", "MarshalSerializer", "OutOfBandPickleSerializer",
+           "UTF8Deserializer"]
 
 
 class SpecialLengths(object):
@@ -139,14 +145,27 @@ class FramedSerializer(Serializer):
             except EOFError:
                 return
 
+    def _dump_parts(self, obj):
+        """
+        Serialize `obj` into the parts of one frame, which are written one after the other
+        instead of being joined first.
+        """
+        return [self.dumps(obj)]
+
     def _write_with_length(self, obj, stream):
-        serialized = self.dumps(obj)
-        if serialized is None:
+        """
+        Write `obj` as one frame, and return the length of its data.
+        """
+        parts = self._dump_parts(obj)
+        if parts[0] is None:
             raise ValueError("serialized value should not be None")
-        if len(serialized) > (1 << 31):
+        length = sum(len(part) for part in parts)
+        if length > (1 << 31):
             raise ValueError("can not serialize object larger than 2G")
-        write_int(len(serialized), stream)
-        stream.write(serialized)
+        write_int(length, stream)
+        for part in parts:
+            stream.write(part)
+        return length
 
     def _read_with_length(self, stream):
         length = read_int(stream)
@@ -154,11 +173,17 @@ class FramedSerializer(Serializer):
             raise EOFError
         elif length == SpecialLengths.NULL:
             return None
+        if self._loads_copies and hasattr(stream, "read_frame"):
+            return self.loads(stream.read_frame(length))
         obj = stream.read(length)
         if len(obj) < length:
             raise EOFError
         return self.loads(obj)
 
+    # Whether `loads` accepts any bytes-like object and keeps no reference to it, so that
+    # frames can be read into a buffer which is reused for the next frame.
+    _loads_copies = False
+
     def dumps(self, obj):
         """
         Serialize an object into a byte array.
@@ -190,10 +215,10 @@ class BatchedSerializer(Serializer):
     def _batched(self, iterator):
         if self.batchSize == self.UNLIMITED_BATCH_SIZE:
             yield list(iterator)
-        elif hasattr(iterator, "__len__") and hasattr(iterator, "__getslice__"):
+        elif _is_sliceable(iterator):
             n = len(iterator)
             for i in range(0, n, self.batchSize):
-                yield iterator[i: i + self.batchSize]
+                yield _slice(iterator, i, i + self.batchSize)
         else:
             items = []
             count = 0
@@ -243,32 +268,106 @@ class FlattenedValuesSerializer(BatchedSerializer):
         return "FlattenedValuesSerializer(%s, %d)" % (self.serializer, self.batchSize)
 
 
+def _is_sliceable(iterator):
+    """
+    Whether the input is a sequence that can be batched by slicing, such as a list, tuple,
+    range, array.array or NumPy array, instead of iterating over it.
+    """
+    return isinstance(iterator, (list, tuple, range, array)) or \
+        hasattr(iterator, "__array_interface__")
+
+
+def _slice(iterator, start, end):
+    """
+    Slice a batch out of a sequence accepted by :func:`_is_sliceable`. Batches are always
+    lists, as the JVM expects when it unpickles them; slicing a NumPy array does not copy
+    its data before that.
+    """
+    batch = iterator[start:end]
+    return batch if type(batch) is list else list(batch)
+
+
+class BatchingMetrics(object):
+    """
+    Statistics of the batches written by :class:`AutoBatchedSerializer` for a task. Python
+    workers reset them at the beginning of each task and report them to the JVM at the end of
+    it, which logs them with the timing of the task.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.items = 0
+        self.bytes = 0
+        self.min_batch_size = 0
+        self.max_batch_size = 0
+
+    def add(self, batch_size, size):
+        if self.frames == 0 or batch_size < self.min_batch_size:
+            self.min_batch_size = batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.frames += 1
+        self.items += batch_size
+        self.bytes += size
+
+    @property
+    def average_batch_size(self):
+        return self.items / self.frames if self.frames else 0.0
+
+    def __repr__(self):
+        return "BatchingMetrics(frames=%d, items=%d, bytes=%d, batch sizes=%d..%d)" % (
+            self.frames, self.items, self.bytes, self.min_batch_size, self.max_batch_size)
+
+
+# stats of the current task, kept apart for the tasks run concurrently by threads of a worker
+batching_metrics = TaskLocal(BatchingMetrics)
+
+
 class AutoBatchedSerializer(BatchedSerializer):
     """
     Choose the size of batch automatically based on the size of object
+
+    The size of the next batch is chosen so that a frame is about `bestSize` bytes, using the
+    serialized size per object measured on the previous batches. The batch size grows at most
+    8 times per frame, so that a few small objects at the beginning do not produce a huge
+    frame, and shrinks immediately when frames get too large.
     """
 
+    MAX_GROWTH = 8
+
     def __init__(self, serializer, bestSize=1 << 16):
         BatchedSerializer.__init__(self, serializer, self.UNKNOWN_BATCH_SIZE)
         self.bestSize = bestSize
 
+    def _next_batch_size(self, batch, total_items, total_bytes):
+        per_item = max(total_bytes / total_items, 1.0)
+        return max(1, min(batch * self.MAX_GROWTH, int(self.bestSize / per_item)))
+
     def dump_stream(self, iterator, stream):
-        batch, best = 1, self.bestSize
-        iterator = iter(iterator)
+        batch, offset = 1, 0
+        total_items, total_bytes = 0, 0
+        sliceable = _is_sliceable(iterator)
+        if not sliceable:
+            iterator = iter(iterator)
         while True:
-            vs = list(itertools.islice(iterator, batch))
+            if sliceable:
+                vs = _slice(iterator, offset, offset + batch)
+                offset += len(vs)
+            else:
+                vs = list(itertools.islice(iterator, batch))
             if not vs:
                 break
 
-            bytes = self.serializer.dumps(vs)
-            write_int(len(bytes), stream)
-            stream.write(bytes)
-
-            size = len(bytes)
-            if size < best:
-                batch *= 2
-            elif size > best * 10 and batch > 1:
-                batch //= 2
+            size = self.serializer._write_with_length(vs, stream)
+            batching_metrics.get().add(len(vs), size)
+            if size > self.bestSize * 10:
+                # Forget earlier batches which were much smaller per object.
+                total_items, total_bytes = 0, 0
+            total_items += len(vs)
+            total_bytes += size
+            batch = self._next_batch_size(batch, total_items, total_bytes)
 
     def __repr__(self):
         return "AutoBatchedSerializer(%s)" % self.serializer
@@ -423,6 +522,8 @@ class PickleSerializer(FramedSerializer):
     not be as fast as more specialized serializers.
     """
 
+    _loads_copies = True
+
     def dumps(self, obj):
         return pickle.dumps(obj, pickle_protocol)
 
@@ -447,6 +548,98 @@ class CloudPickleSerializer(PickleSerializer):
             raise pickle.PicklingError(msg)
 
 
+def _pickle_out_of_band(obj):
+    """
+    Pickle `obj` with protocol 5, and return the pickled data and the raw buffers kept out of
+    it, e.g. the data of NumPy arrays. Requires Python 3.8 or above.
+    """
+    buffers = []
+
+    def collect(buf):
+        try:
+            buffers.append(buf.raw())
+        except BufferError:
+            # non-contiguous buffers are pickled in band
+            return True
+        return False
+
+    return pickle.dumps(obj, 5, buffer_callback=collect), buffers
+
+
+def _aligned_buffer(length, alignment):
+    """
+    Allocate a writable buffer of `length` bytes whose address is a multiple of `alignment`.
+    """
+    buf = bytearray(length + alignment)
+    offset = -ctypes.addressof(ctypes.c_char.from_buffer(buf)) % alignment
+    return memoryview(buf)[offset:offset + length]
+
+
+class OutOfBandPickleSerializer(FramedSerializer):
+
+    """
+    Serializes objects using pickle protocol 5, keeping the buffers of objects that support
+    out-of-band pickling, e.g. NumPy arrays, out of the pickled data.
+
+    The buffers are written to the stream after the pickled data instead of being copied into
+    it, and are read into newly allocated, aligned buffers which the loaded objects then use
+    without another copy. Each object is still written as a single frame, so this serializer
+    can be used wherever a :class:`FramedSerializer` is expected. Requires Python 3.8 or above.
+
+    Examples
+    --------
+    >>> ser = OutOfBandPickleSerializer()
+    >>> ser.loads(ser.dumps([1, "a", b"b"]))
+    [1, 'a', b'b']
+    """
+
+    ALIGNMENT = 64
+
+    def __init__(self):
+        FramedSerializer.__init__(self)
+        if not hasattr(pickle, "PickleBuffer"):
+            raise RuntimeError("OutOfBandPickleSerializer requires Python 3.8 or above")
+
+    def _dump_parts(self, obj):
+        # A frame consists of the number of buffers, the lengths of the pickled data and of
+        # the buffers, the pickled data and then the buffers.
+        data, buffers = _pickle_out_of_band(obj)
+        header = struct.pack(
+            "!iq%dq" % len(buffers), len(buffers), len(data), *[b.nbytes for b in buffers])
+        return [header, data] + buffers
+
+    def dumps(self, obj):
+        return b"".join(self._dump_parts(obj))
+
+    def loads(self, obj):
+        obj = memoryview(obj)
+        num_buffers = struct.unpack_from("!i", obj)[0]
+        lengths = struct.unpack_from("!%dq" % (num_buffers + 1), obj, 4)
+        pos = 4 + 8 * (num_buffers + 1)
+        parts = []
+        for length in lengths:
+            parts.append(obj[pos:pos + length])
+            pos += length
+        return pickle.loads(parts[0], buffers=parts[1:])
+
+    def _read_with_length(self, stream):
+        length = read_int(stream)
+        if length == SpecialLengths.END_OF_DATA_SECTION:
+            raise EOFError
+        elif length == SpecialLengths.NULL:
+            return None
+        num_buffers = read_int(stream)
+        lengths = _read_fully(stream, 8 * (num_buffers + 1))
+        lengths = struct.unpack("!%dq" % (num_buffers + 1), lengths)
+        data = _read_fully(stream, lengths[0])
+        buffers = []
+        for buffer_length in lengths[1:]:
+            buf = _aligned_buffer(buffer_length, self.ALIGNMENT)
+            _readinto_fully(stream, buf)
+            buffers.append(buf)
+        return pickle.loads(data, buffers=buffers)
+
+
 class MarshalSerializer(FramedSerializer):
 
     """
@@ -457,6 +650,8 @@ class MarshalSerializer(FramedSerializer):
     This serializer is faster than PickleSerializer but supports fewer datatypes.
     """
 
+    _loads_copies = True
+
     def dumps(self, obj):
         return marshal.dumps(obj)
 
@@ -493,23 +688,89 @@ class AutoSerializer(FramedSerializer):
             raise ValueError("invalid serialization type: %s" % _type)
 
 
+def _load_codec(name):
+    """
+    Return the compress and decompress functions of a codec, or raise ImportError if the
+    library it needs is not installed.
+    """
+    if name == "zlib":
+        return (lambda data: zlib.compress(data, 1)), zlib.decompress
+    elif name == "lz4":
+        import lz4.frame  # type: ignore[import]
+        return (lambda data: lz4.frame.compress(data, store_size=True)), lz4.frame.decompress
+    elif name == "zstd":
+        import zstandard  # type: ignore[import]
+        return (lambda data: zstandard.ZstdCompressor(level=1).compress(data),
+                lambda data: zstandard.ZstdDecompressor().decompress(data))
+    elif name == "snappy":
+        import snappy  # type: ignore[import]
+        return snappy.compress, snappy.uncompress
+    else:
+        raise ValueError("Unknown compression codec: %s" % name)
+
+
 class CompressedSerializer(FramedSerializer):
     """
     Compress the serialized data
+
+    `codec` is one of 'zlib', 'lz4', 'zstd' or 'snappy'. If it is not given, the codec
+    configured by `spark.python.compression.codec` is used. A codec whose library is not
+    installed falls back to zlib. Frames compressed by zlib are written as they are, frames
+    compressed by other codecs are prefixed with one byte identifying the codec, so that
+    `loads` detects the codec of each frame, including frames written before codecs were
+    configurable.
     """
-    def __init__(self, serializer):
+
+    CODEC_IDS = {"lz4": 1, "zstd": 2, "snappy": 3}
+    CODEC_NAMES = dict((v, k) for k, v in CODEC_IDS.items())
+    # The first byte of a zlib stream with the default window size, which is never a codec id.
+    ZLIB_HEADER = 0x78
+
+    _codecs = {}  # type: ignore[var-annotated]
+    _loads_copies = True
+
+    def __init__(self, serializer, codec=None):
         FramedSerializer.__init__(self)
         assert isinstance(serializer, FramedSerializer), "serializer must be a FramedSerializer"
         self.serializer = serializer
+        if codec is None:
+            codec = os.environ.get("PYSPARK_COMPRESSION_CODEC", "lz4")
+        self.codec = self._resolve(codec)
+
+    @classmethod
+    def _resolve(cls, name):
+        name = name.lower()
+        if name not in cls._codecs:
+            try:
+                cls._codecs[name] = _load_codec(name)
+            except ImportError:
+                cls._codecs[name] = None
+        return name if cls._codecs[name] is not None else cls._resolve("zlib")
+
+    def _dump_parts(self, obj):
+        compress = self._codecs[self.codec][0]
+        data = compress(self.serializer.dumps(obj))
+        if self.codec == "zlib":
+            return [data]
+        # written apart from the compressed data, instead of copying it after the id
+        return [bytes([self.CODEC_IDS[self.codec]]), data]
 
     def dumps(self, obj):
-        return zlib.compress(self.serializer.dumps(obj), 1)
+        return b"".join(self._dump_parts(obj))
 
     def loads(self, obj):
-        return self.serializer.loads(zlib.decompress(obj))
+        if obj[0] == self.ZLIB_HEADER:
+            return self.serializer.loads(zlib.decompress(obj))
+        name = self.CODEC_NAMES.get(obj[0])
+        if name is None:
+            raise ValueError("Unknown compression codec id: %d" % obj[0])
+        if self._resolve(name) != name:
+            raise ValueError("Data was compressed by %s, which is not installed" % name)
+        decompress = self._codecs[name][1]
+        return self.serializer.loads(decompress(memoryview(obj)[1:]))
 
     def __repr__(self):
-        return "CompressedSerializer(%s)" % self.serializer
+        return "CompressedSerializer(%s, %s)" % (self.serializer, self.codec)
 
 
 class UTF8Deserializer(Serializer):
@@ -543,6 +804,22 @@ class UTF8Deserializer(Serializer):
         return "UTF8Deserializer(%s)" % self.use_unicode
 
 
+def _read_fully(stream, length):
+    data = stream.read(length)
+    if len(data) < length:
+        raise EOFError
+    return data
+
+
+def _readinto_fully(stream, buf):
+    pos = 0
+    while pos < len(buf):
+        n = stream.readinto(buf[pos:])
+        if not n:
+            raise EOFError
+        pos += n
+
+
 def read_long(stream):
     length = stream.read(8)
     if not length:
@@ -641,6 +918,95 @@ class ChunkedStream(object):
         return self.wrapped.closed
 
 
+class FrameReader(io.BufferedReader):
+    """
+    Buffered reader which reads small frames into a buffer reused across frames, instead of
+    allocating new bytes for each of them. Used for the sockets of daemon-forked workers.
+    """
+
+    # Larger frames are read into new bytes, so that one large frame does not pin its memory.
+    MAX_REUSED_FRAME_SIZE = 1 << 20
+
+    def __init__(self, raw, buffer_size=io.DEFAULT_BUFFER_SIZE):
+        io.BufferedReader.__init__(self, raw, buffer_size)
+        self._frame = bytearray()
+
+    def read_frame(self, length):
+        """
+        Read exactly `length` bytes and return them as a bytes-like object, which is only
+        valid until the next call.
+        """
+        if length > self.MAX_REUSED_FRAME_SIZE:
+            data = self.read(length)
+        else:
+            if len(self._frame) < length:
+                # Allocate a new buffer rather than resizing, the old one may still be exported.
+                self._frame = bytearray(max(length, 2 * len(self._frame)))
+            data = memoryview(self._frame)[:length]
+            if self.readinto(data) < length:
+                raise EOFError
+        if len(data) < length:
+            raise EOFError
+        return data
+
+
+class VectoredWriter(io.BufferedIOBase):
+    """
+    Buffered writer over a file descriptor, e.g. of a socket. Small writes are buffered.
+    A write that does not fit in the buffer is sent together with the buffered data in one
+    :func:`os.writev` call, so the header of a large frame does not cost a separate system
+    call and its payload is not copied.
+    """
+
+    def __init__(self, fd, buffer_size=io.DEFAULT_BUFFER_SIZE):
+        io.BufferedIOBase.__init__(self)
+        self._fd = fd
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def fileno(self):
+        return self._fd
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write to closed file")
+        data = memoryview(data).cast("B")
+        if len(self._buffer) + len(data) <= self.buffer_size:
+            self._buffer += data
+        else:
+            buffers = [self._buffer, data]
+            self._buffer = bytearray()
+            self._writev(buffers)
+        return len(data)
+
+    def flush(self):
+        if self.closed:
+            return
+        if self._buffer:
+            buffers = [self._buffer]
+            self._buffer = bytearray()
+            self._writev(buffers)
+
+    def close(self):
+        if not self.closed:
+            try:
+                io.BufferedIOBase.close(self)
+            finally:
+                os.close(self._fd)
+
+    def _writev(self, buffers):
+        buffers = [memoryview(b) for b in buffers if len(b)]
+        while buffers:
+            written = os.writev(self._fd, buffers)
+            while buffers and written >= len(buffers[0]):
+                written -= len(buffers.pop(0))
+            if written:
+                buffers[0] = buffers[0][written:]
+
+
 if __name__ == '__main__':
     import doctest
     (failure_count, test_count) = doctest.testmod()
@@ -15,6 +15,7 @@
 # limitations under the License.
 #
 
+import collections
 import os
 import platform
 import shutil
@@ -28,7 +29,7 @@ import sys
 import heapq
 from pyspark.serializers import BatchedSerializer, PickleSerializer, FlattenedValuesSerializer, \
     CompressedSerializer, AutoBatchedSerializer
-from pyspark.util import fail_on_stopiteration  # type: ignore
+from pyspark.util import fail_on_stopiteration, TaskLocal  # type: ignore
 
 
 try:
@@ -79,9 +80,134 @@ def _get_local_dirs(sub):
     return [os.path.join(d, "python", str(os.getpid()), sub) for d in dirs]
 
 
-# global stats
-MemoryBytesSpilled = 0
-DiskBytesSpilled = 0
+class SpillMetrics(object):
+    """
+    Bytes spilled by a task, which Python workers report to the JVM at the end of it.
+    """
+
+    def __init__(self):
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+
+
+# stats of the current task, kept apart for the tasks run concurrently by threads of a worker
+spill_metrics = TaskLocal(SpillMetrics)
+
+# ids of the sorted runs spilled by ExternalSorter in this process
+_sorted_run_ids = itertools.count()
+
+
+def _estimate_size(obj):
+    """
+    Estimate the memory used by `obj`, including the elements of a list, tuple, set or dict
+    from the sizes of the first few of them.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict) and obj:
+        sample = list(itertools.islice(obj.items(), 8))
+        size += len(obj) * sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in sample) \
+            // len(sample)
+    elif isinstance(obj, (list, tuple, set, frozenset)) and obj:
+        sample = list(itertools.islice(obj, 8))
+        size += len(obj) * sum(map(sys.getsizeof, sample)) // len(sample)
+    return size
+
+
+class _SizeTracker(object):
+    """
+    Tracks the average size of the items a merger or a sorter holds in memory, from the sizes of
+    sampled items, to estimate the memory they use. Unlike the used memory of the process, the
+    estimate only covers those items and follows them as they are added and spilled.
+    """
+
+    def __init__(self, item_overhead):
+        # memory used per item by the container holding it
+        self.item_overhead = item_overhead
+        self.item_size = 0
+        self.samples = 0
+
+    def sample(self, *objs):
+        """ Add the size of an item, made of `objs`, to the average """
+        size = self.item_overhead + sum(map(_estimate_size, objs))
+        # weight recent samples more, as combiners grow
+        self.samples = min(self.samples + 1, 64)
+        self.item_size += (size - self.item_size) / self.samples
+
+    def estimate(self, count):
+        """ The estimated memory used by `count` items, in bytes """
+        return int(count * self.item_size)
+
+
+def _memory_budget(memory_limit):
+    """
+    The memory, in bytes, the items of a merger or a sorter may use: the part of `memory_limit`,
+    in MiB, not used yet by the process, but at least an eighth of it.
+    """
+    return int(max(memory_limit - get_used_memory(), memory_limit / 8)) << 20
+
+
+def _identity(x):
+    return x
+
+
+# Reduce functions which NumPy can apply to numeric values, see `_reduce_numeric`
+_NUMPY_REDUCE_FUNCTIONS = [(operator.add, "add"), (max, "maximum"), (min, "minimum")]
+
+
+def _numpy_reduce_function(aggregator):
+    """
+    Return the NumPy ufunc which merges values like `aggregator`, if it reduces values with
+    one of `_NUMPY_REDUCE_FUNCTIONS` and NumPy is installed, otherwise None.
+    """
+    op = getattr(aggregator, "_reduce_op", None)
+    names = [name for f, name in _NUMPY_REDUCE_FUNCTIONS if op is f]
+    if not names:
+        return None
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    return getattr(np, names[0])
+
+
+def _reduce_numeric(items, ufunc):
+    """
+    Reduce the (K, V) pairs `items` by key with the NumPy `ufunc`, keeping the first of equal
+    keys, if all the keys are ints or all are floats and all the values are ints, or floats
+    for maximum and minimum, so that the result is the same as merging them one at a time.
+    Otherwise return None.
+    """
+    import numpy as np
+
+    try:
+        keys = [k for k, _ in items]
+    except (TypeError, ValueError):
+        return None  # not pairs
+    values = list(map(operator.itemgetter(1), items))
+    key_types, value_types = set(map(type, keys)), set(map(type, values))
+    if len(key_types) != 1 or not key_types <= {int, float}:
+        return None
+    if value_types != {int} and (value_types != {float} or ufunc is np.add):
+        return None
+
+    try:
+        keys = np.fromiter(keys, np.int64 if int in key_types else np.float64, len(keys))
+        values = np.fromiter(values, np.int64 if int in value_types else np.float64, len(values))
+    except OverflowError:
+        return None  # ints out of the range of int64
+    if keys.dtype.kind == "f" and np.isnan(keys).any():
+        return None  # NaNs are different keys
+    if values.dtype.kind == "f" and \
+            (np.isnan(values).any() or np.signbit(values[values == 0]).any()):
+        return None  # max() and min() depend on the order of NaNs and signed zeros
+    if ufunc is np.add and \
+            max(-int(values.min()), int(values.max())) * len(values) >= 1 << 63:
+        return None  # the sums could overflow
+
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], values[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return zip(keys[starts].tolist(), ufunc.reduceat(values, starts).tolist())
 
 
 class Aggregator(object):
@@ -98,6 +224,9 @@ class Aggregator(object):
         self.createCombiner = fail_on_stopiteration(createCombiner)
         self.mergeValue = fail_on_stopiteration(mergeValue)
         self.mergeCombiners = fail_on_stopiteration(mergeCombiners)
+        # the function which reduces values into combiners of the same type, if any
+        self._reduce_op = mergeValue \
+            if createCombiner is _identity and mergeValue is mergeCombiners else None
 
 
 class SimpleAggregator(Aggregator):
@@ -108,7 +237,7 @@ class SimpleAggregator(Aggregator):
     """
 
     def __init__(self, combiner):
-        Aggregator.__init__(self, lambda x: x, combiner, combiner)
+        Aggregator.__init__(self, _identity, combiner, combiner)
 
 
 class Merger(object):
@@ -139,6 +268,46 @@ def _compressed_serializer(self, serializer=None):
     return AutoBatchedSerializer(CompressedSerializer(ser))
 
 
+def _partition_frames(iterator, num_partitions, partition_func, serializer, limit,
+                      frame_size=1 << 20):
+    """
+    Split (key, value) pairs into one bucket per partition, and yield (partition, frame)
+    pairs where the frame is a list of pairs of the partition serialized by `serializer`.
+
+    A bucket is serialized and dropped as soon as it has as many pairs as fit in about
+    `frame_size` bytes, from the serialized size of the previous frame, so that only the
+    pairs of one frame are held both as objects and serialized at once. All the buckets are
+    flushed when the used memory goes above `limit`, in MiB.
+
+    Examples
+    --------
+    >>> frames = _partition_frames([(i, i) for i in range(10)], 2, lambda k: k,
+    ...                            PickleSerializer(), 512)
+    >>> sorted(k for p, f in frames if p == 1 for k, v in PickleSerializer().loads(f))
+    [1, 3, 5, 7, 9]
+    """
+    buckets = collections.defaultdict(list)
+    batch, c = 1, 0
+    for k, v in iterator:
+        split = partition_func(k) % num_partitions
+        items = buckets[split]
+        items.append((k, v))
+        c += 1
+
+        if len(items) >= batch:
+            del buckets[split]
+            frame = serializer.dumps(items)
+            batch = max(int(frame_size * len(items) / len(frame)), 1)
+            yield split, frame
+
+        elif c % 1000 == 0 and get_used_memory() > limit:
+            for split in list(buckets):
+                yield split, serializer.dumps(buckets.pop(split))
+
+    for split, items in buckets.items():
+        yield split, serializer.dumps(items)
+
+
 class ExternalMerger(Merger):
 
     """
@@ -177,6 +346,10 @@ class ExternalMerger(Merger):
     Finally, if any items were spilled into disks, each partition
     will be merged into `data` and be yielded, then cleared.
 
+    Besides the used memory of the process, the estimated size of the
+    merged items, from sampled ones, is checked, so that they are spilled
+    once they fill the memory left to them, before the process grows.
+
     Examples
     --------
     >>> agg = SimpleAggregator(lambda x, y: x + y)
@@ -192,11 +365,23 @@ class ExternalMerger(Merger):
     >>> assert merger.spills > 0
     >>> sum(v for k,v in merger.items())
     49995000
+
+    If the aggregator reduces values with `operator.add`, `max` or `min`, numeric keys and
+    values are reduced in chunks with NumPy, when installed, before they are merged.
     """
 
     # the max total partitions created recursively
     MAX_TOTAL_PARTITIONS = 4096
 
+    # number of items reduced at once with NumPy
+    NUMERIC_CHUNK_SIZE = 1 << 16
+
+    # memory used by an item of a dict, besides its key and value
+    DICT_ITEM_OVERHEAD = 48
+
+    # max number of items merged between checks of the memory
+    MAX_BATCH = 100000
+
     def __init__(self, aggregator, memory_limit=512, serializer=None,
                  localdirs=None, scale=1, partitions=59, batch=1000):
         Merger.__init__(self, aggregator)
@@ -217,6 +402,11 @@ class ExternalMerger(Merger):
         self.spills = 0
         # randomize the hash of key, id(o) is the address of o (aligned by 8)
         self._seed = id(self) + 7
+        # NumPy function which reduces numeric values like the aggregator, if any
+        self._ufunc = _numpy_reduce_function(aggregator)
+        # estimated size of the merged items, which are spilled once it reaches the budget
+        self._sizes = _SizeTracker(self.DICT_ITEM_OVERHEAD)
+        self._size_limit = _memory_budget(memory_limit)
 
     def _get_spill_dir(self, n):
         """ Choose one directory for spill by number n """
@@ -230,8 +420,24 @@ class ExternalMerger(Merger):
         """
         return max(self.memory_limit, get_used_memory() * 1.05)
 
+    def _in_memory_size(self):
+        """ The estimated memory used by the merged items in memory, in bytes """
+        return self._sizes.estimate(len(self.data) + sum(map(len, self.pdata)))
+
+    def _should_spill(self, limit):
+        """
+        Whether to spill the merged items, which is when their estimated size reaches their
+        budget, or when the used memory of the process reaches `limit`.
+        """
+        return self._in_memory_size() >= self._size_limit or get_used_memory() >= limit
+
     def mergeValues(self, iterator):
         """ Combine the items by creator and combiner """
+        if self._ufunc is not None:
+            # the creator is the identity, so values are merged like combiners
+            self.mergeCombiners(iterator)
+            return
+
         # speedup attribute lookup
         creator, comb = self.agg.createCombiner, self.agg.mergeValue
         c, data, pdata, hfun, batch = 0, self.data, self.pdata, self._partition, self.batch
@@ -243,15 +449,16 @@ class ExternalMerger(Merger):
 
             c += 1
             if c >= batch:
-                if get_used_memory() >= limit:
+                self._sizes.sample(k, d[k])
+                if self._should_spill(limit):
                     self._spill()
                     limit = self._next_limit()
                     batch /= 2
                     c = 0
                 else:
-                    batch *= 1.5
+                    batch = min(batch * 1.5, self.MAX_BATCH)
 
-        if get_used_memory() >= limit:
+        if self._should_spill(limit):
             self._spill()
 
     def _partition(self, key):
@@ -268,6 +475,10 @@ class ExternalMerger(Merger):
         """ Merge (K,V) pair by mergeCombiner """
         if limit is None:
             limit = self.memory_limit
+        if self._ufunc is not None:
+            self._merge_numeric_combiners(iterator, limit)
+            return
+
         # speedup attribute lookup
         comb, hfun, objsize = self.agg.mergeCombiners, self._partition, self._object_size
         c, data, pdata, batch = 0, self.data, self.pdata, self.batch
@@ -279,29 +490,51 @@ class ExternalMerger(Merger):
 
             c += objsize(v)
             if c > batch:
-                if get_used_memory() > limit:
+                self._sizes.sample(k, d[k])
+                if self._should_spill(limit):
                     self._spill()
                     limit = self._next_limit()
                     batch /= 2
                     c = 0
                 else:
-                    batch *= 1.5
+                    batch = min(batch * 1.5, self.MAX_BATCH)
 
-        if limit and get_used_memory() >= limit:
+        if limit and self._should_spill(limit):
             self._spill()
 
+    def _merge_numeric_combiners(self, iterator, limit):
+        """
+        Merge (K,V) pair by mergeCombiner, reducing them in chunks with NumPy first when they
+        are numbers, see `_reduce_numeric`.
+        """
+        comb, hfun, ufunc = self.agg.mergeCombiners, self._partition, self._ufunc
+        data, pdata = self.data, self.pdata
+        iterator = iter(iterator)
+        while True:
+            chunk = list(itertools.islice(iterator, self.NUMERIC_CHUNK_SIZE))
+            if not chunk:
+                break
+            for k, v in _reduce_numeric(chunk, ufunc) or chunk:
+                d = pdata[hfun(k)] if pdata else data
+                d[k] = comb(d[k], v) if k in d else v
+            if limit:
+                self._sizes.sample(k, d[k])
+                if self._should_spill(limit):
+                    self._spill()
+                    limit = self._next_limit()
+
     def _spill(self):
         """
         dump already partitioned data into disks.
 
         It will dump the data in batch for better performance.
         """
-        global MemoryBytesSpilled, DiskBytesSpilled
+        metrics = spill_metrics.get()
         path = self._get_spill_dir(self.spills)
         if not os.path.exists(path):
             os.makedirs(path)
 
-        used_memory = get_used_memory()
+        metrics.memory_bytes += self._in_memory_size()
         if not self.pdata:
             # The data has not been partitioned, it will iterator the
             # dataset once, write them into different files, has no
@@ -319,7 +552,7 @@ class ExternalMerger(Merger):
                 self.serializer.dump_stream([(k, v)], streams[h])
 
             for s in streams:
-                DiskBytesSpilled += s.tell()
+                metrics.disk_bytes += s.tell()
                 s.close()
 
             self.data.clear()
@@ -332,11 +565,9 @@ class ExternalMerger(Merger):
                     # dump items in batch
                     self.serializer.dump_stream(iter(self.pdata[i].items()), f)
                 self.pdata[i].clear()
-                DiskBytesSpilled += os.path.getsize(p)
+                metrics.disk_bytes += os.path.getsize(p)
 
         self.spills += 1
-        gc.collect()  # release the memory as much as possible
-        MemoryBytesSpilled += max(used_memory - get_used_memory(), 0) << 20
 
     def items(self):
         """ Return all merged items as iterator """
@@ -404,7 +635,7 @@ class ExternalMerger(Merger):
             with open(p, 'rb') as f:
                 m.mergeCombiners(self.serializer.load_stream(f), 0)
 
-            if get_used_memory() > limit:
+            if m._should_spill(limit):
                 m._spill()
                 limit = self._next_limit()
 
@@ -416,13 +647,53 @@ class ExternalMerger(Merger):
             shutil.rmtree(d, True)
 
 
+def _combine_locally(iterator, agg, memory_limit, serializer=None, map_side_combine=None,
+                     sample_size=10000, max_distinct_ratio=0.9):
+    """
+    Combine the values of each key of a partition before shuffling them, as (key, combiner)
+    pairs, or only turn each value into a combiner when `map_side_combine` is False.
+
+    When `map_side_combine` is None, the values are combined only if at most
+    `max_distinct_ratio` of the first `sample_size` keys are distinct, since combining
+    nearly unique keys costs a dict, and maybe spills, without reducing what is shuffled.
+
+    Examples
+    --------
+    >>> agg = SimpleAggregator(operator.add)
+    >>> sorted(_combine_locally([(1, 1), (2, 1), (1, 1)], agg, 1024, sample_size=3))
+    [(1, 2), (2, 1)]
+    >>> list(_combine_locally([(1, 1), (2, 1), (1, 1)], agg, 1024, sample_size=2))
+    [(1, 1), (2, 1), (1, 1)]
+    """
+    iterator = iter(iterator)
+    if map_side_combine is None:
+        head = list(itertools.islice(iterator, sample_size))
+        distinct = len(set(k for k, _ in head))
+        map_side_combine = distinct <= max_distinct_ratio * len(head)
+        iterator = itertools.chain(head, iterator)
+
+    if not map_side_combine:
+        creator = agg.createCombiner
+        return ((k, creator(v)) for k, v in iterator)
+
+    merger = ExternalMerger(agg, memory_limit, serializer)
+    merger.mergeValues(iterator)
+    return merger.items()
+
+
 class ExternalSorter(object):
     """
     ExternalSorter will divide the elements into chunks, sort them in
     memory and dump them into disks, finally merge them back.
 
     The spilling will only happen when the used memory goes above
-    the limit.
+    the limit, or when the estimated size of the elements in memory,
+    from sampled ones, reaches the memory left to them.
+
+    At most MAX_FAN_IN sorted runs are merged at once, each read through
+    a buffer of READAHEAD_SIZE bytes. When more runs have been spilled,
+    they are first merged into larger runs on disk, in as many passes as
+    needed, so the number of open files stays bounded.
 
     Examples
     --------
@@ -435,6 +706,15 @@ class ExternalSorter(object):
     >>> sorted(l) == list(sorter.sorted(l, key=lambda x: -x, reverse=True))
     True
     """
+    # memory used by an element of a list, besides the element
+    LIST_ITEM_OVERHEAD = 8
+
+    # max number of runs merged (and files opened) at once
+    MAX_FAN_IN = 64
+
+    # size of the buffer each run is read through while merging
+    READAHEAD_SIZE = 1 << 16
+
     def __init__(self, memory_limit, serializer=None):
         self.memory_limit = memory_limit
         self.local_dirs = _get_local_dirs("sort")
@@ -455,13 +735,69 @@ class ExternalSorter(object):
         """
         return max(self.memory_limit, get_used_memory() * 1.05)
 
+    def _load_run(self, run):
+        """ Iterate the items of a sorted run, see `_dump_run` """
+        if isinstance(run, str):
+            f = open(run, 'rb', self.READAHEAD_SIZE)
+            os.unlink(run)  # data will be deleted after close
+        else:
+            f = run
+            f.seek(0)
+        try:
+            for v in self.serializer.load_stream(f):
+                yield v
+        finally:
+            # close the file explicit once we consume all the items
+            # to avoid ResourceWarning in Python3
+            f.close()
+
+    def _dump_run(self, items, keep_open=False):
+        """
+        Dump sorted items into a new run. Return its file if `keep_open`, which is already
+        deleted, so that nothing is left behind if the run is never loaded, or else its path,
+        so that the number of open files stays bounded.
+        """
+        metrics = spill_metrics.get()
+        path = self._get_path(next(_sorted_run_ids))
+        f = open(path, 'w+b', self.READAHEAD_SIZE)
+        try:
+            if keep_open:
+                os.unlink(path)  # data will be deleted after close
+            self.serializer.dump_stream(items, f)
+            metrics.disk_bytes += f.tell()
+        except BaseException:
+            f.close()
+            if not keep_open:
+                os.unlink(path)
+            raise
+        if keep_open:
+            return f
+        f.close()
+        return path
+
+    def _merge_runs(self, runs, key=None, reverse=False):
+        """
+        Merge the sorted runs, at most MAX_FAN_IN of them at once: while there
+        are more, merge consecutive groups of them into larger runs first.
+        """
+        fan_in = max(self.MAX_FAN_IN, 2)
+        while len(runs) > fan_in:
+            # merge only as many groups as needed to get down to MAX_FAN_IN runs
+            n = min(len(runs) // fan_in, -((fan_in - len(runs)) // (fan_in - 1)))
+            merged = [self._dump_run(heapq.merge(*[self._load_run(p) for p in group],
+                                                 key=key, reverse=reverse))
+                      for group in (runs[i * fan_in:(i + 1) * fan_in] for i in range(n))]
+            runs = merged + runs[n * fan_in:]
+        return [self._load_run(p) for p in runs]
+
     def sorted(self, iterator, key=None, reverse=False):
         """
         Sort the elements in iterator, do external sort when the memory
         goes above the limit.
         """
-        global MemoryBytesSpilled, DiskBytesSpilled
+        metrics = spill_metrics.get()
         batch, limit = 100, self._next_limit()
+        sizes, size_limit = _SizeTracker(self.LIST_ITEM_OVERHEAD), _memory_budget(self.memory_limit)
         chunks, current_chunk = [], []
         iterator = iter(iterator)
         while True:
@@ -471,25 +807,14 @@ class ExternalSorter(object):
             if len(chunk) < batch:
                 break
 
-            used_memory = get_used_memory()
-            if used_memory > limit:
+            sizes.sample(chunk[-1])
+            in_memory_size = sizes.estimate(len(current_chunk))
+            if in_memory_size >= size_limit or get_used_memory() > limit:
                 # sort them inplace will save memory
                 current_chunk.sort(key=key, reverse=reverse)
-                path = self._get_path(len(chunks))
-                with open(path, 'wb') as f:
-                    self.serializer.dump_stream(current_chunk, f)
-
-                def load(f):
-                    for v in self.serializer.load_stream(f):
-                        yield v
-                    # close the file explicit once we consume all the items
-                    # to avoid ResourceWarning in Python3
-                    f.close()
-                chunks.append(load(open(path, 'rb')))
+                chunks.append(self._dump_run(current_chunk, len(chunks) < self.MAX_FAN_IN))
                 current_chunk = []
-                MemoryBytesSpilled += max(used_memory - get_used_memory(), 0) << 20
-                DiskBytesSpilled += os.path.getsize(path)
-                os.unlink(path)  # data will be deleted after close
+                metrics.memory_bytes += in_memory_size
 
             elif not chunks:
                 batch = min(int(batch * 1.5), 10000)
@@ -498,6 +823,7 @@ class ExternalSorter(object):
         if not chunks:
             return current_chunk
 
+        chunks = self._merge_runs(chunks, key=key, reverse=reverse)
         if current_chunk:
             chunks.append(iter(current_chunk))
 
@@ -594,17 +920,15 @@ class ExternalList(object):
 
     def _spill(self):
         """ dump the values into disk """
-        global MemoryBytesSpilled, DiskBytesSpilled
+        metrics = spill_metrics.get()
         if self._file is None:
             self._open_file()
 
-        used_memory = get_used_memory()
         pos = self._file.tell()
         self._ser.dump_stream(self.values, self._file)
+        metrics.memory_bytes += _estimate_size(self.values)
         self.values = []
-        gc.collect()
-        DiskBytesSpilled += self._file.tell() - pos
-        MemoryBytesSpilled += max(used_memory - get_used_memory(), 0) << 20
+        metrics.disk_bytes += self._file.tell() - pos
 
 
 class ExternalListOfList(ExternalList):
@@ -719,12 +1043,12 @@ class ExternalGroupBy(ExternalMerger):
         """
         dump already partitioned data into disks.
         """
-        global MemoryBytesSpilled, DiskBytesSpilled
+        metrics = spill_metrics.get()
         path = self._get_spill_dir(self.spills)
         if not os.path.exists(path):
             os.makedirs(path)
 
-        used_memory = get_used_memory()
+        metrics.memory_bytes += self._in_memory_size()
         if not self.pdata:
             # The data has not been partitioned, it will iterator the
             # data once, write them into different files, has no
@@ -749,7 +1073,7 @@ class ExternalGroupBy(ExternalMerger):
                     self.serializer.dump_stream([(k, v)], streams[h])
 
             for s in streams:
-                DiskBytesSpilled += s.tell()
+                metrics.disk_bytes += s.tell()
                 s.close()
 
             self.data.clear()
@@ -768,11 +1092,9 @@ class ExternalGroupBy(ExternalMerger):
                     else:
                         self.serializer.dump_stream(self.pdata[i].items(), f)
                 self.pdata[i].clear()
-                DiskBytesSpilled += os.path.getsize(p)
+                metrics.disk_bytes += os.path.getsize(p)
 
         self.spills += 1
-        gc.collect()  # release the memory as much as possible
-        MemoryBytesSpilled += max(used_memory - get_used_memory(), 0) << 20
 
     def _merged_items(self, index):
         size = sum(os.path.getsize(os.path.join(self._get_spill_dir(j), str(index)))
@@ -683,11 +683,18 @@ class DataFrame(PandasMapOpsMixin, PandasConversionMixin):
 
         .. versionadded:: 1.3.0
 
+        .. versionchanged:: 3.2.0
+            The records are transferred as Arrow record batches when
+            ``spark.sql.execution.arrow.pyspark.enabled`` and
+            ``spark.sql.execution.arrow.pyspark.collect.enabled`` are set.
+
         Examples
         --------
         >>> df.collect()
         [Row(age=2, name='Alice'), Row(age=5, name='Bob')]
         """
+        if self._can_collect_rows_as_arrow():
+            return self._collect_rows_as_arrow()
         with SCCallSiteSync(self._sc) as css:
             sock_info = self._jdf.collectToPython()
         return list(_load_from_socket(sock_info, BatchedSerializer(PickleSerializer())))
@@ -4928,7 +4928,7 @@ def bucket(numBuckets, col):
 
 # ---------------------------- User Defined Function ----------------------------------
 
-def udf(f=None, returnType=StringType()):
+def udf(f=None, returnType=StringType(), *, useArrow=None):
     """Creates a user defined function (UDF).
 
     .. versionadded:: 1.3.0
@@ -4940,6 +4940,13 @@ def udf(f=None, returnType=StringType()):
     returnType : :class:`pyspark.sql.types.DataType` or str
         the return type of the user-defined function. The value can be either a
         :class:`pyspark.sql.types.DataType` object or a DDL-formatted type string.
+    useArrow : bool, optional
+        whether to exchange the input and output of the function with the Python worker
+        as Arrow record batches instead of pickled rows. The function is still called
+        once per row. If not set, `spark.sql.execution.pythonUDF.arrow.enabled` of the
+        session the function is first used in decides. This requires PyArrow.
+
+        .. versionadded:: 3.2.0
 
     Examples
     --------
@@ -4979,6 +4986,11 @@ def udf(f=None, returnType=StringType()):
     can fail on special rows, the workaround is to incorporate the condition into the functions.
 
     The user-defined functions do not take keyword arguments on the calling side.
+
+    With Arrow enabled, the input values are converted from Arrow and the returned values
+    are converted to Arrow in the Python worker. A returned value whose Python type does
+    not match the return type becomes null, like without Arrow, except for
+    :class:`StringType` where it is converted with `str`.
     """
 
     # The following table shows most of Python data and SQL type conversions in normal UDFs that
@@ -5017,11 +5029,18 @@ def udf(f=None, returnType=StringType()):
         # If DataType has been passed as a positional argument
         # for decorator use it as a returnType
         return_type = f or returnType
-        return functools.partial(_create_udf, returnType=return_type,
-                                 evalType=PythonEvalType.SQL_BATCHED_UDF)
+        return functools.partial(_create_py_udf, returnType=return_type, useArrow=useArrow)
+    else:
+        return _create_py_udf(f=f, returnType=returnType, useArrow=useArrow)
+
+
+def _create_py_udf(f, returnType, useArrow):
+    # If useArrow is None, the SQL conf is resolved when the UDF is first used.
+    if useArrow:
+        eval_type = PythonEvalType.SQL_ARROW_BATCHED_UDF
     else:
-        return _create_udf(f=f, returnType=returnType,
-                           evalType=PythonEvalType.SQL_BATCHED_UDF)
+        eval_type = PythonEvalType.SQL_BATCHED_UDF
+    return _create_udf(f=f, returnType=returnType, evalType=eval_type, useArrow=useArrow)
 
 
 def _test():
@@ -357,14 +357,20 @@ def var_samp(col: ColumnOrName) -> Column: ...
 def variance(col: ColumnOrName) -> Column: ...
 @overload
 def udf(
-    f: Callable[..., Any], returnType: DataTypeOrString = ...
+    f: Callable[..., Any],
+    returnType: DataTypeOrString = ...,
+    *,
+    useArrow: Optional[bool] = ...,
 ) -> Callable[..., Column]: ...
 @overload
 def udf(
     f: DataTypeOrString = ...,
+    *,
+    useArrow: Optional[bool] = ...,
 ) -> Callable[[Callable[..., Any]], Callable[..., Column]]: ...
 @overload
 def udf(
     *,
     returnType: DataTypeOrString = ...,
+    useArrow: Optional[bool] = ...,
 ) -> Callable[[Callable[..., Any]], Callable[..., Column]]: ...
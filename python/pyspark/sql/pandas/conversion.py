@@ -18,8 +18,8 @@ import sys
 import warnings
 from collections import Counter
 
-from pyspark.rdd import _load_from_socket
-from pyspark.sql.pandas.serializers import ArrowCollectSerializer
+from pyspark.rdd import _load_from_socket, _local_iterator_from_socket
+from pyspark.sql.pandas.serializers import ArrowCollectSerializer, ArrowBatchMessageSerializer
 from pyspark.sql.types import IntegralType
 from pyspark.sql.types import ByteType, ShortType, IntegerType, LongType, FloatType, \
     DoubleType, BooleanType, MapType, TimestampType, StructType, DataType
@@ -100,8 +100,6 @@ class PandasConversionMixin(object):
             # of PyArrow is found, if 'spark.sql.execution.arrow.pyspark.enabled' is enabled.
             if use_arrow:
                 try:
-                    from pyspark.sql.pandas.types import _check_series_localize_timestamps, \
-                        _convert_map_items_to_dict
                     import pyarrow
                     # Rename columns to avoid duplicated column names.
                     tmp_column_names = ['col_{}'.format(i) for i in range(len(self.columns))]
@@ -113,10 +111,7 @@ class PandasConversionMixin(object):
                         # Ensure only the table has a reference to the batches, so that
                         # self_destruct (if enabled) is effective
                         del batches
-                        # Pandas DataFrame created from PyArrow uses datetime64[ns] for date type
-                        # values, but we should use datetime.date to match the behavior with when
-                        # Arrow optimization is disabled.
-                        pandas_options = {'date_as_object': True}
+                        pandas_options = {}
                         if self_destruct:
                             # Configure PyArrow to use as little memory as possible:
                             # self_destruct - free columns as they are converted
@@ -127,17 +122,7 @@ class PandasConversionMixin(object):
                                 'split_blocks': True,
                                 'use_threads': False,
                             })
-                        pdf = table.to_pandas(**pandas_options)
-                        # Rename back to the original column names.
-                        pdf.columns = self.columns
-                        for field in self.schema:
-                            if isinstance(field.dataType, TimestampType):
-                                pdf[field.name] = \
-                                    _check_series_localize_timestamps(pdf[field.name], timezone)
-                            elif isinstance(field.dataType, MapType):
-                                pdf[field.name] = \
-                                    _convert_map_items_to_dict(pdf[field.name])
-                        return pdf
+                        return self._arrow_to_pandas(table, timezone, **pandas_options)
                     else:
                         return pd.DataFrame.from_records([], columns=self.columns)
                 except Exception as e:
@@ -214,6 +199,29 @@ class PandasConversionMixin(object):
                         _check_series_convert_timestamps_local_tz(pdf[field.name], timezone)
             return pdf
 
+    def _arrow_to_pandas(self, table, timezone, **pandas_options):
+        """
+        Converts a pyarrow Table or RecordBatch with the columns of this :class:`DataFrame`,
+        possibly renamed, to a pandas DataFrame with the original column names.
+        """
+        from pyspark.sql.pandas.types import _check_series_localize_timestamps, \
+            _convert_map_items_to_dict
+
+        # Pandas DataFrame created from PyArrow uses datetime64[ns] for date type
+        # values, but we should use datetime.date to match the behavior with when
+        # Arrow optimization is disabled.
+        pdf = table.to_pandas(date_as_object=True, **pandas_options)
+        # Rename back to the original column names.
+        pdf.columns = self.columns
+        for field in self.schema:
+            if isinstance(field.dataType, TimestampType):
+                pdf[field.name] = \
+                    _check_series_localize_timestamps(pdf[field.name], timezone)
+            elif isinstance(field.dataType, MapType):
+                pdf[field.name] = \
+                    _convert_map_items_to_dict(pdf[field.name])
+        return pdf
+
     @staticmethod
     def _to_corrected_pandas_type(dt):
         """
@@ -241,6 +249,134 @@ class PandasConversionMixin(object):
         else:
             return None
 
+    def toArrowBatchIterator(self, prefetchPartitions=0, asPandas=False):
+        """
+        Returns an iterator of the contents of this :class:`DataFrame` as Arrow record batches,
+        or as pandas DataFrames of the batches if ``asPandas`` is set. The partitions are
+        collected one by one, as with :meth:`DataFrame.toLocalIterator`, and each of them is
+        split into batches of at most ``spark.sql.execution.arrow.maxRecordsPerBatch`` rows.
+
+        This is only available if PyArrow, and Pandas for ``asPandas``, are installed and
+        available.
+
+        .. versionadded:: 3.2.0
+
+        Parameters
+        ----------
+        prefetchPartitions : int, optional
+            The number of partitions to collect ahead of the one being iterated. The driver holds
+            up to ``prefetchPartitions + 1`` partitions at a time.
+        asPandas : bool, optional
+            Whether to yield pandas DataFrames, with the same types as :meth:`toPandas`,
+            instead of `pyarrow.RecordBatch`.
+
+        Examples
+        --------
+        >>> [batch.num_rows for batch in df.toArrowBatchIterator()]  # doctest: +SKIP
+        [1, 1]
+        >>> list(df.toArrowBatchIterator(asPandas=True))[0]  # doctest: +SKIP
+           age   name
+        0    2  Alice
+        """
+        from pyspark.sql.dataframe import DataFrame
+
+        assert isinstance(self, DataFrame)
+
+        from pyspark.sql.pandas.types import to_arrow_schema
+        from pyspark.sql.pandas.utils import require_minimum_pyarrow_version
+        require_minimum_pyarrow_version()
+        if asPandas:
+            from pyspark.sql.pandas.utils import require_minimum_pandas_version
+            require_minimum_pandas_version()
+
+        if not isinstance(prefetchPartitions, int) or prefetchPartitions < 0:
+            raise ValueError("prefetchPartitions should be a non-negative int, got %r"
+                             % (prefetchPartitions, ))
+
+        schema = to_arrow_schema(self.schema)
+        with SCCallSiteSync(self._sc):
+            sock_info = self._jdf.toArrowBatchIterator(prefetchPartitions)
+        batches = _local_iterator_from_socket(sock_info, ArrowBatchMessageSerializer(schema))
+        if not asPandas:
+            return batches
+        return self._arrow_batches_to_pandas(batches)
+
+    def _arrow_batches_to_pandas(self, batches):
+        import pyarrow
+
+        timezone = self.sql_ctx._conf.sessionLocalTimeZone()
+        # Rename columns to avoid duplicated column names.
+        tmp_column_names = ['col_{}'.format(i) for i in range(len(self.columns))]
+        for batch in batches:
+            batch = pyarrow.RecordBatch.from_arrays(batch.columns, tmp_column_names)
+            yield self._arrow_to_pandas(batch, timezone)
+
+    def _can_collect_rows_as_arrow(self):
+        """
+        Returns whether :meth:`DataFrame.collect` should transfer the rows as Arrow record
+        batches, i.e. 'spark.sql.execution.arrow.pyspark.enabled' and
+        'spark.sql.execution.arrow.pyspark.collect.enabled' are set, and pyarrow supports
+        the schema. Otherwise, it warns and falls back, or raises as
+        'spark.sql.execution.arrow.pyspark.fallback.enabled' allows.
+        """
+        from pyspark.sql.dataframe import DataFrame
+
+        assert isinstance(self, DataFrame)
+
+        conf = self.sql_ctx._conf
+        if not (conf.arrowPySparkEnabled() and conf.arrowPySparkCollectEnabled()):
+            return False
+        try:
+            from pyspark.sql.pandas.types import to_arrow_schema
+            from pyspark.sql.pandas.utils import require_minimum_pyarrow_version
+
+            require_minimum_pyarrow_version()
+            to_arrow_schema(self.schema)
+        except Exception as e:
+            if conf.arrowPySparkFallbackEnabled():
+                msg = (
+                    "collect attempted Arrow optimization because "
+                    "'spark.sql.execution.arrow.pyspark.collect.enabled' is set to true; "
+                    "however, failed by the reason below:\n  %s\n"
+                    "Attempting non-optimization as "
+                    "'spark.sql.execution.arrow.pyspark.fallback.enabled' is set to "
+                    "true." % str(e))
+                warnings.warn(msg)
+                return False
+            msg = (
+                "collect attempted Arrow optimization because "
+                "'spark.sql.execution.arrow.pyspark.collect.enabled' is set to true, but has "
+                "reached the error below and will not continue because automatic fallback "
+                "with 'spark.sql.execution.arrow.pyspark.fallback.enabled' has been set to "
+                "false.\n  %s" % str(e))
+            warnings.warn(msg)
+            raise
+        return True
+
+    def _collect_rows_as_arrow(self):
+        """
+        Returns all records as a list of :class:`Row`, built in bulk from the columns of the
+        Arrow record batches returned by :meth:`_collect_as_arrow`. The values are the same
+        as without Arrow, e.g., timezone-naive local timestamps and bytearrays for binaries.
+        """
+        from pyspark.sql.pandas.types import _create_converter_from_arrow
+        from pyspark.sql.types import _create_row_class
+
+        row_class = _create_row_class(self.columns)
+        converters = None
+        rows = []
+        for batch in self._collect_as_arrow():
+            if converters is None:
+                converters = [_create_converter_from_arrow(c.type) for c in batch.columns]
+            columns = []
+            for column, converter in zip(batch.columns, converters):
+                values = column.to_pylist()
+                if converter is not None:
+                    values = [converter(v) for v in values]
+                columns.append(values)
+            rows.extend(tuple.__new__(row_class, values) for values in zip(*columns))
+        return rows
+
     def _collect_as_arrow(self, split_batches=False):
         """
         Returns all records as a list of ArrowRecordBatches, pyarrow must be installed
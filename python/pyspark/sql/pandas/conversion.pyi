@@ -17,7 +17,8 @@
 # under the License.
 
 from typing import overload
-from typing import Optional, Union
+from typing import Any, Iterator, Optional, Union
+from typing_extensions import Literal
 
 from pyspark.sql.pandas._typing import DataFrameLike
 from pyspark import since as since  # noqa: F401
@@ -25,6 +26,7 @@ from pyspark.rdd import RDD  # noqa: F401
 import pyspark.sql.dataframe
 from pyspark.sql.pandas.serializers import (  # noqa: F401
     ArrowCollectSerializer as ArrowCollectSerializer,
+    ArrowBatchMessageSerializer as ArrowBatchMessageSerializer,
 )
 from pyspark.sql.types import (  # noqa: F401
     BooleanType as BooleanType,
@@ -43,6 +45,18 @@ from pyspark.traceback_utils import SCCallSiteSync as SCCallSiteSync  # noqa: F4
 
 class PandasConversionMixin:
     def toPandas(self) -> DataFrameLike: ...
+    @overload
+    def toArrowBatchIterator(
+        self, prefetchPartitions: int = ..., asPandas: Literal[False] = ...
+    ) -> Iterator[Any]: ...
+    @overload
+    def toArrowBatchIterator(
+        self, prefetchPartitions: int = ..., *, asPandas: Literal[True]
+    ) -> Iterator[DataFrameLike]: ...
+    @overload
+    def toArrowBatchIterator(
+        self, prefetchPartitions: int, asPandas: Literal[True]
+    ) -> Iterator[DataFrameLike]: ...
 
 class SparkConversionMixin:
     @overload
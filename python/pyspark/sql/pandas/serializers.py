@@ -19,7 +19,8 @@
 Serializers for PyArrow and pandas conversions. See `pyspark.serializers` for more details.
 """
 
-from pyspark.serializers import Serializer, read_int, write_int, UTF8Deserializer
+from pyspark.serializers import Serializer, FramedSerializer, read_int, write_int, \
+    UTF8Deserializer
 
 
 class SpecialLengths(object):
@@ -69,6 +70,27 @@ class ArrowCollectSerializer(Serializer):
         return "ArrowCollectSerializer(%s)" % self.serializer
 
 
+class ArrowBatchMessageSerializer(FramedSerializer):
+    """
+    Serializes Arrow record batches as messages without the schema, framed with their lengths.
+    Used in PandasConversionMixin.toArrowBatchIterator() after invoking
+    Dataset.toArrowBatchIterator() in the JVM.
+    """
+
+    def __init__(self, schema):
+        self._schema = schema
+
+    def dumps(self, batch):
+        return batch.serialize().to_pybytes()
+
+    def loads(self, obj):
+        import pyarrow as pa
+        return pa.ipc.read_record_batch(pa.py_buffer(obj), self._schema)
+
+    def __repr__(self):
+        return "ArrowBatchMessageSerializer"
+
+
 class ArrowStreamSerializer(Serializer):
     """
     Serializes Arrow record batches as a stream.
@@ -276,6 +298,58 @@ class ArrowStreamPandasUDFSerializer(ArrowStreamPandasSerializer):
         return "ArrowStreamPandasUDFSerializer"
 
 
+class ArrowStreamUDFSerializer(ArrowStreamSerializer):
+    """
+    Serializer used by Python worker to evaluate row-at-a-time Python UDFs with Arrow. Each
+    record batch is loaded as a pair of the number of rows and a list of columns, where a column
+    is a list of Python values. Output is a list of (values, arrow_type) pairs, one per UDF.
+    """
+
+    def _create_batch(self, results):
+        import pyarrow as pa
+        arrs = [pa.array(values, type=arrow_type) for values, arrow_type in results]
+        return pa.RecordBatch.from_arrays(arrs, ["_%d" % i for i in range(len(arrs))])
+
+    def dump_stream(self, iterator, stream):
+        """
+        Same as :meth:`ArrowStreamPandasUDFSerializer.dump_stream`, a START_ARROW_STREAM is sent
+        once the first record batch is created.
+        """
+
+        def init_stream_yield_batches():
+            should_write_start_length = True
+            for results in iterator:
+                batch = self._create_batch(results)
+                if should_write_start_length:
+                    write_int(SpecialLengths.START_ARROW_STREAM, stream)
+                    should_write_start_length = False
+                yield batch
+
+        return super(ArrowStreamUDFSerializer, self).dump_stream(
+            init_stream_yield_batches(), stream)
+
+    def load_stream(self, stream):
+        """
+        Deserialize ArrowRecordBatches and yield the number of rows with the columns as lists of
+        Python values.
+        """
+        from pyspark.sql.pandas.types import _create_converter_from_arrow
+        converters = None
+        for batch in super(ArrowStreamUDFSerializer, self).load_stream(stream):
+            if converters is None:
+                converters = [_create_converter_from_arrow(c.type) for c in batch.columns]
+            columns = []
+            for column, converter in zip(batch.columns, converters):
+                values = column.to_pylist()
+                if converter is not None:
+                    values = [converter(v) for v in values]
+                columns.append(values)
+            yield batch.num_rows, columns
+
+    def __repr__(self):
+        return "ArrowStreamUDFSerializer"
+
+
 class CogroupUDFSerializer(ArrowStreamPandasUDFSerializer):
 
     def load_stream(self, stream):
@@ -346,3 +346,122 @@ def _convert_dict_to_map_items(s):
     :return: pandas.Series of lists of (key, value) pairs
     """
     return s.apply(lambda d: list(d.items()) if d is not None else None)
+
+
+def _create_converter_from_arrow(at):
+    """
+    Create a converter of the Python values produced by `pyarrow.Array.to_pylist` for the given
+    Arrow type to the values a non-Arrow Python UDF receives, e.g., timezone-naive local
+    timestamps, bytearrays, dicts for maps and Rows for structs.
+    :param at: pyarrow.DataType
+    :return: a function taking a single value, or None if no conversion is needed
+    """
+    import calendar
+    import pyarrow.types as types
+    from pyspark.sql.types import _create_row
+
+    if types.is_timestamp(at):
+        timestamp_type = TimestampType()
+
+        def convert_timestamp(v):
+            if v is None:
+                return None
+            # Older pyarrow returns timezone-naive values in UTC.
+            micros = calendar.timegm(v.utctimetuple()) * 1000000 + v.microsecond
+            return timestamp_type.fromInternal(micros)
+        return convert_timestamp
+    elif types.is_binary(at):
+        return lambda v: None if v is None else bytearray(v)
+    elif types.is_list(at):
+        element_converter = _create_converter_from_arrow(at.value_type)
+        if element_converter is None:
+            return None
+        return lambda v: None if v is None else [element_converter(e) for e in v]
+    elif types.is_map(at):
+        key_converter = _create_converter_from_arrow(at.key_type) or (lambda k: k)
+        value_converter = _create_converter_from_arrow(at.item_type) or (lambda x: x)
+        return lambda v: None if v is None else \
+            {key_converter(k): value_converter(x) for k, x in v}
+    elif types.is_struct(at):
+        names = [field.name for field in at]
+        converters = [_create_converter_from_arrow(field.type) or (lambda x: x) for field in at]
+        return lambda v: None if v is None else \
+            _create_row(names, [c(v[n]) for n, c in zip(names, converters)])
+    elif types.is_dictionary(at):
+        return _create_converter_from_arrow(at.value_type)
+    return None
+
+
+def _create_converter_to_arrow(dt):
+    """
+    Create a converter of values returned by a Python UDF with the given Spark return type to
+    the values `pyarrow.array` accepts for :meth:`to_arrow_type` of it. As with non-Arrow Python
+    UDFs, a value whose Python type does not match the return type is converted to None, except
+    for `StringType` where `str` is applied.
+    :param dt: Spark data type
+    :return: a function taking a single value
+    """
+    import array
+    import datetime
+    import decimal
+
+    if type(dt) == BooleanType:
+        return lambda v: v if isinstance(v, bool) else None
+    elif type(dt) in [ByteType, ShortType, IntegerType, LongType]:
+        return lambda v: v if isinstance(v, int) and not isinstance(v, bool) else None
+    elif type(dt) in [FloatType, DoubleType]:
+        return lambda v: v if isinstance(v, float) else None
+    elif type(dt) == DecimalType:
+        return lambda v: v if isinstance(v, decimal.Decimal) else None
+    elif type(dt) == StringType:
+        return lambda v: v if v is None or isinstance(v, str) else str(v)
+    elif type(dt) == BinaryType:
+
+        def convert_binary(v):
+            if isinstance(v, (bytes, bytearray)):
+                return bytes(v)
+            elif isinstance(v, str):
+                return v.encode("utf-8")
+            return None
+        return convert_binary
+    elif type(dt) == DateType:
+
+        def convert_date(v):
+            if isinstance(v, datetime.datetime):
+                return v.date()
+            elif isinstance(v, datetime.date):
+                return v
+            return None
+        return convert_date
+    elif type(dt) == TimestampType:
+        return lambda v: dt.toInternal(v) if isinstance(v, datetime.datetime) else None
+    elif type(dt) == ArrayType:
+        element_converter = _create_converter_to_arrow(dt.elementType)
+
+        def convert_array(v):
+            if isinstance(v, (list, tuple, array.array, bytearray)):
+                return [element_converter(e) for e in v]
+            return None
+        return convert_array
+    elif type(dt) == MapType:
+        key_converter = _create_converter_to_arrow(dt.keyType)
+        value_converter = _create_converter_to_arrow(dt.valueType)
+        return lambda v: [(key_converter(k), value_converter(x)) for k, x in v.items()] \
+            if isinstance(v, dict) else None
+    elif type(dt) == StructType:
+        names = dt.names
+        converters = [_create_converter_to_arrow(f.dataType) for f in dt.fields]
+
+        def convert_struct(v):
+            if isinstance(v, dict):
+                values = [v.get(n) for n in names]
+            elif isinstance(v, (tuple, list)):
+                values = v
+            elif hasattr(v, "__dict__"):
+                values = [v.__dict__.get(n) for n in names]
+            else:
+                return None
+            return {n: c(x) for n, c, x in zip(names, converters, values)}
+        return convert_struct
+    else:
+        return lambda v: None
@@ -17,19 +17,20 @@
 
 import sys
 import warnings
-from functools import reduce
+from itertools import chain
 from threading import RLock
 
 from pyspark import since
 from pyspark.rdd import RDD
+from pyspark.rddsampler import RDDSampler
 from pyspark.sql.conf import RuntimeConfig
 from pyspark.sql.dataframe import DataFrame
 from pyspark.sql.pandas.conversion import SparkConversionMixin
 from pyspark.sql.readwriter import DataFrameReader
 from pyspark.sql.streaming import DataStreamReader
 from pyspark.sql.types import DataType, StructType, \
-    _make_type_verifier, _infer_schema, _has_nulltype, _merge_type, _create_converter, \
-    _parse_datatype_string
+    _make_struct_converter, _infer_schema, _infer_schema_from_rows, _has_nulltype, \
+    _merge_type, _create_converter, _parse_datatype_string
 from pyspark.sql.utils import install_exception_handler
 
 __all__ = ["SparkSession"]
@@ -419,7 +420,7 @@ class SparkSession(SparkConversionMixin):
 
         return DataFrame(jdf, self._wrapped)
 
-    def _inferSchemaFromList(self, data, names=None):
+    def _inferSchemaFromList(self, data, names=None, samplingRatio=None):
         """
         Infer schema from list of Row, dict, or tuple.
 
@@ -429,6 +430,9 @@ class SparkSession(SparkConversionMixin):
             list of Row, dict, or tuple
         names : list, optional
             list of column names
+        samplingRatio : float, optional
+            sampling ratio, or no sampling (default). With sampling, the inference also stops
+            once the schema has no NullType and has not changed for 100 sampled rows.
 
         Returns
         -------
@@ -436,7 +440,12 @@ class SparkSession(SparkConversionMixin):
         """
         if not data:
             raise ValueError("can not infer schema from empty dataset")
-        schema = reduce(_merge_type, (_infer_schema(row, names) for row in data))
+        if samplingRatio is not None and samplingRatio < 0.99:
+            # the first row makes sure that some row is sampled
+            rows = chain(data[:1], RDDSampler(False, float(samplingRatio)).func(0, iter(data)))
+            schema = _infer_schema_from_rows(rows, names, stable_rows=100)
+        else:
+            schema = _infer_schema_from_rows(data, names)
         if _has_nulltype(schema):
             raise ValueError("Some of types cannot be determined after inferring")
         return schema
@@ -478,7 +487,7 @@ class SparkSession(SparkConversionMixin):
             schema = rdd.map(lambda row: _infer_schema(row, names)).reduce(_merge_type)
         return schema
 
-    def _createFromRDD(self, rdd, schema, samplingRatio):
+    def _createFromRDD(self, rdd, schema, samplingRatio, verifySchema=False):
         """
         Create an RDD for DataFrame from an existing RDD, returns the RDD and schema.
         """
@@ -495,11 +504,11 @@ class SparkSession(SparkConversionMixin):
         elif not isinstance(schema, StructType):
             raise TypeError("schema should be StructType or list or None, but got: %s" % schema)
 
-        # convert python objects to sql data
-        rdd = rdd.map(schema.toInternal)
+        # verify and convert python objects to sql data
+        rdd = rdd.map(_make_struct_converter(schema, verifySchema))
         return rdd, schema
 
-    def _createFromLocal(self, data, schema):
+    def _createFromLocal(self, data, schema, samplingRatio=None, verifySchema=False):
         """
         Create an RDD for DataFrame from a list or pandas.DataFrame, returns
         the RDD and schema.
@@ -509,7 +518,7 @@ class SparkSession(SparkConversionMixin):
             data = list(data)
 
         if schema is None or isinstance(schema, (list, tuple)):
-            struct = self._inferSchemaFromList(data, names=schema)
+            struct = self._inferSchemaFromList(data, names=schema, samplingRatio=samplingRatio)
             converter = _create_converter(struct)
             data = map(converter, data)
             if isinstance(schema, (list, tuple)):
@@ -521,8 +530,9 @@ class SparkSession(SparkConversionMixin):
         elif not isinstance(schema, StructType):
             raise TypeError("schema should be StructType or list or None, but got: %s" % schema)
 
-        # convert python objects to sql data
-        data = [schema.toInternal(row) for row in data]
+        # verify and convert python objects to sql data
+        converter = _make_struct_converter(schema, verifySchema)
+        data = [converter(row) for row in data]
         return self._sc.parallelize(data), schema
 
     @staticmethod
@@ -570,13 +580,17 @@ class SparkSession(SparkConversionMixin):
         Each record will also be wrapped into a tuple, which can be converted to row later.
 
         If schema inference is needed, ``samplingRatio`` is used to determined the ratio of
-        rows used for schema inference. The first row will be used if ``samplingRatio`` is ``None``.
+        rows used for schema inference. The first row will be used if ``samplingRatio`` is ``None``,
+        or all the rows of a local list.
 
         .. versionadded:: 2.0.0
 
         .. versionchanged:: 2.1.0
            Added verifySchema.
 
+        .. versionchanged:: 3.2.0
+           ``samplingRatio`` also applies to local data.
+
         Parameters
         ----------
         data : :class:`RDD` or iterable
@@ -676,28 +690,23 @@ class SparkSession(SparkConversionMixin):
 
     def _create_dataframe(self, data, schema, samplingRatio, verifySchema):
         if isinstance(schema, StructType):
-            verify_func = _make_type_verifier(schema) if verifySchema else lambda _: True
-
-            def prepare(obj):
-                verify_func(obj)
-                return obj
+            prepare = None
         elif isinstance(schema, DataType):
-            dataType = schema
             schema = StructType().add("value", schema)
-
-            verify_func = _make_type_verifier(
-                dataType, name="field value") if verifySchema else lambda _: True
-
-            def prepare(obj):
-                verify_func(obj)
-                return obj,
+            prepare = lambda obj: (obj,)
         else:
-            prepare = lambda obj: obj
+            # the data is not verified against an inferred schema
+            verifySchema = False
+            prepare = None
 
         if isinstance(data, RDD):
-            rdd, schema = self._createFromRDD(data.map(prepare), schema, samplingRatio)
+            if prepare is not None:
+                data = data.map(prepare)
+            rdd, schema = self._createFromRDD(data, schema, samplingRatio, verifySchema)
         else:
-            rdd, schema = self._createFromLocal(map(prepare, data), schema)
+            if prepare is not None:
+                data = map(prepare, data)
+            rdd, schema = self._createFromLocal(data, schema, samplingRatio, verifySchema)
         jrdd = self._jvm.SerDeUtil.toJavaArray(rdd._to_java_object_rdd())
         jdf = self._jsparkSession.applySchemaToPythonRDD(jrdd.rdd(), schema.json())
         df = DataFrame(jdf, self._wrapped)
@@ -145,6 +145,67 @@ class ArrowTests(ReusedSQLTestCase):
                 with self.assertRaisesRegex(Exception, 'Unsupported type'):
                     df.toPandas()
 
+    def test_collect_arrow_toggle(self):
+        schema = StructType(
+            self.schema.fields + [StructField("11_array_t", ArrayType(DateType()), True)])
+        data = [d + ([d[6]],) for d in self.data] + [(None,) * len(schema)]
+        df = self.spark.createDataFrame(data, schema=schema).repartition(3)
+        with self.sql_conf({"spark.sql.execution.arrow.pyspark.collect.enabled": False}):
+            expected = df.sort("2_int_t").collect()
+        with self.sql_conf({"spark.sql.execution.arrow.pyspark.collect.enabled": True}):
+            rows = df.sort("2_int_t").collect()
+            self.assertEqual(rows, expected)
+            self.assertEqual([r.asDict() for r in rows], [r.asDict() for r in expected])
+            self.assertEqual(df.sort("2_int_t").take(2), expected[:2])
+            self.assertEqual(df.sort("2_int_t").head(), expected[0])
+            self.assertEqual(df.filter("2_int_t > 10").collect(), [])
+            self.assertEqual(df.select("1_str_t", "1_str_t").sort("1_str_t").first(),
+                             Row("1_str_t", "1_str_t")(None, None))
+
+    def test_collect_fallback(self):
+        ts = datetime.datetime(2015, 11, 1, 0, 30)
+        schema = StructType([StructField("a", ArrayType(TimestampType()), True)])
+        df = self.spark.createDataFrame([([ts],)], schema=schema)
+        with self.sql_conf({"spark.sql.execution.arrow.pyspark.collect.enabled": True}):
+            with QuietTest(self.sc):
+                with self.warnings_lock:
+                    with self.assertRaisesRegex(Exception, 'Unsupported type'):
+                        df.collect()
+            with self.sql_conf({"spark.sql.execution.arrow.pyspark.fallback.enabled": True}):
+                with self.warnings_lock:
+                    with warnings.catch_warnings(record=True) as warns:
+                        warnings.simplefilter("always")
+                        self.assertEqual(df.collect(), [Row(a=[ts])])
+                        self.assertTrue(
+                            any("Attempting non-optimization" in str(w.message) for w in warns))
+
+    def test_arrow_batch_iterator(self):
+        df = self.spark.createDataFrame(self.data, schema=self.schema).repartition(3)
+        with self.sql_conf({"spark.sql.execution.arrow.maxRecordsPerBatch": 1}):
+            expected = df.collect()
+            batches = list(df.toArrowBatchIterator())
+            self.assertTrue(all(batch.num_rows == 1 for batch in batches))
+            table = pa.Table.from_batches(batches)
+            self.assertEqual(table.schema.names, self.schema.names)
+            self.assertEqual(table.num_rows, len(expected))
+            self.assertEqual(table.column("2_int_t").to_pylist(), [r[1] for r in expected])
+
+            for prefetch in [0, 1, 5]:
+                pdfs = list(df.toArrowBatchIterator(prefetch, asPandas=True))
+                self.assertEqual(len(pdfs), len(batches))
+                assert_frame_equal(
+                    pd.concat(pdfs, ignore_index=True), df.toPandas(), check_dtype=False)
+
+        self.assertEqual(list(df.filter("2_int_t > 10").toArrowBatchIterator()), [])
+        self.assertRaises(ValueError, lambda: df.toArrowBatchIterator(-1))
+
+    def test_arrow_batch_iterator_partial_consume(self):
+        df = self.spark.range(100, numPartitions=10)
+        it = df.toArrowBatchIterator(prefetchPartitions=2)
+        self.assertEqual(next(it).column(0).to_pylist(), list(range(10)))
+        del it
+        self.assertEqual(df.count(), 100)
+
     def test_null_conversion(self):
         df_null = self.spark.createDataFrame(
             [tuple([None for _ in range(len(self.data_wo_null[0]))])] + self.data_wo_null)
@@ -0,0 +1,131 @@
+#
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import datetime
+import unittest
+from decimal import Decimal
+
+from pyspark.rdd import PythonEvalType
+from pyspark.sql import Row
+from pyspark.sql.functions import udf, col, struct, array, create_map, lit
+from pyspark.sql.types import IntegerType, LongType, StringType, BinaryType, ArrayType, \
+    MapType, StructType, StructField, TimestampType, DateType, DecimalType, DoubleType
+from pyspark.testing.sqlutils import ReusedSQLTestCase, have_pyarrow, \
+    pyarrow_requirement_message
+
+
+@unittest.skipIf(not have_pyarrow, pyarrow_requirement_message)  # type: ignore[arg-type]
+class ArrowPythonUDFTests(ReusedSQLTestCase):
+
+    def test_eval_type(self):
+        self.assertEqual(
+            udf(lambda x: x, "int", useArrow=True).evalType,
+            PythonEvalType.SQL_ARROW_BATCHED_UDF)
+        self.assertEqual(
+            udf(lambda x: x, "int", useArrow=False).evalType, PythonEvalType.SQL_BATCHED_UDF)
+
+        # The conf is resolved when the UDF is first used, not when it is defined.
+        @udf(returnType="int")
+        def plus_one(x):
+            return x + 1
+        explicit = udf(lambda x: x, "int", useArrow=False)
+        with self.sql_conf({"spark.sql.execution.pythonUDF.arrow.enabled": True}):
+            self.assertEqual(
+                plus_one._unwrapped._judf.pythonEvalType(), PythonEvalType.SQL_ARROW_BATCHED_UDF)
+            self.assertEqual(
+                explicit._unwrapped._judf.pythonEvalType(), PythonEvalType.SQL_BATCHED_UDF)
+            self.assertEqual(self.spark.range(1).select(plus_one("id")).first()[0], 1)
+        self.assertEqual(
+            udf(lambda x: x, "int")._unwrapped._judf.pythonEvalType(),
+            PythonEvalType.SQL_BATCHED_UDF)
+
+    def test_same_result_as_pickled_udf(self):
+        df = self.spark.range(10).select(
+            col("id"),
+            col("id").cast("string").alias("s"),
+            (col("id") / 3).alias("d"),
+            array(col("id"), lit(None).cast("long")).alias("arr"),
+            create_map(col("id").cast("string"), col("id")).alias("m"),
+            struct(col("id").alias("a"), col("id").cast("string").alias("b")).alias("st"))
+
+        def f(i, s, d, arr, m, st):
+            if i % 4 == 0:
+                return None
+            return "%s|%s|%.2f|%s|%s|%s|%s" % (
+                i, s, d, arr, sorted(m.items()), st.a, st.b)
+
+        expected = df.select(udf(f, useArrow=False)(*df.columns).alias("r")).collect()
+        actual = df.select(udf(f, useArrow=True)(*df.columns).alias("r")).collect()
+        self.assertEqual(expected, actual)
+
+    def test_return_types(self):
+        ts = datetime.datetime(2021, 3, 4, 5, 6, 7, 8)
+        df = self.spark.range(3)
+        for return_type, func in [
+                (LongType(), lambda i: i * 2),
+                (IntegerType(), lambda i: None if i == 1 else int(i)),
+                (DoubleType(), lambda i: i / 2),
+                (StringType(), lambda i: i),
+                (BinaryType(), lambda i: bytearray([i])),
+                (DecimalType(10, 2), lambda i: Decimal("%d.25" % i)),
+                (DateType(), lambda i: datetime.date(2021, 1, i + 1)),
+                (TimestampType(), lambda i: ts),
+                (ArrayType(LongType()), lambda i: [i, i + 1]),
+                (MapType(StringType(), LongType()), lambda i: {"k": i}),
+                (StructType([StructField("a", LongType()), StructField("b", StringType())]),
+                 lambda i: Row(a=i, b=str(i)))]:
+            expected = df.select(
+                udf(func, return_type, useArrow=False)("id").alias("r")).collect()
+            actual = df.select(udf(func, return_type, useArrow=True)("id").alias("r")).collect()
+            self.assertEqual(expected, actual, str(return_type))
+
+    def test_mismatched_return_value(self):
+        df = self.spark.range(2)
+        self.assertEqual(
+            df.select(udf(lambda i: "x", "int", useArrow=True)("id")).collect(),
+            df.select(udf(lambda i: "x", "int", useArrow=False)("id")).collect())
+
+    def test_no_argument_and_multiple_udfs(self):
+        zero = udf(lambda: 0, "int", useArrow=True)
+        plus_one = udf(lambda x: x + 1, "long", useArrow=True)
+        row = self.spark.range(1, 2).select(zero(), plus_one("id"), plus_one(plus_one("id")))\
+            .first()
+        self.assertEqual(tuple(row), (0, 2, 3))
+
+    def test_unsupported_input_type(self):
+        from pyspark.testing.sqlutils import ExamplePoint
+        df = self.spark.createDataFrame([(ExamplePoint(1.0, 2.0),)], ["p"])
+        # UDFs over user-defined types are planned with pickled rows.
+        get_x = udf(lambda p: p.x, "double", useArrow=True)
+        self.assertEqual(df.select(get_x("p")).first()[0], 1.0)
+        plan = df.select(get_x("p"))._jdf.queryExecution().executedPlan().toString()
+        self.assertIn("BatchEvalPython", plan)
+
+    def test_register(self):
+        self.spark.udf.register("arrow_plus_one", udf(lambda x: x + 1, "long", useArrow=True))
+        self.assertEqual(self.spark.sql("SELECT arrow_plus_one(1)").first()[0], 2)
+
+
+if __name__ == "__main__":
+    from pyspark.sql.tests.test_arrow_python_udf import *  # noqa: F401
+
+    try:
+        import xmlrunner  # type: ignore[import]
+        testRunner = xmlrunner.XMLTestRunner(output='target/test-reports', verbosity=2)
+    except ImportError:
+        testRunner = None
+    unittest.main(testRunner=testRunner, verbosity=2)
@@ -23,6 +23,7 @@ import os
 import pickle
 import sys
 import unittest
+from unittest import mock
 
 from pyspark.sql import Row
 from pyspark.sql.functions import col
@@ -33,7 +34,8 @@ from pyspark.sql.types import ByteType, ShortType, IntegerType, FloatType, DateT
     DecimalType, BinaryType, BooleanType, NullType
 from pyspark.sql.types import (  # type: ignore
     _array_signed_int_typecode_ctype_mappings, _array_type_mappings,
-    _array_unsigned_int_typecode_ctype_mappings, _infer_type, _make_type_verifier, _merge_type
+    _array_unsigned_int_typecode_ctype_mappings, _infer_type, _make_type_verifier, _merge_type,
+    _infer_schema, _infer_schema_from_rows, _compile_struct_converter, _make_struct_converter
 )
 from pyspark.testing.sqlutils import ReusedSQLTestCase, ExamplePointUDT, PythonOnlyUDT, \
     ExamplePoint, PythonOnlyPoint, MyObject
@@ -179,6 +181,12 @@ class TypesTests(ReusedSQLTestCase):
         df = self.spark.createDataFrame([["a", "b"]], ["col1"])
         self.assertEqual(df.columns, ['col1', '_2'])
 
+    def test_infer_schema_from_local_sample(self):
+        data = [(i, None if i < 3 else str(i)) for i in range(10000)]
+        df = self.spark.createDataFrame(data, ["a", "b"], samplingRatio=0.1)
+        self.assertEqual(df.schema, self.spark.createDataFrame(data, ["a", "b"]).schema)
+        self.assertEqual(df.count(), 10000)
+
     def test_infer_schema_fails(self):
         with self.assertRaisesRegex(TypeError, 'field a'):
             self.spark.createDataFrame(self.spark.sparkContext.parallelize([[1, 1], ["x", 1]]),
@@ -785,6 +793,55 @@ class DataTypeTests(unittest.TestCase):
         row_class = Row("c1", "c2")
         self.assertRaises(ValueError, lambda: row_class(1, 2, 3))
 
+    def test_struct_type_from_internal(self):
+        schema = StructType([StructField("a", LongType()), StructField("count", StringType()),
+                             StructField("a", LongType())])
+        row = schema.fromInternal((1, "x", 3))
+        self.assertIsInstance(row, Row)
+        self.assertEqual(row, Row(a=1, count="x", a2=3))
+        self.assertEqual(repr(row), "Row(a=1, count='x', a=3)")
+        self.assertEqual((row.a, row["a"], row["count"], row[2]), (1, 1, "x", 3))
+        # the methods of Row are not shadowed by fields
+        self.assertEqual(row.count(1), 1)
+        self.assertEqual(row.asDict(), {"a": 3, "count": "x"})
+        self.assertTrue("count" in row)
+        self.assertFalse("b" in row)
+        self.assertRaises(AttributeError, lambda: row.b)
+        self.assertRaises(ValueError, lambda: row["b"])
+        self.assertFalse(row.__dict__)
+        self.assertIs(type(schema.fromInternal((2, "y", 4))), type(row))
+
+        pickled = pickle.loads(pickle.dumps(row))
+        self.assertEqual(pickled, row)
+        self.assertEqual(pickled.asDict(), row.asDict())
+        self.assertEqual(pickle.loads(pickle.dumps(schema)), schema)
+
+        schema.add("b", LongType())
+        self.assertEqual(schema.fromInternal((1, "x", 3, 4)).b, 4)
+
+    def test_infer_schema_from_rows(self):
+        from collections import namedtuple
+        from functools import reduce
+
+        Point = namedtuple("Point", ["x", "y"])
+        rows = [Point(1, None), Point(None, [None]), Point(2, [1]), Row(x=3, y=[2]),
+                {"x": 4, "z": "a"}, Point(5, [3])]
+        expected = reduce(_merge_type, (_infer_schema(row) for row in rows))
+        self.assertEqual(_infer_schema_from_rows(rows), expected)
+        with self.assertRaisesRegex(TypeError, "field y"):
+            _infer_schema_from_rows(rows + [Point(6, 7.0)])
+
+        # the rows of a seen record key are not inferred again
+        with mock.patch("pyspark.sql.types._infer_schema", wraps=_infer_schema) as infer:
+            _infer_schema_from_rows([Point(i, float(i)) for i in range(100)])
+            self.assertEqual(infer.call_count, 1)
+
+        # stop once the schema has no NullType and is stable
+        rows = [Point(1, None)] + [Point(1, 2.0)] * 3 + [Point("a", 2.0)]
+        self.assertEqual(_infer_schema_from_rows(rows, stable_rows=2),
+                         StructType().add("x", LongType()).add("y", DoubleType()))
+        self.assertRaises(TypeError, lambda: _infer_schema_from_rows(rows))
+
 
 class DataTypeVerificationTests(unittest.TestCase):
 
@@ -973,6 +1030,43 @@ class DataTypeVerificationTests(unittest.TestCase):
             with self.assertRaises(exp, msg=msg):
                 _make_type_verifier(data_type, nullable=False)(obj)
 
+        # Check the compiled converters verify the same way
+        for obj, data_type in success_spec:
+            struct = StructType([StructField("v", data_type, False)])
+            self.assertEqual(
+                _compile_struct_converter(struct)((obj,)), struct.toInternal((obj,)))
+        for obj, data_type, exp in failure_spec:
+            struct = StructType([StructField("v", data_type, False)])
+            with self.assertRaises(exp, msg="compiled %s" % data_type):
+                _compile_struct_converter(struct)((obj,))
+
+    def test_struct_converter(self):
+        import datetime
+
+        inner = StructType([StructField("b", IntegerType()), StructField("c", DateType())])
+        schema = StructType([StructField("a", inner, False), StructField("%d", LongType())])
+        convert = _compile_struct_converter(schema)
+        date = datetime.date(2021, 1, 1)
+        for obj in [((1, date), 2), ({"b": 1, "c": date}, 2), {"a": Row(b=1, c=date), "%d": 2}]:
+            self.assertEqual(convert(obj), schema.toInternal(obj))
+        self.assertIsNone(convert(None))
+        for obj in [((1, date),), (("1", date), 2), (None, 2), ((1, date), 2 ** 64), 1]:
+            with self.assertRaises((TypeError, ValueError)) as expected:
+                _make_type_verifier(schema)(obj)
+            with self.assertRaises(type(expected.exception)) as actual:
+                convert(obj)
+            self.assertEqual(str(actual.exception), str(expected.exception))
+
+        # without verification, the rows are only converted
+        convert = _compile_struct_converter(schema, verify=False)
+        self.assertEqual(convert(((1, date), "x")), ((1, 18628), "x"))
+        self.assertEqual(convert(((1, date), 2, 3)), schema.toInternal(((1, date), 2, 3)))
+        self.assertRaises(ValueError, lambda: convert(1))
+
+        self.assertIs(_make_struct_converter(schema), _make_struct_converter(schema))
+        self.assertIsNot(_make_struct_converter(schema),
+                         _make_struct_converter(schema, verify=False))
+
     def test_row_without_field_sorting(self):
         r = Row(b=1, a=2)
         TestRow = Row("b", "a")
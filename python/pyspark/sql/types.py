@@ -25,6 +25,7 @@ import re
 import base64
 from array import array
 import ctypes
+from operator import itemgetter
 
 from py4j.protocol import register_input_converter
 from py4j.java_gateway import JavaClass
@@ -483,6 +484,10 @@ class StructType(DataType):
     >>> struct1 == struct2
     False
     """
+
+    # the Row class of the rows created by fromInternal, which is not compared or pickled
+    __slots__ = ("_rowClass",)
+
     def __init__(self, fields=None):
         if not fields:
             self.fields = []
@@ -495,6 +500,7 @@ class StructType(DataType):
         # Precalculated list of fields that need conversion with fromInternal/toInternal functions
         self._needConversion = [f.needConversion() for f in self]
         self._needSerializeAnyField = any(self._needConversion)
+        self._rowClass = None
 
     def add(self, field, data_type=None, nullable=True, metadata=None):
         """
@@ -553,8 +559,16 @@ class StructType(DataType):
         # Precalculated list of fields that need conversion with fromInternal/toInternal functions
         self._needConversion = [f.needConversion() for f in self]
         self._needSerializeAnyField = any(self._needConversion)
+        self._rowClass = None
         return self
 
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._rowClass = None
+
     def __iter__(self):
         """Iterate the fields"""
         return iter(self.fields)
@@ -652,7 +666,10 @@ class StructType(DataType):
                       for f, v, c in zip(self.fields, obj, self._needConversion)]
         else:
             values = obj
-        return _create_row(self.names, values)
+        rowClass = self._rowClass
+        if rowClass is None:
+            rowClass = self._rowClass = _create_row_class(self.names)
+        return tuple.__new__(rowClass, values)
 
 
 class UserDefinedType(DataType):
@@ -1073,6 +1090,73 @@ def _infer_schema(row, names=None):
     return StructType(fields)
 
 
+def _record_key(row):
+    """
+    Returns a key of the record class, field names and value types of ``row``, such that
+    :func:`_infer_schema` infers the same schema for the rows with equal keys whose values are
+    all of the atomic types in ``_type_mappings``, or None if it can not infer a schema of it.
+
+    Examples
+    --------
+    >>> from collections import namedtuple
+    >>> Point = namedtuple("Point", ["x", "y"])
+    >>> _record_key(Point(1, 2.0)) == _record_key(Point(3, 4.0))
+    True
+    >>> _record_key(Point(1, 2.0)) == _record_key(Point(1, None))
+    False
+    >>> _record_key({"a": 1}) == _record_key({"b": 1})
+    False
+    """
+    if isinstance(row, dict):
+        return type(row), tuple(row), tuple(map(type, row.values()))
+    elif isinstance(row, (tuple, list)):
+        fields = getattr(row, "__fields__", None)
+        return type(row), fields if fields is None else tuple(fields), tuple(map(type, row))
+    elif hasattr(row, "__dict__"):
+        d = row.__dict__
+        return type(row), tuple(d), tuple(map(type, d.values()))
+    return None
+
+
+def _infer_schema_from_rows(rows, names=None, stable_rows=None):
+    """
+    Infer the merged schema of ``rows`` as :func:`_infer_schema` and :func:`_merge_type` do.
+    The schema of the records of a class with values of the same atomic types is inferred
+    once, by their :func:`_record_key`. If ``stable_rows`` is set, this returns the schema
+    once it has no NullType and ``stable_rows`` consecutive rows have not changed it.
+
+    Examples
+    --------
+    >>> rows = [{"a": None, "b": 1}, {"a": "x", "b": 2}, {"a": "y", "b": 3}, {"a": 1, "b": 4}]
+    >>> _infer_schema_from_rows(rows, stable_rows=1)
+    StructType(List(StructField(a,StringType,true),StructField(b,LongType,true)))
+    >>> _infer_schema_from_rows(rows) # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+        ...
+    TypeError:...
+    """
+    schema = None
+    inferred = set()
+    unchanged = 0
+    for row in rows:
+        key = _record_key(row)
+        if key in inferred:
+            unchanged += 1
+        else:
+            row_schema = _infer_schema(row, names)
+            if key is not None and all(t in _type_mappings for t in key[-1]):
+                inferred.add(key)
+            merged = row_schema if schema is None else _merge_type(schema, row_schema)
+            if merged == schema:
+                unchanged += 1
+            else:
+                schema = merged
+                unchanged = 0
+        if stable_rows is not None and unchanged >= stable_rows and not _has_nulltype(schema):
+            break
+    return schema
+
+
 def _has_nulltype(dt):
     """ Return whether there is a NullType in `dt` or not """
     if isinstance(dt, StructType):
@@ -1411,6 +1495,161 @@ def _make_type_verifier(dataType, nullable=True, name=None):
     return verify
 
 
+# Bounds of the integral types checked by the verifiers
+_integral_ranges = {
+    ByteType: (-128, 127),
+    ShortType: (-32768, 32767),
+    IntegerType: (-2147483648, 2147483647),
+    LongType: (-9223372036854775808, 9223372036854775807),
+}
+
+# Converters compiled by _make_struct_converter, by the JSON of the schema and verify flag
+_struct_converters = {}
+
+_MAX_STRUCT_CONVERTERS = 128
+
+
+def _make_struct_converter(dataType, verify=True):
+    """
+    Returns the function compiled by :func:`_compile_struct_converter` for the StructType
+    ``dataType``, which is cached for the schema.
+
+    Examples
+    --------
+    >>> schema = StructType().add("a", IntegerType()).add("b", DateType(), False)
+    >>> _make_struct_converter(schema) is _make_struct_converter(schema)
+    True
+    """
+    key = (dataType.json(), verify)
+    converter = _struct_converters.get(key)
+    if converter is None:
+        if len(_struct_converters) >= _MAX_STRUCT_CONVERTERS:
+            _struct_converters.clear()
+        converter = _struct_converters[key] = _compile_struct_converter(dataType, verify)
+    return converter
+
+
+def _compile_struct_converter(dataType, verify=True, name=None):
+    """
+    Compile a function that converts a row to the internal values of the StructType
+    ``dataType`` as :meth:`StructType.toInternal` does, and also verifies it as the verifier of
+    :func:`_make_type_verifier` does if ``verify`` is set, in a single pass. The source of the
+    function is generated for the fields, so that atomic fields are checked and converted
+    inline, and nested StructTypes are compiled in turn.
+
+    Examples
+    --------
+    >>> schema = StructType().add("a", IntegerType()).add("b", DateType(), False)
+    >>> convert = _compile_struct_converter(schema)
+    >>> convert((1, datetime.date(1970, 1, 2)))
+    (1, 1)
+    >>> convert({"b": datetime.date(1970, 1, 3)})
+    (None, 2)
+    >>> convert((1, None)) # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+        ...
+    ValueError:...
+    >>> convert(("1", datetime.date(1970, 1, 2))) # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+        ...
+    TypeError:...
+    """
+    if name is None:
+        new_msg = lambda msg: msg
+        new_name = lambda n: "field %s" % n
+    else:
+        new_msg = lambda msg: "%s: %s" % (name, msg)
+        new_name = lambda n: "field %s in %s" % (n, name)
+    # escapes a message to be used as a %-format
+    literal = lambda msg: msg.replace("%", "%%")
+
+    fields = dataType.fields
+    values = ["v%d" % i for i in range(len(fields))]
+    namespace = {"fallback": dataType.toInternal}
+    lines = ["def convert_struct(obj):",
+             "    if obj is None:",
+             "        return None",
+             "    if isinstance(obj, (tuple, list)):",
+             "        if len(obj) != %d:" % len(fields)]
+    if verify:
+        namespace["msg_length"] = literal(new_msg("")) + \
+            "Length of object (%%d) does not match with length of fields (%d)" % len(fields)
+        lines.append("            raise ValueError(msg_length % len(obj))")
+    else:
+        lines.append("            return fallback(obj)")
+    if fields:
+        lines.append("        %s, = obj" % ", ".join(values))
+    lines.append("    elif isinstance(obj, dict):")
+    lines.extend("        %s = obj.get(%r)" % (v, f.name) for v, f in zip(values, fields))
+    lines.append("        pass")
+    lines.append('    elif hasattr(obj, "__dict__"):')
+    lines.append("        d = obj.__dict__")
+    lines.extend("        %s = d.get(%r)" % (v, f.name) for v, f in zip(values, fields))
+    lines.append("    else:")
+    if verify:
+        namespace["msg_struct"] = literal(new_msg("")) + \
+            "StructType can not accept object %r in type %s"
+        lines.append("        raise TypeError(msg_struct % (obj, type(obj)))")
+    else:
+        lines.append('        raise ValueError("Unexpected tuple %r with StructType" % obj)')
+
+    for i, (v, f) in enumerate(zip(values, fields)):
+        field_name = new_name(f.name)
+        null_msg = "%s: This field is not nullable, but got None" % field_name
+        field_msg = lambda msg: literal("%s: " % field_name) + msg
+        _type = type(f.dataType)
+        if _type == StructType:
+            # the nested struct verifies and converts its fields, and we check nullability
+            namespace["convert%d" % i] = _compile_struct_converter(f.dataType, verify, field_name)
+            lines.append("    if %s is None:" % v)
+            if verify and not f.nullable:
+                namespace["msg_null%d" % i] = null_msg
+                lines.append("        raise ValueError(msg_null%d)" % i)
+            else:
+                lines.append("        pass")
+            lines.append("    else:")
+            lines.append("        %s = convert%d(%s)" % (v, i, v))
+        elif _type in _acceptable_types and _type not in (ArrayType, MapType):
+            checks = []
+            if verify and _type != StringType:
+                namespace["types%d" % i] = _acceptable_types[_type]
+                namespace["msg_type%d" % i] = field_msg(
+                    literal("%s can not accept object " % f.dataType) + "%r in type %s")
+                checks.append("if type(%s) not in types%d:" % (v, i))
+                checks.append("    raise TypeError(msg_type%d %% (%s, type(%s)))" % (i, v, v))
+                if _type in _integral_ranges:
+                    lower, upper = _integral_ranges[_type]
+                    namespace["msg_range%d" % i] = field_msg(
+                        "object of %s out of range, got: %%s" % _type.__name__)
+                    checks.append("if %s < %d or %s > %d:" % (v, lower, v, upper))
+                    checks.append("    raise ValueError(msg_range%d %% %s)" % (i, v))
+            if f.needConversion():
+                namespace["convert%d" % i] = f.dataType.toInternal
+                checks.append("%s = convert%d(%s)" % (v, i, v))
+            if verify and not f.nullable:
+                namespace["msg_null%d" % i] = null_msg
+                lines.append("    if %s is None:" % v)
+                lines.append("        raise ValueError(msg_null%d)" % i)
+                if checks:
+                    lines.append("    else:")
+            elif checks:
+                lines.append("    if %s is not None:" % v)
+            lines.extend("        " + check for check in checks)
+        else:
+            # arrays, maps, user-defined types and others use their verifier and converter
+            if verify:
+                namespace["verify%d" % i] = _make_type_verifier(
+                    f.dataType, f.nullable, name=field_name)
+                lines.append("    verify%d(%s)" % (i, v))
+            if f.needConversion():
+                namespace["convert%d" % i] = f.toInternal
+                lines.append("    %s = convert%d(%s)" % (v, i, v))
+    lines.append("    return (%s)" % "".join(v + ", " for v in values))
+
+    exec("\n".join(lines), namespace)
+    return namespace["convert_struct"]
+
+
 # This is used to unpickle a Row from JVM
 def _create_row_inbound_converter(dataType):
     return lambda *a: dataType.fromInternal(a)
@@ -1596,6 +1835,63 @@ class Row(tuple):
             return "<Row(%s)>" % ", ".join("%r" % field for field in self)
 
 
+class _SchemaRow(Row):
+    """
+    Base class of the Row classes created by :func:`_create_row_class`, whose fields are set
+    by the class instead of each row, and found by name with a dict, or a property.
+    """
+
+    __fields__ = []
+    _fieldIndex = {}
+
+    def __contains__(self, item):
+        return item in self._fieldIndex
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, slice)):
+            return tuple.__getitem__(self, item)
+        try:
+            idx = self._fieldIndex[item]
+        except KeyError:
+            raise ValueError(item)
+        return tuple.__getitem__(self, idx)
+
+    def __getattr__(self, item):
+        if item.startswith("__"):
+            raise AttributeError(item)
+        try:
+            idx = self._fieldIndex[item]
+        except KeyError:
+            raise AttributeError(item)
+        return tuple.__getitem__(self, idx)
+
+
+def _create_row_class(fields):
+    """
+    Create a Row class for the rows of a :class:`StructType` with the given field names. A name
+    used by several fields refers to the first one of them, as in :class:`Row`. The fields are
+    properties of the class, unless their names are attributes of :class:`Row`.
+
+    Examples
+    --------
+    >>> RowClass = _create_row_class(["name", "age"])
+    >>> row = tuple.__new__(RowClass, ("Alice", 11))
+    >>> row
+    Row(name='Alice', age=11)
+    >>> row.age, row["name"], "age" in row, isinstance(row, Row)
+    (11, 'Alice', True, True)
+    >>> row == Row(name="Alice", age=11)
+    True
+    """
+    fieldIndex = {}
+    for i, name in enumerate(fields):
+        fieldIndex.setdefault(name, i)
+    attrs = dict((name, property(itemgetter(i))) for name, i in fieldIndex.items()
+                 if not name.startswith("__") and not hasattr(_SchemaRow, name))
+    attrs.update(__fields__=list(fields), _fieldIndex=fieldIndex)
+    return type("Row", (_SchemaRow,), attrs)
+
+
 class DateConverter(object):
     def can_convert(self, obj):
         return isinstance(obj, datetime.date)
@@ -19,6 +19,7 @@ User-defined function related classes and functions
 """
 import functools
 import sys
+import warnings
 
 from pyspark import SparkContext
 from pyspark.rdd import _prepare_for_python_RDD, PythonEvalType
@@ -36,10 +37,11 @@ def _wrap_function(sc, func, returnType):
                                   sc.pythonVer, broadcast_vars, sc._javaAccumulator)
 
 
-def _create_udf(f, returnType, evalType, name=None, deterministic=True):
+def _create_udf(f, returnType, evalType, name=None, deterministic=True, useArrow=None):
     # Set the name of the UserDefinedFunction object to be the name of function f
     udf_obj = UserDefinedFunction(
-        f, returnType=returnType, name=name, evalType=evalType, deterministic=deterministic)
+        f, returnType=returnType, name=name, evalType=evalType, deterministic=deterministic,
+        useArrow=useArrow)
     return udf_obj._wrapped()
 
 
@@ -59,7 +61,8 @@ class UserDefinedFunction(object):
                  returnType=StringType(),
                  name=None,
                  evalType=PythonEvalType.SQL_BATCHED_UDF,
-                 deterministic=True):
+                 deterministic=True,
+                 useArrow=None):
         if not callable(func):
             raise TypeError(
                 "Invalid function: not a function or callable (__call__ is not defined): "
@@ -84,6 +87,9 @@ class UserDefinedFunction(object):
             else func.__class__.__name__)
         self.evalType = evalType
         self.deterministic = deterministic
+        # Whether a SQL_BATCHED_UDF is evaluated with Arrow. None follows
+        # 'spark.sql.execution.pythonUDF.arrow.enabled' of the session the UDF is first used in.
+        self.useArrow = useArrow
 
     @property
     def returnType(self):
@@ -167,10 +173,25 @@ class UserDefinedFunction(object):
         spark = SparkSession.builder.getOrCreate()
         sc = spark.sparkContext
 
+        evalType = self.evalType
+        if evalType == PythonEvalType.SQL_BATCHED_UDF and self.useArrow is None and \
+                spark.conf.get("spark.sql.execution.pythonUDF.arrow.enabled").lower() == "true":
+            evalType = PythonEvalType.SQL_ARROW_BATCHED_UDF
+        if evalType == PythonEvalType.SQL_ARROW_BATCHED_UDF:
+            from pyspark.sql.pandas.utils import require_minimum_pyarrow_version
+            require_minimum_pyarrow_version()
+            try:
+                to_arrow_type(self.returnType)
+            except TypeError:
+                warnings.warn(
+                    "Arrow optimization for Python UDFs does not support the return type %s; "
+                    "falling back to the non-Arrow Python UDF." % str(self.returnType))
+                evalType = PythonEvalType.SQL_BATCHED_UDF
+
         wrapped_func = _wrap_function(sc, self.func, self.returnType)
         jdt = spark._jsparkSession.parseDataType(self.returnType.json())
         judf = sc._jvm.org.apache.spark.sql.execution.python.UserDefinedPythonFunction(
-            self._name, wrapped_func, jdt, self.evalType, self.deterministic)
+            self._name, wrapped_func, jdt, evalType, self.deterministic)
         return judf
 
     def __call__(self, *cols):
@@ -341,17 +362,19 @@ class UDFRegistration(object):
                     "Invalid return type: data type can not be specified when f is"
                     "a user-defined function, but got %s." % returnType)
             if f.evalType not in [PythonEvalType.SQL_BATCHED_UDF,
+                                  PythonEvalType.SQL_ARROW_BATCHED_UDF,
                                   PythonEvalType.SQL_SCALAR_PANDAS_UDF,
                                   PythonEvalType.SQL_SCALAR_PANDAS_ITER_UDF,
                                   PythonEvalType.SQL_GROUPED_AGG_PANDAS_UDF,
                                   PythonEvalType.SQL_MAP_PANDAS_ITER_UDF]:
                 raise ValueError(
-                    "Invalid f: f must be SQL_BATCHED_UDF, SQL_SCALAR_PANDAS_UDF, "
-                    "SQL_SCALAR_PANDAS_ITER_UDF, SQL_GROUPED_AGG_PANDAS_UDF or "
-                    "SQL_MAP_PANDAS_ITER_UDF.")
+                    "Invalid f: f must be SQL_BATCHED_UDF, SQL_ARROW_BATCHED_UDF, "
+                    "SQL_SCALAR_PANDAS_UDF, SQL_SCALAR_PANDAS_ITER_UDF, "
+                    "SQL_GROUPED_AGG_PANDAS_UDF or SQL_MAP_PANDAS_ITER_UDF.")
             register_udf = _create_udf(
                 f.func, returnType=f.returnType, name=name,
-                evalType=f.evalType, deterministic=f.deterministic)._unwrapped
+                evalType=f.evalType, deterministic=f.deterministic,
+                useArrow=f._unwrapped.useArrow)._unwrapped
             return_udf = f
         else:
             if returnType is None:
@@ -27,6 +27,7 @@ class UserDefinedFunction:
     func: Callable[..., Any]
     evalType: int
     deterministic: bool
+    useArrow: Optional[bool]
     def __init__(
         self,
         func: Callable[..., Any],
@@ -34,6 +35,7 @@ class UserDefinedFunction:
         name: Optional[str] = ...,
         evalType: int = ...,
         deterministic: bool = ...,
+        useArrow: Optional[bool] = ...,
     ) -> None: ...
     @property
     def returnType(self) -> DataType: ...
@@ -19,15 +19,68 @@
 
 import copy
 import math
+from itertools import islice
 
 try:
+    import numpy as np
     from numpy import maximum, minimum, sqrt
 except ImportError:
+    np = None
     maximum = max
     minimum = min
     sqrt = math.sqrt
 
 
+# number of values converted into a NumPy array at once
+_CHUNK_SIZE = 1 << 16
+
+
+def _chunks(iterator, size=_CHUNK_SIZE):
+    """ Split the values of iterator into lists of at most `size` values """
+    iterator = iter(iterator)
+    while True:
+        chunk = list(islice(iterator, size))
+        if chunk:
+            yield chunk
+        if len(chunk) < size:
+            return
+
+
+def _float_array(values, exact=False):
+    """
+    Convert a list of ints and floats into a float64 NumPy array. Return None if NumPy is not
+    installed, if some of the values are of other types, or, when `exact` is True, if some
+    ints can not be represented exactly as floats.
+    """
+    if np is None:
+        return None
+    types = set(map(type, values))
+    if not types <= {int, float}:
+        return None
+    try:
+        array = np.array(values, dtype=np.float64)
+    except OverflowError:
+        return None
+    if exact and int in types and len(array) and np.abs(array).max() > 2 ** 53:
+        return None
+    return array
+
+
+def _bucket_counts(values, bounds, minv, maxv, inc=None):
+    """
+    Count the values of a float64 NumPy array falling into each bucket starting at one of the
+    sorted `bounds`, evenly spaced by `inc` if it is given, skipping NaN and the values out of
+    [minv, maxv]. The values equal to maxv are counted in the last bound.
+    """
+    values = values[(values >= minv) & (values <= maxv)]
+    if inc is not None:
+        index = ((values - minv) / inc).astype(np.int64)
+        np.minimum(index, len(bounds) - 1, out=index)
+    else:
+        index = np.searchsorted(bounds, values, side="right") - 1
+    return np.bincount(index, minlength=len(bounds)).tolist()
+
+
 class StatCounter(object):
 
     def __init__(self, values=None):
@@ -39,8 +92,25 @@ class StatCounter(object):
         self.maxValue = float("-inf")
         self.minValue = float("inf")
 
-        for v in values:
-            self.merge(v)
+        # merge the values converted into NumPy arrays when possible, chunk by chunk
+        for chunk in _chunks(values):
+            array = _float_array(chunk)
+            if array is None:
+                for v in chunk:
+                    self.merge(v)
+            else:
+                self.mergeStats(StatCounter._fromArray(array))
+
+    @staticmethod
+    def _fromArray(array):
+        """ Create a StatCounter from the values of a non-empty float64 NumPy array """
+        counter = StatCounter()
+        counter.n = len(array)
+        counter.mu = float(array.mean())
+        counter.m2 = float(np.square(array - counter.mu).sum())
+        counter.maxValue = array.max()
+        counter.minValue = array.min()
+        return counter
 
     # Add a value into this StatCounter, updating the internal statistics.
     def merge(self, value):
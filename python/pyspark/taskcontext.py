@@ -14,10 +14,33 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+from pyspark import util
 from pyspark.java_gateway import local_connect_and_auth
 from pyspark.serializers import read_int, write_int, write_with_length, UTF8Deserializer
 
 
+# Task contexts of the current thread keyed by their class, used instead of the `_taskContext`
+# class attributes when the worker runs tasks in concurrent threads.
+_threadTaskContexts = util.TaskLocal(dict)
+
+
+def _get_task_context(cls):
+    if util._task_local is None:
+        return cls._taskContext
+    contexts = _threadTaskContexts.get()
+    for klass in cls.__mro__:
+        if klass in contexts:
+            return contexts[klass]
+    return None
+
+
+def _set_task_context(cls, taskContext):
+    if util._task_local is None:
+        cls._taskContext = taskContext
+    else:
+        _threadTaskContexts.get()[cls] = taskContext
+
+
 class TaskContext(object):
 
     """
@@ -37,22 +60,23 @@ class TaskContext(object):
 
     def __new__(cls):
         """Even if users construct TaskContext instead of using get, give them the singleton."""
-        taskContext = cls._taskContext
+        taskContext = _get_task_context(cls)
         if taskContext is not None:
             return taskContext
-        cls._taskContext = taskContext = object.__new__(cls)
+        taskContext = object.__new__(cls)
+        _set_task_context(cls, taskContext)
         return taskContext
 
     @classmethod
     def _getOrCreate(cls):
         """Internal function to get or create global TaskContext."""
-        if cls._taskContext is None:
-            cls._taskContext = TaskContext()
-        return cls._taskContext
+        if _get_task_context(cls) is None:
+            _set_task_context(cls, TaskContext())
+        return _get_task_context(cls)
 
     @classmethod
     def _setTaskContext(cls, taskContext):
-        cls._taskContext = taskContext
+        _set_task_context(cls, taskContext)
 
     @classmethod
     def get(cls):
@@ -64,7 +88,7 @@ class TaskContext(object):
         -----
         Must be called on the worker, not the driver. Returns None if not initialized.
         """
-        return cls._taskContext
+        return _get_task_context(cls)
 
     def stageId(self):
         """The ID of the stage that this task belong to."""
@@ -166,9 +190,9 @@ class BarrierTaskContext(TaskContext):
         BarrierTaskContext is returned from here because it is needed in python worker reuse
         scenario, see SPARK-25921 for more details.
         """
-        if not isinstance(cls._taskContext, BarrierTaskContext):
-            cls._taskContext = object.__new__(cls)
-        return cls._taskContext
+        if not isinstance(_get_task_context(cls), BarrierTaskContext):
+            _set_task_context(cls, object.__new__(cls))
+        return _get_task_context(cls)
 
     @classmethod
     def get(cls):
@@ -184,9 +208,10 @@ class BarrierTaskContext(TaskContext):
 
         This API is experimental
         """
-        if not isinstance(cls._taskContext, BarrierTaskContext):
+        taskContext = _get_task_context(cls)
+        if not isinstance(taskContext, BarrierTaskContext):
             raise RuntimeError('It is not in a barrier stage')
-        return cls._taskContext
+        return taskContext
 
     @classmethod
     def _initialize(cls, port, secret):
@@ -148,6 +148,22 @@ class ByteArrayOutput(object):
         pass
 
 
+class OutOfBandBytes(object):
+    """
+    Pickles its data as an out-of-band buffer with protocol 5, like NumPy arrays do.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __reduce_ex__(self, protocol):
+        import pickle
+        return OutOfBandBytes, (pickle.PickleBuffer(self.data),)
+
+    def __eq__(self, other):
+        return isinstance(other, OutOfBandBytes) and bytes(self.data) == bytes(other.data)
+
+
 def search_jar(project_relative_path, sbt_jar_name_prefix, mvn_jar_name_prefix):
     # Note that 'sbt_jar_name_prefix' and 'mvn_jar_name_prefix' are used since the prefix can
     # vary for SBT or Maven specifically. See also SPARK-26856
@@ -14,15 +14,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import io
 import os
 import random
+import sys
 import time
 import tempfile
 import unittest
 
 from pyspark import SparkConf, SparkContext
+from pyspark.broadcast import Broadcast
 from pyspark.java_gateway import launch_gateway
 from pyspark.serializers import ChunkedStream
+from pyspark.testing.utils import have_numpy, OutOfBandBytes
 
 
 class BroadcastTest(unittest.TestCase):
@@ -83,6 +87,19 @@ class BroadcastTest(unittest.TestCase):
     def test_broadcast_value_driver_encryption(self):
         self._test_broadcast_on_driver(("spark.io.encryption.enabled", "true"))
 
+    def test_broadcast_mmap(self):
+        conf = SparkConf()
+        conf.set("spark.python.broadcast.mmap.enabled", "true")
+        self.sc = SparkContext(conf=conf)
+        b = self.sc.broadcast([OutOfBandBytes(b"abc"), {"k": 1}])
+        try:
+            self.assertEqual(b.value, [OutOfBandBytes(b"abc"), {"k": 1}])
+            self.assertEqual(
+                self.sc.parallelize([0, 1], 2).map(lambda x: b.value[0].data[x]).collect(),
+                [97, 98])
+        finally:
+            b.destroy()
+
     def test_broadcast_value_against_gc(self):
         # Test broadcast value against gc.
         conf = SparkConf()
@@ -101,6 +118,68 @@ class BroadcastTest(unittest.TestCase):
             b.destroy()
 
 
+@unittest.skipIf(sys.version_info < (3, 8), "Out-of-band pickling requires Python 3.8+")
+class BroadcastOutOfBandTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mktemp()
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def dump(self, value, out_of_band=True):
+        with open(self.path, "wb") as f:
+            Broadcast(path=self.path).dump(value, f, out_of_band)
+
+    def test_load_from_path(self):
+        value = {"a": OutOfBandBytes(b"x" * 1000), "b": [1, "2", OutOfBandBytes(b"y")]}
+        self.dump(value)
+        loaded = Broadcast(path=self.path).value
+        self.assertEqual(loaded, value)
+        # backed by the read-only mapping of the file instead of a private copy
+        self.assertIsInstance(loaded["a"].data, memoryview)
+        self.assertTrue(loaded["a"].data.readonly)
+
+        self.dump(value, out_of_band=False)
+        self.assertEqual(Broadcast(path=self.path).value, value)
+
+    def test_bytes(self):
+        for value in [b"x" * 1000, bytearray(b"y" * 1000)]:
+            self.dump(value)
+            loaded = Broadcast(path=self.path).value
+            self.assertEqual(loaded, value)
+            # copied back, as workers get the same type as the driver
+            self.assertIs(type(loaded), type(value))
+            with open(self.path, "rb") as f:
+                # only the header and the protocol 5 opcodes are pickled in band
+                self.assertLess(f.read().index(value), 256)
+
+    def test_load_from_stream(self):
+        # values are read back to back from a socket when the JVM decrypts broadcasts
+        values = [OutOfBandBytes(b"abc"), [OutOfBandBytes(b"d"), None], "e"]
+        data = b""
+        for value in values:
+            self.dump(value)
+            with open(self.path, "rb") as f:
+                data += f.read()
+        stream = io.BufferedReader(io.BytesIO(data))
+        self.assertEqual([Broadcast(path=self.path).load(stream) for _ in values], values)
+
+    @unittest.skipIf(not have_numpy, "NumPy not installed")
+    def test_numpy_memory_mapped(self):
+        import numpy as np
+
+        arr = np.arange(1000, dtype=np.float64)
+        self.dump((arr, arr[::2]))
+        loaded, strided = Broadcast(path=self.path).value
+        np.testing.assert_array_equal(loaded, arr)
+        np.testing.assert_array_equal(strided, arr[::2])
+        # backed by the read-only mapping of the file instead of a private copy
+        self.assertFalse(loaded.flags.writeable)
+        self.assertEqual(loaded.ctypes.data % 64, 0)
+
+
 class BroadcastFrameProtocolTest(unittest.TestCase):
 
     @classmethod
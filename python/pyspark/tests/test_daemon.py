@@ -19,7 +19,7 @@ import sys
 import time
 import unittest
 
-from pyspark.serializers import read_int
+from pyspark.serializers import read_int, write_int
 
 
 class DaemonTests(unittest.TestCase):
@@ -32,14 +32,19 @@ class DaemonTests(unittest.TestCase):
         sock.close()
         return True
 
-    def do_termination_test(self, terminator):
+    def start_daemon(self, env=None):
         from subprocess import Popen, PIPE
-        from errno import ECONNREFUSED
 
-        # start daemon
         daemon_path = os.path.join(os.path.dirname(__file__), "..", "daemon.py")
         python_exec = sys.executable or os.environ.get("PYSPARK_PYTHON")
-        daemon = Popen([python_exec, daemon_path], stdin=PIPE, stdout=PIPE)
+        return Popen([python_exec, daemon_path], stdin=PIPE, stdout=PIPE,
+                     env=dict(os.environ, **(env or {})))
+
+    def do_termination_test(self, terminator, env=None):
+        from errno import ECONNREFUSED
+
+        # start daemon
+        daemon = self.start_daemon(env)
 
         # read the port number
         port = read_int(daemon.stdout)
@@ -71,6 +76,87 @@ class DaemonTests(unittest.TestCase):
         from signal import SIGTERM
         self.do_termination_test(lambda daemon: os.kill(daemon.pid, SIGTERM))
 
+    def test_termination_with_worker_pool(self):
+        """Ensure that daemon and idle pooled workers terminate when stdin is closed."""
+        env = {"PYSPARK_DAEMON_POOL_SIZE": "2", "PYSPARK_DAEMON_PRELOAD_MODULES": "json"}
+        self.do_termination_test(lambda daemon: daemon.stdin.close(), env)
+
+    def test_worker_pool(self):
+        from socket import socket, AF_INET, SOCK_STREAM
+
+        daemon = self.start_daemon({"PYSPARK_DAEMON_POOL_SIZE": "2"})
+        try:
+            port = read_int(daemon.stdout)
+            pids = []
+            for _ in range(4):
+                sock = socket(AF_INET, SOCK_STREAM)
+                sock.connect(('127.0.0.1', port))
+                # every connection is acknowledged by a distinct worker process
+                pids.append(read_int(sock.makefile("rb")))
+                sock.send(b"\xFF\xFF\xFF\xFF")
+                sock.close()
+            self.assertEqual(len(set(pids)), 4)
+            self.assertNotIn(daemon.pid, pids)
+        finally:
+            daemon.stdin.close()
+            daemon.wait()
+
+    def test_worker_pool_burst(self):
+        from socket import socket, AF_INET, SOCK_STREAM
+
+        daemon = self.start_daemon({"PYSPARK_DAEMON_POOL_SIZE": "2"})
+        try:
+            port = read_int(daemon.stdout)
+            # more connections at once than idle workers
+            socks = []
+            for _ in range(5):
+                sock = socket(AF_INET, SOCK_STREAM)
+                sock.connect(('127.0.0.1', port))
+                socks.append(sock)
+            pids = [read_int(sock.makefile("rb")) for sock in socks]
+            for sock in socks:
+                sock.send(b"\xFF\xFF\xFF\xFF")
+                sock.close()
+            self.assertEqual(len(set(pids)), 5)
+            self.assertNotIn(daemon.pid, pids)
+        finally:
+            daemon.stdin.close()
+            daemon.wait()
+
+    def test_termination_with_threads(self):
+        self.do_termination_test(lambda daemon: daemon.stdin.close(),
+                                 {"PYSPARK_DAEMON_THREADS": "2"})
+
+    def test_threads(self):
+        from socket import socket, AF_INET, SOCK_STREAM
+
+        daemon = self.start_daemon({"PYSPARK_DAEMON_THREADS": "2"})
+        try:
+            port = read_int(daemon.stdout)
+            socks = []
+            for _ in range(3):
+                sock = socket(AF_INET, SOCK_STREAM)
+                sock.connect(('127.0.0.1', port))
+                socks.append(sock)
+            # every connection is acknowledged with a distinct id instead of a pid
+            ids = [read_int(sock.makefile("rb")) for sock in socks]
+            self.assertEqual(sorted(ids), [1, 2, 3])
+
+            # killing a task shuts its connection down
+            write_int(ids[0], daemon.stdin)
+            daemon.stdin.flush()
+            socks[0].settimeout(10)
+            self.assertEqual(socks[0].recv(1024), b"")
+
+            for sock in socks:
+                sock.send(b"\xFF\xFF\xFF\xFF")
+                sock.close()
+            # the daemon keeps serving connections
+            self.assertTrue(self.connect(port))
+        finally:
+            daemon.stdin.close()
+            daemon.wait()
+
 
 if __name__ == "__main__":
     from pyspark.tests.test_daemon import *  # noqa: F401
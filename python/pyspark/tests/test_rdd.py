@@ -16,20 +16,26 @@
 #
 from datetime import datetime, timedelta
 import hashlib
+import operator
 import os
 import random
 import tempfile
 import time
+import unittest
+from collections import defaultdict
 from glob import glob
 
 from py4j.protocol import Py4JJavaError
 
 from pyspark import shuffle, RDD
+from pyspark.rdd import _idle_pipes, _pipe_frames, _prune_counts
+from pyspark.rddsampler import RDDReservoirSampler, RDDSampler
 from pyspark.resource import ExecutorResourceRequests, ResourceProfileBuilder,\
     TaskResourceRequests
 from pyspark.serializers import CloudPickleSerializer, BatchedSerializer, PickleSerializer,\
     MarshalSerializer, UTF8Deserializer, NoOpSerializer
-from pyspark.testing.utils import ReusedPySparkTestCase, SPARK_HOME, QuietTest
+from pyspark.statcounter import StatCounter, _bucket_counts, _float_array
+from pyspark.testing.utils import ReusedPySparkTestCase, SPARK_HOME, QuietTest, have_numpy
 
 
 global_func = lambda: "Hi"
@@ -704,6 +710,49 @@ class RDDTests(ReusedPySparkTestCase):
             for size in sizes:
                 self.assertGreater(size, 0)
 
+    def test_count_by_value_in_tree(self):
+        rdd = self.sc.parallelize([i % 7 for i in range(1000)], 20)
+        expected = {k: len(range(k, 1000, 7)) for k in range(7)}
+        for depth in [1, 2, 3]:
+            self.assertEqual(rdd.countByValue(depth=depth), expected)
+            self.assertEqual(rdd.map(lambda x: (x, 1)).countByKey(depth=depth), expected)
+            self.assertEqual(rdd.map(lambda x: (x, 1)).reduceByKeyLocally(operator.add, depth),
+                             expected)
+
+    def test_count_by_value_with_capacity(self):
+        data = [0] * 3000 + [1] * 2000 + list(range(2, 5002))
+        rdd = self.sc.parallelize(data, 10)
+        counts = rdd.countByValue(depth=2, capacity=10)
+        self.assertLessEqual(len(counts), 10)
+        self.assertGreaterEqual(counts[0], 3000 - len(data) / 11)
+        self.assertGreaterEqual(counts[1], 2000 - len(data) / 11)
+        self.assertRaises(ValueError, lambda: rdd.countByValue(capacity=0))
+
+    def test_combineByKey_map_side_combine(self):
+        rdd = self.sc.parallelize([(i % 10, i) for i in range(1000)], 4)
+        expected = [(k, sum(range(k, 1000, 10))) for k in range(10)]
+        for mapSideCombine in [None, True, False]:
+            combined = rdd.combineByKey(lambda v: v, operator.add, operator.add,
+                                        mapSideCombine=mapSideCombine)
+            self.assertEqual(sorted(combined.collect()), expected)
+
+    def test_sortByKey_with_skewed_partitions(self):
+        # one partition too large for its reservoir sample is sampled again
+        rdd = self.sc.parallelize(range(10), 10).flatMap(
+            lambda i: range(i * 1000, i * 1000 + (10000 if i == 9 else 10)))
+        sort = rdd.map(lambda x: (-x, x)).sortByKey(numPartitions=4)
+        self.assertEqual(sort.values().collect(), sorted(rdd.collect(), reverse=True))
+        sizes = sort.glom().map(len).collect()
+        self.assertEqual(len(sizes), 4)
+        self.assertLess(max(sizes), 5000)
+
+    def test_sortByKey_with_keyfunc(self):
+        seq = [(str(i), i) for i in range(100)]
+        sort = self.sc.parallelize(seq, 3).sortByKey(numPartitions=3, keyfunc=int)
+        self.assertEqual(sort.values().collect(), list(range(100)))
+        for size in sort.glom().map(len).collect():
+            self.assertGreater(size, 0)
+
     def test_pipe_functions(self):
         data = ['1', '2', '3']
         rdd = self.sc.parallelize(data)
@@ -879,6 +928,149 @@ class RDDTests(ReusedPySparkTestCase):
                 "Thread {i}: Job in group B did not succeeded.".format(i=i))
 
 
+class PipeFramesTests(unittest.TestCase):
+
+    def test_binary_frames(self):
+        data = [b"", b"a", b"b\nc", b"\x00" * 100000]
+        self.assertEqual(list(_pipe_frames(iter(data), "cat", {})), data)
+        self.assertEqual(list(_pipe_frames(iter(data), "cat", {}, bufferSize=16)), data)
+
+    def test_reuse_process(self):
+        first = list(_pipe_frames(iter([b"a", b"b"]), "cat", {}, reuse=True))
+        self.assertEqual(first, [b"a", b"b"])
+        [pipe] = _idle_pipes[("cat", (), 1 << 16)]
+        self.assertEqual(list(_pipe_frames(iter([b"c"]), "cat", {}, reuse=True)), [b"c"])
+        self.assertEqual(_idle_pipes[("cat", (), 1 << 16)], [pipe])
+        pipe.stdin.close()
+        pipe.wait()
+
+    def test_errors(self):
+        self.assertRaises(TypeError, list, _pipe_frames(iter([b"a", "b"]), "cat", {}))
+        self.assertRaises(TypeError, list, _pipe_frames(iter([b"a", 1]), "cat", {}, reuse=True))
+        # the process exits before the end of the partition
+        self.assertRaises(RuntimeError, list, _pipe_frames(iter([b"a"]), "true", {}, reuse=True))
+        self.assertRaises(RuntimeError, list,
+                          _pipe_frames(iter([]), "false", {}, checkCode=True))
+        # a partial frame is corrupt output
+        self.assertRaisesRegex(RuntimeError, "truncated", list,
+                               _pipe_frames(iter([b"abc"]), "head -c 5", {}, checkCode=True))
+        self.assertRaisesRegex(RuntimeError, "truncated", list,
+                               _pipe_frames(iter([b"abc"]), "head -c 2", {}))
+
+    def test_dropped_iterator(self):
+        # e.g. take() stops before the end of the partition, the process must not leak
+        for started in [True, False]:
+            frames = _pipe_frames(iter([b"a", b"b"]), "cat", {}, reuse=True)
+            pipe = frames.gi_frame.f_locals["pipe"]
+            if started:
+                self.assertEqual(next(frames), b"a")
+            del frames
+            self.assertIsNotNone(pipe.poll())
+            self.assertEqual(_idle_pipes[("cat", (), 1 << 16)], [])
+
+
+class PruneCountsTests(unittest.TestCase):
+
+    def test_error_bound(self):
+        rand = random.Random(42)
+        data = [int(rand.paretovariate(1)) for _ in range(10000)]
+        exact = defaultdict(int)
+        for x in data:
+            exact[x] += 1
+        for capacity in [1, 5, 50]:
+            counts = defaultdict(int)
+            for x in data:
+                counts[x] += 1
+                if len(counts) > 2 * capacity:
+                    counts = _prune_counts(counts, capacity)
+            counts = _prune_counts(counts, capacity)
+            self.assertLessEqual(len(counts), capacity)
+            bound = len(data) / (capacity + 1)
+            for x, n in exact.items():
+                self.assertLessEqual(counts.get(x, 0), n)
+                self.assertGreaterEqual(counts.get(x, 0), n - bound)
+
+
+class RDDSamplerTests(unittest.TestCase):
+
+    def sample(self, withReplacement, fraction, seed, n):
+        return list(RDDSampler(withReplacement, fraction, seed).func(0, iter(range(n))))
+
+    def test_fraction(self):
+        for withReplacement in [False, True]:
+            for fraction in [0.001, 0.01, 0.3, 0.5]:
+                size = len(self.sample(withReplacement, fraction, 42, 100000))
+                self.assertAlmostEqual(size / 100000, fraction, delta=fraction * 0.1)
+
+    def test_gap_sampling(self):
+        self.assertEqual(self.sample(False, 0.0, 1, 1000), [])
+        sample = self.sample(False, 0.01, 1, 1000)
+        self.assertEqual(sample, sorted(set(sample)))
+        self.assertEqual(sample, self.sample(False, 0.01, 1, 1000))
+        # each element is expected in the sample 100 times
+        counts = [0] * 10
+        for seed in range(1000):
+            for x in self.sample(True, 0.1, seed, 10):
+                counts[x] += 1
+        self.assertGreater(min(counts), 60)
+        self.assertLess(max(counts), 140)
+
+
+class RDDReservoirSamplerTests(unittest.TestCase):
+
+    def test_counts(self):
+        for n in [0, 3, 5, 6, 1000]:
+            [(split, count, sample)] = RDDReservoirSampler(5, 1).func(2, iter(range(n)))
+            self.assertEqual(split, 2)
+            self.assertEqual(count, n)
+            self.assertEqual(len(set(sample)), min(n, 5))
+            self.assertTrue(set(sample) <= set(range(n)))
+
+    def test_uniform(self):
+        counts = [0] * 50
+        for seed in range(2000):
+            [(_, _, sample)] = RDDReservoirSampler(5, seed).func(0, iter(range(50)))
+            for x in sample:
+                counts[x] += 1
+        # each element is expected in the sample 200 times
+        self.assertGreater(min(counts), 140)
+        self.assertLess(max(counts), 260)
+
+
+@unittest.skipIf(not have_numpy, "NumPy not installed")
+class NumericChunksTests(unittest.TestCase):
+
+    def test_stat_counter(self):
+        import numpy as np
+
+        data = [random.gauss(0, 1) for _ in range(10000)] + list(range(100))
+        stats = StatCounter(data)
+        self.assertEqual(stats.count(), len(data))
+        self.assertAlmostEqual(stats.mean(), np.mean(data))
+        self.assertAlmostEqual(stats.variance(), np.var(data))
+        self.assertEqual(stats.max(), 99)
+        self.assertEqual(stats.min(), min(data))
+
+        # values which are not all numbers are merged one by one
+        stats = StatCounter([np.array([1.0, 2.0]), np.array([3.0, 4.0])])
+        self.assertEqual(stats.mean().tolist(), [2.0, 3.0])
+
+    def test_float_array(self):
+        self.assertEqual(_float_array([1, 2.5]).tolist(), [1.0, 2.5])
+        self.assertIsNone(_float_array([1, "2"]))
+        self.assertIsNone(_float_array([True]))
+        self.assertIsNone(_float_array([2 ** 60], exact=True))
+        self.assertIsNotNone(_float_array([2 ** 60]))
+        self.assertIsNone(_float_array([10 ** 400]))
+
+    def test_bucket_counts(self):
+        values = _float_array([-1, 0, 0.5, 1, 2.5, 3, 3.5, float("nan"), 4, 5])
+        bounds = _float_array([0, 1, 3, 4])
+        self.assertEqual(_bucket_counts(values, bounds, 0, 4), [2, 2, 2, 1])
+        bounds = _float_array([0, 2, 4])
+        self.assertEqual(_bucket_counts(values, bounds, 0, 4, 2), [3, 3, 1])
+
+
 if __name__ == "__main__":
     import unittest
     from pyspark.tests.test_rdd import *  # noqa: F401
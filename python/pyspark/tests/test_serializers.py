@@ -15,6 +15,7 @@
 # limitations under the License.
 #
 import math
+import struct
 import sys
 import unittest
 
@@ -22,9 +23,9 @@ from pyspark import serializers
 from pyspark.serializers import CloudPickleSerializer, CompressedSerializer, \
     AutoBatchedSerializer, BatchedSerializer, AutoSerializer, NoOpSerializer, PairDeserializer, \
     FlattenedValuesSerializer, CartesianDeserializer, PickleSerializer, UTF8Deserializer, \
-    MarshalSerializer
+    MarshalSerializer, OutOfBandPickleSerializer, SpecialLengths
 from pyspark.testing.utils import PySparkTestCase, read_int, write_int, ByteArrayOutput, \
-    have_numpy, have_scipy
+    OutOfBandBytes, have_numpy, have_scipy
 
 
 class SerializationTestCase(unittest.TestCase):
@@ -124,6 +125,28 @@ class SerializationTestCase(unittest.TestCase):
         self.assertEqual(["abc", u"123", range(5)] + list(range(1000)), list(ser.load_stream(io)))
         io.close()
 
+    def test_compressed_serializer_codecs(self):
+        import zlib
+        from io import BytesIO
+        data = [list(range(100)), "abc" * 100, None]
+        zlib_ser = CompressedSerializer(PickleSerializer(), "zlib")
+        for codec in ["zlib", "lz4", "zstd", "snappy"]:
+            ser = CompressedSerializer(PickleSerializer(), codec)
+            self.assertIn(ser.codec, [codec, "zlib"])
+            for obj in data:
+                frame = ser.dumps(obj)
+                self.assertEqual(obj, ser.loads(frame))
+                # readers detect the codec of each frame
+                self.assertEqual(obj, zlib_ser.loads(frame))
+                # streams write the codec id and the compressed data apart
+                stream = BytesIO()
+                ser.dump_stream([obj], stream)
+                self.assertEqual(stream.getvalue(), struct.pack("!i", len(frame)) + frame)
+        # frames written before codecs were configurable
+        legacy = zlib.compress(PickleSerializer().dumps(data), 1)
+        self.assertEqual(data, CompressedSerializer(PickleSerializer(), "lz4").loads(legacy))
+        self.assertRaises(ValueError, CompressedSerializer, PickleSerializer(), "gzip")
+
     def test_hash_serializer(self):
         hash(NoOpSerializer())
         hash(UTF8Deserializer())
@@ -138,6 +161,39 @@ class SerializationTestCase(unittest.TestCase):
         hash(FlattenedValuesSerializer(PickleSerializer()))
 
 
+@unittest.skipIf(sys.version_info < (3, 8), "Out-of-band pickling requires Python 3.8+")
+class OutOfBandPickleSerializerTests(unittest.TestCase):
+
+    def test_dumps_loads(self):
+        ser = OutOfBandPickleSerializer()
+        value = [1, "a", OutOfBandBytes(bytearray(b"x" * 1000)), OutOfBandBytes(bytearray())]
+        data = ser.dumps(value)
+        self.assertEqual(value, ser.loads(data))
+        self.assertEqual(value, ser.loads(bytearray(data)))
+
+    def test_stream(self):
+        import ctypes
+        from io import BytesIO
+        ser = BatchedSerializer(OutOfBandPickleSerializer(), 2)
+        value = [(i, OutOfBandBytes(bytearray(b"%d" % i * 1000))) for i in range(5)]
+        stream = BytesIO()
+        ser.dump_stream(value, stream)
+        stream.seek(0)
+        loaded = list(ser.load_stream(stream))
+        self.assertEqual(value, loaded)
+        for _, v in loaded:
+            # the buffers are read into aligned, writable memory
+            self.assertFalse(v.data.readonly)
+            address = ctypes.addressof(ctypes.c_char.from_buffer(v.data))
+            self.assertEqual(0, address % OutOfBandPickleSerializer.ALIGNMENT)
+
+        # every batch is a single frame
+        stream.seek(0)
+        frames = list(NoOpSerializer().load_stream(stream))
+        self.assertEqual(3, len(frames))
+        self.assertEqual(value[:2], OutOfBandPickleSerializer().loads(frames[0]))
+
+
 @unittest.skipIf(not have_scipy, "SciPy not installed")
 class SciPyTests(PySparkTestCase):
 
@@ -187,6 +243,33 @@ class NumPyTests(PySparkTestCase):
         self.assertSequenceEqual(
             [0.6666666666666666, 0.6666666666666666], stats_sample_dict['variance'].tolist())
 
+    @unittest.skipIf(sys.version_info < (3, 8), "Out-of-band pickling requires Python 3.8+")
+    def test_out_of_band_pickle_serializer(self):
+        import numpy as np
+
+        ser = OutOfBandPickleSerializer()
+        value = ("key", np.arange(1000, dtype=np.float64).reshape(10, 100))
+        from io import BytesIO
+        stream = BytesIO()
+        ser.dump_stream([value], stream)
+        stream.seek(0)
+        key, arr = list(ser.load_stream(stream))[0]
+        self.assertEqual("key", key)
+        self.assertTrue((value[1] == arr).all())
+        self.assertTrue(arr.flags.writeable and arr.flags.aligned)
+        x = self.sc.parallelize([value] * 4, 2)._reserialize(AutoBatchedSerializer(ser))
+        self.assertEqual([value[1].sum()] * 4, x.map(lambda kv: kv[1].sum()).collect())
+
+    def test_batched_numpy_array(self):
+        import numpy as np
+
+        ser = BatchedSerializer(PickleSerializer(), 4)
+        batches = list(ser._batched(np.arange(10)))
+        self.assertEqual([4, 4, 2], [len(b) for b in batches])
+        self.assertTrue(all(type(b) is list for b in batches))
+        self.assertEqual(list(range(10)), [int(x) for b in batches for x in b])
+        self.assertEqual(45, self.sc.parallelize(np.arange(10), 3).sum())
+
 
 class SerializersTest(unittest.TestCase):
 
@@ -222,6 +305,99 @@ class SerializersTest(unittest.TestCase):
                 # ends with a -1
                 self.assertEqual(dest.buffer[-4:], write_int(-1))
 
+    def test_vectored_writer_and_frame_reader(self):
+        import io
+        import os
+        import socket
+        import threading
+        from unittest import mock
+
+        ser = PickleSerializer()
+        data = [b"x" * size for size in [0, 1, 100, 70000, 2 << 20, 5]]
+        a, b = socket.socketpair()
+        writer = serializers.VectoredWriter(os.dup(a.fileno()), 65536)
+        reader = serializers.FrameReader(io.FileIO(os.dup(b.fileno()), "rb"), 65536)
+        calls = []
+        writev = os.writev
+
+        def counting_writev(fd, buffers):
+            calls.append([len(buf) for buf in buffers])
+            return writev(fd, buffers)
+
+        def write():
+            with mock.patch("os.writev", counting_writev):
+                ser.dump_stream(data, writer)
+                serializers.write_int(SpecialLengths.END_OF_DATA_SECTION, writer)
+                writer.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        try:
+            self.assertEqual(data, list(ser.load_stream(reader)))
+        finally:
+            thread.join()
+            reader.close()
+            a.close()
+            b.close()
+        # the first frames are buffered, the large ones are sent in one call with their header
+        self.assertEqual(3, len(calls))
+        self.assertEqual(len(ser.dumps(data[3])), calls[0][-1])
+        self.assertEqual([4, len(ser.dumps(data[4]))], calls[1])
+        self.assertEqual([4 + len(ser.dumps(data[5])) + 4], calls[2])
+        self.assertTrue(writer.closed)
+
+    def test_batched_sequences(self):
+        from array import array
+        ser = BatchedSerializer(PickleSerializer(), 3)
+        for data in [list(range(10)), tuple(range(10)), range(10), array("i", range(10))]:
+            batches = list(ser._batched(data))
+            self.assertEqual([[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]], batches)
+
+    def test_auto_batched_frame_sizes(self):
+        from io import BytesIO
+        ser = AutoBatchedSerializer(PickleSerializer(), bestSize=1 << 12)
+        for data in [list(range(10000)), iter(range(10000))]:
+            serializers.batching_metrics.get().reset()
+            stream = BytesIO()
+            ser.dump_stream(data, stream)
+            stream.seek(0)
+            self.assertEqual(list(range(10000)), list(ser.load_stream(stream)))
+
+            metrics = serializers.batching_metrics.get()
+            self.assertEqual(10000, metrics.items)
+            self.assertEqual(1, metrics.min_batch_size)
+            # Grows by a bounded factor per frame and then stays close to the target size.
+            self.assertLessEqual(metrics.max_batch_size, 1 << 12)
+            self.assertLess(metrics.frames, 50)
+            self.assertLess(metrics.bytes / metrics.frames, 1 << 13)
+
+    def test_auto_batched_shrinks(self):
+        from io import BytesIO
+        best = 1 << 12
+        ser = AutoBatchedSerializer(PickleSerializer(), bestSize=best)
+        # small objects make the batch size grow, then distinct large objects follow
+        data = list(range(2000)) + [b"%04d" % i * 100 for i in range(300)]
+        for value in [data, iter(data)]:
+            serializers.batching_metrics.get().reset()
+            stream = BytesIO()
+            ser.dump_stream(value, stream)
+            self.assertEqual(serializers.batching_metrics.get().items, len(data))
+
+            stream.seek(0)
+            frames = []
+            for frame in NoOpSerializer().load_stream(stream):
+                frames.append((len(frame), len(PickleSerializer().loads(frame))))
+            self.assertEqual(serializers.batching_metrics.get().frames, len(frames))
+            self.assertGreater(max(count for _, count in frames), 1000)
+            # the batch size drops within two oversized frames and frames then stay small
+            oversized = [i for i, (size, _) in enumerate(frames) if size > best * 10]
+            self.assertLessEqual(len(oversized), 2)
+            later = frames[oversized[-1] + 1:]
+            self.assertGreater(len(later), 3)
+            for size, count in later:
+                self.assertLessEqual(size, best * 2)
+                self.assertLessEqual(count, 10)
+
 
 if __name__ == "__main__":
     from pyspark.tests.test_serializers import *  # noqa: F401
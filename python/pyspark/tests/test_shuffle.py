@@ -14,13 +14,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import itertools
+import operator
+import os
 import random
 import unittest
+from unittest import mock
 
 from py4j.protocol import Py4JJavaError
 
 from pyspark import shuffle, PickleSerializer, SparkConf, SparkContext
-from pyspark.shuffle import Aggregator, ExternalMerger, ExternalSorter
+from pyspark.shuffle import Aggregator, ExternalMerger, ExternalSorter, SimpleAggregator
 
 
 class MergerTests(unittest.TestCase):
@@ -93,6 +97,17 @@ class MergerTests(unittest.TestCase):
             self.assertEqual(k, len(vs))
             self.assertEqual(list(range(k)), list(vs))
 
+    def test_spill_on_estimated_size(self):
+        m = ExternalMerger(self.agg, 1 << 20)
+        m._size_limit = 1 << 16
+        spilled = shuffle.spill_metrics.get().memory_bytes
+        m.mergeValues(self.data * 5)
+        self.assertGreaterEqual(m.spills, 1)
+        self.assertGreater(shuffle.spill_metrics.get().memory_bytes, spilled)
+        self.assertEqual(sum(sum(v) for k, v in m.items()),
+                         sum(range(self.N)) * 5)
+        m._cleanup()
+
     def test_stopiteration_is_raised(self):
 
         def stopit(*args, **kwargs):
@@ -125,6 +140,123 @@ class MergerTests(unittest.TestCase):
             m.mergeCombiners(map(lambda x_y1: (x_y1[0], [x_y1[1]]), data))
 
 
+class NumericMergerTests(unittest.TestCase):
+
+    def check_merge(self, op, items, memory_limit=1000):
+        expected = {}
+        for k, v in items:
+            expected[k] = op(expected[k], v) if k in expected else v
+
+        m = ExternalMerger(SimpleAggregator(op), memory_limit, partitions=3)
+        m.NUMERIC_CHUNK_SIZE = 100
+        m.mergeValues(iter(items))
+        result = list(m.items())
+        self.assertEqual(dict(result), expected)
+        self.assertEqual(len(result), len(expected))
+        self.assertEqual([type(k) for k, _ in sorted(result)],
+                         [type(k) for k, _ in sorted(expected.items())])
+        self.assertEqual([type(v) for _, v in sorted(result)],
+                         [type(v) for _, v in sorted(expected.items())])
+
+    def test_reduce_op(self):
+        self.assertIs(SimpleAggregator(operator.add)._reduce_op, operator.add)
+        self.assertIsNone(Aggregator(lambda x: x, max, max)._reduce_op)
+        self.assertIsNone(Aggregator(shuffle._identity, max, min)._reduce_op)
+
+    def test_numeric(self):
+        rnd = random.Random(42)
+        ints = [(rnd.randint(0, 50), rnd.randint(-1000, 1000)) for _ in range(1000)]
+        floats = [(k + 0.5, v / 7.0) for k, v in ints]
+        for op in (operator.add, max, min):
+            self.check_merge(op, ints)
+            self.check_merge(op, [(float(k), v) for k, v in ints])
+            self.check_merge(op, floats)
+
+    def test_spilled(self):
+        items = [(i % 5000, i) for i in range(1 << 16)] * 2
+        self.check_merge(operator.add, items, memory_limit=1)
+
+    def test_other_types(self):
+        self.check_merge(operator.add, [(i % 3, str(i)) for i in range(300)])
+        self.check_merge(operator.add, [(True, 1), (1, 2), (1.0, 3)] * 100)
+        self.check_merge(operator.add, [(i % 3, True) for i in range(300)])
+        self.check_merge(operator.add, [(float("nan"), 1), (1, 2)] * 100)
+        self.check_merge(max, [(1, float("nan")), (1, 2.0), (0, 0.0), (0, -0.0)] * 100)
+        # the sums do not fit into 64 bits
+        self.check_merge(operator.add, [(i % 3, 1 << 62) for i in range(300)])
+        self.check_merge(operator.add, [(1 << 70, 1), (1, 1 << 70)] * 100)
+
+
+class CombineLocallyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.agg = Aggregator(lambda x: [x],
+                              lambda x, y: x.append(y) or x,
+                              lambda x, y: x.extend(y) or x)
+
+    def combine(self, data, **kwargs):
+        return sorted(shuffle._combine_locally(iter(data), self.agg, 1024, **kwargs))
+
+    def test_unique_keys(self):
+        data = [(i, i) for i in range(100)]
+        self.assertEqual(self.combine(data, sample_size=10), [(i, [i]) for i in range(100)])
+        self.assertEqual(self.combine(data, map_side_combine=True),
+                         [(i, [i]) for i in range(100)])
+
+    def test_repeated_keys(self):
+        data = [(i % 10, i) for i in range(100)]
+        self.assertEqual(self.combine(data, sample_size=20),
+                         [(k, list(range(k, 100, 10))) for k in range(10)])
+        # the keys are combined whatever the rest of the partition is
+        self.assertEqual(len(self.combine(data + [(i, i) for i in range(100, 1000)],
+                                          sample_size=100)), 910)
+
+    def test_adaptive(self):
+        data = [(i, i) for i in range(50)] + [(0, i) for i in range(50)]
+        # all of the first 50 keys are distinct
+        self.assertEqual(len(self.combine(data, sample_size=50)), 100)
+        self.assertEqual(len(self.combine(data, sample_size=100)), 50)
+        self.assertEqual(len(self.combine(data, sample_size=50, max_distinct_ratio=1.0)), 50)
+
+    def test_map_side_combine_disabled(self):
+        data = [(i % 10, i) for i in range(100)]
+        self.assertEqual(self.combine(data, map_side_combine=False),
+                         sorted((i % 10, [i]) for i in range(100)))
+
+
+class PartitionFramesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ser = PickleSerializer()
+        self.data = [(i, str(i) * 10) for i in range(1 << 14)]
+
+    def load(self, frames):
+        partitions = {}
+        for split, frame in frames:
+            partitions.setdefault(split, []).extend(self.ser.loads(frame))
+        return partitions
+
+    def test_partitions(self):
+        frames = shuffle._partition_frames(iter(self.data), 7, hash, self.ser, 1 << 20)
+        partitions = self.load(frames)
+        self.assertEqual(sorted(partitions), list(range(7)))
+        for split, items in partitions.items():
+            self.assertEqual(items, [kv for kv in self.data if kv[0] % 7 == split])
+
+    def test_frame_size(self):
+        frames = list(shuffle._partition_frames(iter(self.data), 3, hash, self.ser, 1 << 20,
+                                                frame_size=1 << 12))
+        self.assertGreater(len(frames), 3 * 10)
+        self.assertLess(max(len(f) for s, f in frames), 1 << 13)
+        self.assertEqual(sum(len(v) for v in self.load(frames).values()), len(self.data))
+
+    def test_flush_on_memory_limit(self):
+        frames = list(shuffle._partition_frames(iter(self.data), 3, hash, self.ser, 0,
+                                                frame_size=1 << 30))
+        self.assertGreater(len(frames), 3 * 10)
+        self.assertEqual(sum(len(v) for v in self.load(frames).values()), len(self.data))
+
+
 class SorterTests(unittest.TestCase):
     def test_in_memory_sort(self):
         l = list(range(1024))
@@ -144,17 +276,76 @@ class SorterTests(unittest.TestCase):
         random.shuffle(l)
         sorter = CustomizedSorter(1)
         self.assertEqual(sorted(l), list(sorter.sorted(l)))
-        self.assertGreater(shuffle.DiskBytesSpilled, 0)
-        last = shuffle.DiskBytesSpilled
+        self.assertGreater(shuffle.spill_metrics.get().disk_bytes, 0)
+        last = shuffle.spill_metrics.get().disk_bytes
         self.assertEqual(sorted(l, reverse=True), list(sorter.sorted(l, reverse=True)))
-        self.assertGreater(shuffle.DiskBytesSpilled, last)
-        last = shuffle.DiskBytesSpilled
+        self.assertGreater(shuffle.spill_metrics.get().disk_bytes, last)
+        last = shuffle.spill_metrics.get().disk_bytes
         self.assertEqual(sorted(l, key=lambda x: -x), list(sorter.sorted(l, key=lambda x: -x)))
-        self.assertGreater(shuffle.DiskBytesSpilled, last)
-        last = shuffle.DiskBytesSpilled
+        self.assertGreater(shuffle.spill_metrics.get().disk_bytes, last)
+        last = shuffle.spill_metrics.get().disk_bytes
         self.assertEqual(sorted(l, key=lambda x: -x, reverse=True),
                          list(sorter.sorted(l, key=lambda x: -x, reverse=True)))
-        self.assertGreater(shuffle.DiskBytesSpilled, last)
+        self.assertGreater(shuffle.spill_metrics.get().disk_bytes, last)
+
+    def test_external_sort_on_estimated_size(self):
+        l = list(range(1 << 14))
+        random.shuffle(l)
+        sorter = ExternalSorter(1 << 20)
+        spilled = shuffle.spill_metrics.get().memory_bytes
+        with mock.patch.object(shuffle, "_memory_budget", return_value=1 << 16):
+            self.assertEqual(sorted(l), list(sorter.sorted(l)))
+        self.assertGreater(shuffle.spill_metrics.get().memory_bytes, spilled)
+
+    def test_external_sort_bounded_fan_in(self):
+        class CustomizedSorter(ExternalSorter):
+            MAX_FAN_IN = 3
+
+            def _next_limit(self):
+                return self.memory_limit
+
+            def _merge_runs(self, runs, key=None, reverse=False):
+                self.spilled_runs = len(runs)
+                chunks = super(CustomizedSorter, self)._merge_runs(runs, key, reverse)
+                self.merged_runs = len(chunks)
+                return chunks
+
+        l = [(random.randint(0, 100), i) for i in range(1 << 13)]
+        sorter = CustomizedSorter(1)
+        self.assertEqual(sorted(l, key=lambda x: x[0]),
+                         list(sorter.sorted(l, key=lambda x: x[0])))
+        self.assertGreater(sorter.spilled_runs, CustomizedSorter.MAX_FAN_IN)
+        self.assertLessEqual(sorter.merged_runs, CustomizedSorter.MAX_FAN_IN)
+        self.assertEqual(sorted(l, reverse=True), list(sorter.sorted(l, reverse=True)))
+
+    def test_external_sort_unconsumed(self):
+        class CustomizedSorter(ExternalSorter):
+            def _next_limit(self):
+                return self.memory_limit
+
+        def leftover_runs(sorter):
+            return sum(len(os.listdir(d)) for d in sorter.local_dirs if os.path.exists(d))
+
+        # fewer runs than MAX_FAN_IN, which are all kept open
+        l = list(range(1 << 12))
+        random.shuffle(l)
+        sorter = CustomizedSorter(1)
+        # a failed task or take() drops the sorted iterator before it is consumed
+        for n in [0, 1]:
+            before = leftover_runs(sorter)
+            items = sorter.sorted(l)
+            self.assertEqual(list(itertools.islice(items, n)), list(range(n)))
+            self.assertEqual(leftover_runs(sorter), before)
+            del items
+
+    def test_estimate_size(self):
+        self.assertGreater(shuffle._estimate_size([b"x" * 1000] * 100), 100 * 1000)
+        self.assertGreater(shuffle._estimate_size({i: str(i) for i in range(100)}),
+                           shuffle._estimate_size({}))
+        sizes = shuffle._SizeTracker(8)
+        self.assertEqual(sizes.estimate(100), 0)
+        sizes.sample([1, 2, 3])
+        self.assertGreater(sizes.estimate(100), 0)
 
     def test_external_sort_in_rdd(self):
         conf = SparkConf().set("spark.python.worker.memory", "1m")
@@ -165,6 +356,59 @@ class SorterTests(unittest.TestCase):
         self.assertEqual(sorted(l), rdd.sortBy(lambda x: x).collect())
         sc.stop()
 
+    def test_spill_metrics_of_isolated_tasks(self):
+        import threading
+        import pyspark.util
+        task_local = pyspark.util._task_local
+        try:
+            pyspark.util._isolate_tasks()
+            spilled = {}
+
+            def task(i):
+                list(ExternalSorter(1).sorted(range(1 << 12) if i == 0 else range(10)))
+                metrics = shuffle.spill_metrics.get()
+                spilled[i] = (metrics.memory_bytes, metrics.disk_bytes)
+
+            threads = [threading.Thread(target=task, args=(i,)) for i in range(4)]
+            with mock.patch.object(shuffle, "_memory_budget", return_value=1 << 12):
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+            self.assertGreater(spilled[0][1], 0)
+            self.assertEqual([spilled[i] for i in range(1, 4)], [(0, 0)] * 3)
+        finally:
+            pyspark.util._task_local = task_local
+
+    def test_spill_metrics_in_daemon_threads(self):
+        import time
+
+        def sort_first(i, iterator):
+            if i == 0:
+                return ExternalSorter(1).sorted(range(1 << 16), reverse=True)
+            # the other tasks report their metrics after the first one spilled
+            time.sleep(2)
+            return iterator
+
+        conf = SparkConf().set("spark.python.daemon.threads", "4")
+        sc = SparkContext("local[4]", "SpillMetrics", conf=conf)
+        try:
+            rdd = sc.parallelize(range(4), 4).mapPartitionsWithIndex(sort_first)
+            self.assertEqual(rdd.count(), (1 << 16) + 3)
+            jsc = sc._jsc.sc()
+            jsc.listenerBus().waitUntilEmpty(10000)
+            stage = jsc.statusStore().stageList(None).apply(0)
+            tasks = jsc.statusStore().taskList(stage.stageId(), stage.attemptId(), 4)
+            spilled = {}
+            for j in range(tasks.size()):
+                task = tasks.apply(j)
+                metrics = task.taskMetrics().get()
+                spilled[task.index()] = (metrics.memoryBytesSpilled(), metrics.diskBytesSpilled())
+            self.assertGreater(spilled[0][1], 0)
+            self.assertEqual([spilled[i] for i in range(1, 4)], [(0, 0)] * 3)
+        finally:
+            sc.stop()
+
 
 if __name__ == "__main__":
     from pyspark.tests.test_shuffle import *  # noqa: F401
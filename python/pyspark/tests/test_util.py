@@ -73,6 +73,60 @@ class UtilTests(PySparkTestCase):
         self.assertRaises(ValueError, lambda: VersionUtils.majorMinorVersion("abced"))
 
 
+class TaskLocalTests(unittest.TestCase):
+    def setUp(self):
+        import pyspark.util
+        self.task_local = pyspark.util._task_local
+
+    def tearDown(self):
+        import pyspark.util
+        pyspark.util._task_local = self.task_local
+
+    def run_tasks(self, data):
+        import threading
+        from pyspark.taskcontext import TaskContext
+
+        results = {}
+
+        def task(i):
+            data[i] = i
+            TaskContext._getOrCreate()._partitionId = i
+            results[i] = (dict(data), TaskContext.get().partitionId())
+            TaskContext._setTaskContext(None)
+            data.clear()
+
+        threads = [threading.Thread(target=task, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_shared_by_default(self):
+        import threading
+        from pyspark.util import TaskLocalDict
+        data = TaskLocalDict()
+        data["a"] = 1
+        threads_data = []
+        t = threading.Thread(target=lambda: threads_data.append(dict(data)))
+        t.start()
+        t.join()
+        self.assertEqual(threads_data, [{"a": 1}])
+
+    def test_isolated_tasks(self):
+        from pyspark.util import TaskLocalDict, _isolate_tasks, _reset_task_local
+        data = TaskLocalDict()
+        _isolate_tasks()
+        results = self.run_tasks(data)
+        self.assertEqual(results, {i: ({i: i}, i) for i in range(4)})
+
+        data["a"] = 1
+        self.assertEqual(data.swap({"b": 2}), {"a": 1})
+        self.assertEqual(dict(data), {"b": 2})
+        _reset_task_local()
+        self.assertEqual(len(data), 0)
+
+
 if __name__ == "__main__":
     from pyspark.tests.test_util import *  # noqa: F401
 
@@ -178,6 +178,168 @@ class WorkerReuseTest(PySparkTestCase):
             self.assertTrue(pid in previous_pids)
 
 
+class CommandCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        from pyspark.accumulators import _accumulatorRegistry
+        _accumulatorRegistry.clear()
+
+    tearDown = setUp
+
+    def test_cache_hit_and_eviction(self):
+        from pyspark.serializers import CloudPickleSerializer
+        from pyspark.worker import CommandCache
+
+        ser = CloudPickleSerializer()
+        cache = CommandCache(2)
+        data = [ser.dumps((len, [i])) for i in range(3)]
+        first = cache.load(ser, data[0])
+        self.assertIs(cache.load(ser, data[0]), first)
+        self.assertEqual(first, (len, [0]))
+        cache.load(ser, data[1])
+        cache.load(ser, data[2])
+        # the least recently used command was evicted
+        self.assertIsNot(cache.load(ser, data[0]), first)
+
+    def test_disabled(self):
+        from pyspark.serializers import CloudPickleSerializer
+        from pyspark.worker import CommandCache
+
+        ser = CloudPickleSerializer()
+        data = ser.dumps([1, 2])
+        cache = CommandCache(0)
+        self.assertIsNot(cache.load(ser, data), cache.load(ser, data))
+
+    def test_accumulators_registered_again(self):
+        from pyspark.accumulators import Accumulator, INT_ACCUMULATOR_PARAM, \
+            _accumulatorRegistry
+        from pyspark.serializers import CloudPickleSerializer
+        from pyspark.worker import CommandCache
+
+        ser = CloudPickleSerializer()
+        data = ser.dumps(Accumulator(42, 10, INT_ACCUMULATOR_PARAM))
+        _accumulatorRegistry.clear()
+        cache = CommandCache(1)
+
+        accum = cache.load(ser, data)
+        self.assertIs(_accumulatorRegistry[42], accum)
+        accum += 5
+        _accumulatorRegistry.clear()
+
+        self.assertIs(cache.load(ser, data), accum)
+        self.assertIs(_accumulatorRegistry[42], accum)
+        self.assertEqual(accum._value, 0)
+
+    def test_accumulator_shared_by_commands(self):
+        from pyspark.accumulators import Accumulator, INT_ACCUMULATOR_PARAM, \
+            _accumulatorRegistry
+        from pyspark.serializers import CloudPickleSerializer
+        from pyspark.worker import CommandCache
+
+        ser = CloudPickleSerializer()
+        accum = Accumulator(7, 0, INT_ACCUMULATOR_PARAM)
+        first, second = ser.dumps((1, accum)), ser.dumps((2, accum))
+        _accumulatorRegistry.clear()
+        cache = CommandCache(2)
+
+        loaded = cache.load(ser, first)[1]
+        self.assertIs(cache.load(ser, second)[1], loaded)
+        loaded += 3
+        _accumulatorRegistry.clear()
+
+        # the next task only runs the second command
+        self.assertIs(cache.load(ser, second)[1], loaded)
+        self.assertIs(_accumulatorRegistry[7], loaded)
+        self.assertEqual(loaded._value, 0)
+
+
+class WorkerMetricsTests(unittest.TestCase):
+
+    def test_metrics(self):
+        import io
+        from pyspark.serializers import BatchedSerializer, PickleSerializer, read_long
+        from pyspark.worker import MeteredReader, MeteredWriter, WorkerMetrics
+
+        ser = BatchedSerializer(PickleSerializer(), 10)
+        infile = io.BytesIO()
+        ser.dump_stream(range(100), infile)
+        size_in = infile.tell()
+        infile.seek(0)
+        outfile = io.BytesIO()
+
+        metrics = WorkerMetrics()
+        iterator = metrics.timed_input(ser.load_stream(MeteredReader(infile, metrics)))
+        out_iter = metrics.timed_output(x for x in iterator if x % 2)
+        ser.dump_stream(out_iter, MeteredWriter(outfile, metrics))
+        self.assertEqual(metrics.records_in, 100)
+        self.assertEqual(metrics.records_out, 50)
+        self.assertEqual(metrics.bytes_in, size_in)
+        self.assertEqual(metrics.bytes_out, outfile.tell())
+        self.assertLessEqual(metrics.read_time, metrics.input_time)
+        self.assertLessEqual(metrics.input_time, metrics.output_time)
+
+        report = io.BytesIO()
+        metrics.report(report)
+        report.seek(0)
+        values = [read_long(report) for _ in range(9)]
+        self.assertTrue(all(v >= 0 for v in values[:5]))
+        self.assertEqual(values[5:], [size_in, outfile.tell(), 100, 50])
+
+
+class WorkerMetricsEndToEndTests(unittest.TestCase):
+
+    def setUp(self):
+        class_name = self.__class__.__name__
+        conf = SparkConf().set("spark.python.worker.metrics.enabled", "true")
+        self.sc = SparkContext('local[4]', class_name, conf=conf)
+
+    def tearDown(self):
+        self.sc.stop()
+
+    def stage_accumulators(self):
+        jsc = self.sc._jsc.sc()
+        jsc.listenerBus().waitUntilEmpty(10000)
+        values = {}
+        for stage in jsc.statusStore().stageList(None):
+            updates = stage.accumulatorUpdates()
+            for i in range(updates.size()):
+                info = updates.apply(i)
+                values[info.name()] = values.get(info.name(), 0) + int(info.value())
+        return values
+
+    def test_rdd_metrics(self):
+        self.assertEqual(self.sc.parallelize(range(100), 2).map(lambda x: x * 2).count(), 100)
+        values = self.stage_accumulators()
+        self.assertEqual(values["records read by Python workers"], 100)
+        self.assertEqual(values["records written by Python workers"], 2)
+        self.assertGreater(values["bytes read by Python workers"], 0)
+        self.assertGreater(values["bytes written by Python workers"], 0)
+        self.assertIn("time in Python functions", values)
+        # each task writes its count in one automatically batched frame
+        self.assertEqual(values["auto-batched frames written by Python workers"], 2)
+        self.assertEqual(values["records in auto-batched frames written by Python workers"], 2)
+        self.assertGreater(values["bytes in auto-batched frames written by Python workers"], 0)
+
+    def test_sql_metrics(self):
+        from pyspark.sql import SparkSession
+        from pyspark.sql.functions import udf
+
+        spark = SparkSession(self.sc)
+        spark.conf.set("spark.sql.adaptive.enabled", "false")
+        plus_one = udf(lambda x: x + 1, "long")
+        df = spark.range(0, 100, 1, 2).select(plus_one("id"))
+        self.assertEqual(len(df.collect()), 100)
+
+        plan = df._jdf.queryExecution().executedPlan()
+        while plan.nodeName() != "BatchEvalPython":
+            plan = plan.children().apply(0)
+        metrics = plan.metrics()
+        self.assertEqual(metrics.apply("pythonRecordsIn").value(), 100)
+        self.assertEqual(metrics.apply("pythonRecordsOut").value(), 100)
+        self.assertGreater(metrics.apply("pythonBytesIn").value(), 0)
+        self.assertGreater(metrics.apply("pythonBytesOut").value(), 0)
+
+
 @unittest.skipIf(
     not has_resource_module,
     "Memory limit feature in Python worker is dependent on "
@@ -16,6 +16,7 @@
 # limitations under the License.
 #
 
+import collections.abc
 import functools
 import itertools
 import os
@@ -262,6 +263,28 @@ def _parse_memory(s):
     return int(float(s[:-1]) * units[s[-1].lower()])
 
 
+def _parse_bytes(s):
+    """
+    Parse a size string in the format supported by Java (e.g. 64k, 1m), where a plain number
+    is in bytes, and return the value in bytes
+
+    Examples
+    --------
+    >>> _parse_bytes("65536")
+    65536
+    >>> _parse_bytes("64k")
+    65536
+    >>> _parse_bytes("1mb")
+    1048576
+    """
+    units = {'b': 0, 'k': 10, 'm': 20, 'g': 30, 't': 40, 'p': 50}
+    match = re.match(r"^\s*(\d+)\s*([bkmgtp]?)b?\s*$", str(s).lower())
+    if match is None:
+        raise ValueError("invalid format: " + str(s))
+    number, unit = match.groups()
+    return int(number) << units.get(unit or 'b')
+
+
 def inheritable_thread_target(f):
     """
     Return thread target wrapper which is recommended to be used in PySpark when the
@@ -392,6 +415,96 @@ class InheritableThread(threading.Thread):
                 thread_connection.close()
 
 
+# Storage of the per-task state of a Python worker which runs tasks in concurrent threads, see
+# `_isolate_tasks`. None while each worker process runs one task at a time.
+_task_local = None
+
+
+def _isolate_tasks():
+    """
+    Keep the per-task state, e.g. the task context, accumulators and broadcast variables, apart
+    for each thread from now on, so that threads of this process can run tasks concurrently.
+    """
+    global _task_local
+    if _task_local is None:
+        _task_local = threading.local()
+
+
+def _reset_task_local():
+    """
+    Forget the per-task state of the current thread, when it starts serving a new connection.
+    """
+    if _task_local is not None:
+        _task_local.__dict__.clear()
+
+
+class TaskLocal(object):
+    """
+    Per-task state of a Python worker, created by `factory`. It is shared by the whole process,
+    which runs one task at a time, unless the worker runs tasks in concurrent threads, see
+    `_isolate_tasks`. Then each thread has its own.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._shared = factory()
+
+    def get(self):
+        if _task_local is None:
+            return self._shared
+        values = _task_local.__dict__
+        if self not in values:
+            values[self] = self._factory()
+        return values[self]
+
+    def set(self, value):
+        if _task_local is None:
+            self._shared = value
+        else:
+            _task_local.__dict__[self] = value
+
+
+class TaskLocalDict(collections.abc.MutableMapping):
+    """
+    Dict of per-task state of a Python worker, see :class:`TaskLocal`.
+    """
+
+    def __init__(self):
+        self._local = TaskLocal(dict)
+
+    def swap(self, data):
+        """
+        Use the dict `data` for the current task, and return the one used before.
+        """
+        previous = self._local.get()
+        self._local.set(data)
+        return previous
+
+    def __getitem__(self, key):
+        return self._local.get()[key]
+
+    def __setitem__(self, key, value):
+        self._local.get()[key] = value
+
+    def __delitem__(self, key):
+        del self._local.get()[key]
+
+    def __contains__(self, key):
+        return key in self._local.get()
+
+    def __iter__(self):
+        return iter(self._local.get())
+
+    def __len__(self):
+        return len(self._local.get())
+
+    def clear(self):
+        self._local.get().clear()
+
+    def __repr__(self):
+        return repr(self._local.get())
+
+
 if __name__ == "__main__":
     if "pypy" not in platform.python_implementation().lower() and sys.version_info[:2] >= (3, 7):
         import doctest
@@ -17,7 +17,7 @@
 # under the License.
 
 import threading
-from typing import Callable
+from typing import Any, Callable, Dict, Iterator, MutableMapping
 
 class VersionUtils(object):
     @staticmethod
@@ -27,3 +27,17 @@ def inheritable_thread_target(f: Callable) -> Callable: ...
 
 class InheritableThread(threading.Thread):
     pass
+
+class TaskLocal:
+    def __init__(self, factory: Callable[[], Any]) -> None: ...
+    def get(self) -> Any: ...
+    def set(self, value: Any) -> None: ...
+
+class TaskLocalDict(MutableMapping[Any, Any]):
+    def __init__(self) -> None: ...
+    def swap(self, data: Dict[Any, Any]) -> Dict[Any, Any]: ...
+    def __getitem__(self, key: Any) -> Any: ...
+    def __setitem__(self, key: Any, value: Any) -> None: ...
+    def __delitem__(self, key: Any) -> None: ...
+    def __iter__(self) -> Iterator[Any]: ...
+    def __len__(self) -> int: ...
@@ -18,11 +18,15 @@
 """
 Worker that receives input from Piped RDD.
 """
+import collections
+import copy
+import hashlib
 import os
 import sys
 import time
 from inspect import currentframe, getframeinfo, getfullargspec
 import importlib
+import itertools
 # 'resource' is a Unix specific module.
 has_resource_module = True
 try:
@@ -41,11 +45,12 @@ from pyspark.resource import ResourceInformation
 from pyspark.rdd import PythonEvalType
 from pyspark.serializers import write_with_length, write_int, read_long, read_bool, \
     write_long, read_int, SpecialLengths, UTF8Deserializer, PickleSerializer, \
-    BatchedSerializer
-from pyspark.sql.pandas.serializers import ArrowStreamPandasUDFSerializer, CogroupUDFSerializer
-from pyspark.sql.pandas.types import to_arrow_type
+    BatchedSerializer, NoOpSerializer, BatchingMetrics, batching_metrics
+from pyspark.sql.pandas.serializers import ArrowStreamPandasUDFSerializer, \
+    ArrowStreamUDFSerializer, CogroupUDFSerializer
+from pyspark.sql.pandas.types import to_arrow_type, _create_converter_to_arrow
 from pyspark.sql.types import StructType
-from pyspark.util import fail_on_stopiteration, try_simplify_traceback  # type: ignore
+from pyspark.util import fail_on_stopiteration, try_simplify_traceback, TaskLocal  # type: ignore
 from pyspark import shuffle
 
 pickleSer = PickleSerializer()
@@ -59,6 +64,134 @@ def report_times(outfile, boot, init, finish):
     write_long(int(1000 * finish), outfile)
 
 
+class WorkerMetrics(object):
+    """
+    Where the time of a task goes in the worker, and how many records and bytes it reads and
+    writes, measured when the JVM asks for them. Times are in seconds, see `report`.
+    """
+
+    def __init__(self):
+        self.read_time = 0
+        # Reading and deserializing the input.
+        self.input_time = 0
+        # Computing the output, which includes the input time.
+        self.output_time = 0
+        # Serializing and writing the output, which includes the output time.
+        self.dump_time = 0
+        self.write_time = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.records_in = 0
+        self.records_out = 0
+
+    def timed_input(self, iterator):
+        clock = time.perf_counter
+        iterator = iter(iterator)
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.input_time += clock() - start
+                return
+            self.input_time += clock() - start
+            self.records_in += 1
+            yield item
+
+    def timed_output(self, iterator):
+        clock = time.perf_counter
+        iterator = iter(iterator)
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.output_time += clock() - start
+                return
+            self.output_time += clock() - start
+            self.records_out += 1
+            yield item
+
+    def report(self, outfile):
+        """
+        Writes the times, in milliseconds, of reading, deserializing, the function, serializing
+        and writing, then the bytes and records in and out, as PythonWorkerMetrics expects them.
+        """
+        times = (
+            self.read_time,
+            self.input_time - self.read_time,
+            self.output_time - self.input_time,
+            self.dump_time - self.output_time - self.write_time,
+            self.write_time)
+        for value in times:
+            write_long(int(1000 * max(value, 0)), outfile)
+        for value in (self.bytes_in, self.bytes_out, self.records_in, self.records_out):
+            write_long(value, outfile)
+
+
+class MeteredReader(object):
+    """
+    Input stream of a worker which adds the time blocked in it and the bytes read from it to
+    `metrics`.
+    """
+
+    def __init__(self, stream, metrics):
+        self._stream = stream
+        self._metrics = metrics
+        if hasattr(stream, "read_frame"):
+            self.read_frame = self._read_frame
+
+    def read(self, *args):
+        start = time.perf_counter()
+        data = self._stream.read(*args)
+        self._metrics.read_time += time.perf_counter() - start
+        self._metrics.bytes_in += len(data)
+        return data
+
+    def readinto(self, b):
+        start = time.perf_counter()
+        n = self._stream.readinto(b)
+        self._metrics.read_time += time.perf_counter() - start
+        self._metrics.bytes_in += n or 0
+        return n
+
+    def _read_frame(self, length):
+        start = time.perf_counter()
+        frame = self._stream.read_frame(length)
+        self._metrics.read_time += time.perf_counter() - start
+        self._metrics.bytes_in += length
+        return frame
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class MeteredWriter(object):
+    """
+    Output stream of a worker which adds the time blocked in it and the bytes written to it to
+    `metrics`.
+    """
+
+    def __init__(self, stream, metrics):
+        self._stream = stream
+        self._metrics = metrics
+
+    def write(self, b):
+        start = time.perf_counter()
+        n = self._stream.write(b)
+        self._metrics.write_time += time.perf_counter() - start
+        self._metrics.bytes_out += memoryview(b).nbytes
+        return n
+
+    def flush(self):
+        start = time.perf_counter()
+        self._stream.flush()
+        self._metrics.write_time += time.perf_counter() - start
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
 def add_path(path):
     # worker can be used, so do not add path multiple times
     if path not in sys.path:
@@ -66,13 +199,88 @@ def add_path(path):
         sys.path.insert(1, path)
 
 
-def read_command(serializer, file):
-    command = serializer._read_with_length(file)
+def load_command(serializer, data):
+    command = serializer.loads(data)
     if isinstance(command, Broadcast):
         command = serializer.loads(command.value)
     return command
 
 
+class _RecordingRegistry(dict):
+    """
+    Copy of the accumulator registry which records the ids of the accumulators that are looked
+    up or registered.
+    """
+
+    def __init__(self, registry):
+        dict.__init__(self, registry)
+        self.used = set()
+
+    def __getitem__(self, aid):
+        self.used.add(aid)
+        return dict.__getitem__(self, aid)
+
+    def __setitem__(self, aid, accum):
+        self.used.add(aid)
+        dict.__setitem__(self, aid, accum)
+
+
+class CommandCache(object):
+    """
+    LRU cache of the deserialized commands and UDFs of a reused worker, keyed by the digest of
+    their pickled bytes, so that a repeated command is not unpickled for every task.
+
+    Accumulators created while deserializing a command are registered again, reset to their
+    zero values, whenever the command is taken from the cache. As they are updated by the task,
+    a worker which runs tasks in concurrent threads keeps one cache per thread.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._local_entries = TaskLocal(collections.OrderedDict)
+
+    def load(self, serializer, data):
+        if self.capacity <= 0:
+            return load_command(serializer, data)
+
+        # A command sent as a broadcast variable is keyed by the pickled reference to it, as
+        # the content of a broadcast variable never changes.
+        key = hashlib.sha1(data).digest()
+        entries = self._local_entries.get()
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+            command, accumulators = entry
+            for aid, accum, zero_value in accumulators:
+                accum._value = copy.deepcopy(zero_value)
+                _accumulatorRegistry[aid] = accum
+            return command
+
+        # Record every accumulator the command refers to, including the ones already
+        # registered by other commands of this task, which unpickling returns as they are.
+        registry = _RecordingRegistry(_accumulatorRegistry)
+        previous = _accumulatorRegistry.swap(registry)
+        try:
+            command = load_command(serializer, data)
+        finally:
+            _accumulatorRegistry.swap(previous)
+        _accumulatorRegistry.update(registry)
+        accumulators = [(aid, _accumulatorRegistry[aid],
+                         copy.deepcopy(_accumulatorRegistry[aid]._value))
+                        for aid in registry.used]
+        entries[key] = (command, accumulators)
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+        return command
+
+
+command_cache = CommandCache(int(os.environ.get("PYSPARK_COMMAND_CACHE_SIZE", "0")))
+
+
+def read_command(serializer, file):
+    return command_cache.load(serializer, NoOpSerializer()._read_with_length(file))
+
+
 def chain(f, g):
     """chain two functions together """
     return lambda *a: g(f(*a))
@@ -86,6 +294,17 @@ def wrap_udf(f, return_type):
         return lambda *a: f(*a)
 
 
+def wrap_arrow_batch_udf(f, return_type):
+    arrow_return_type = to_arrow_type(return_type)
+    convert = _create_converter_to_arrow(return_type)
+
+    def evaluate(num_rows, *columns):
+        rows = zip(*columns) if columns else itertools.repeat((), num_rows)
+        return [convert(f(*row)) for row in rows]
+
+    return lambda num_rows, *a: (evaluate(num_rows, *a), arrow_return_type)
+
+
 def wrap_scalar_pandas_udf(f, return_type):
     arrow_return_type = to_arrow_type(return_type)
 
@@ -279,6 +498,8 @@ def read_single_udf(pickleSer, infile, eval_type, runner_conf, udf_index):
         return arg_offsets, wrap_window_agg_pandas_udf(func, return_type, runner_conf, udf_index)
     elif eval_type == PythonEvalType.SQL_BATCHED_UDF:
         return arg_offsets, wrap_udf(func, return_type)
+    elif eval_type == PythonEvalType.SQL_ARROW_BATCHED_UDF:
+        return arg_offsets, wrap_arrow_batch_udf(func, return_type)
     else:
         raise ValueError("Unknown eval type: {}".format(eval_type))
 
@@ -286,7 +507,8 @@ def read_single_udf(pickleSer, infile, eval_type, runner_conf, udf_index):
 def read_udfs(pickleSer, infile, eval_type):
     runner_conf = {}
 
-    if eval_type in (PythonEvalType.SQL_SCALAR_PANDAS_UDF,
+    if eval_type in (PythonEvalType.SQL_ARROW_BATCHED_UDF,
+                     PythonEvalType.SQL_SCALAR_PANDAS_UDF,
                      PythonEvalType.SQL_COGROUPED_MAP_PANDAS_UDF,
                      PythonEvalType.SQL_SCALAR_PANDAS_ITER_UDF,
                      PythonEvalType.SQL_MAP_PANDAS_ITER_UDF,
@@ -310,7 +532,9 @@ def read_udfs(pickleSer, infile, eval_type):
             "spark.sql.legacy.execution.pandas.groupedMap.assignColumnsByName", "true")\
             .lower() == "true"
 
-        if eval_type == PythonEvalType.SQL_COGROUPED_MAP_PANDAS_UDF:
+        if eval_type == PythonEvalType.SQL_ARROW_BATCHED_UDF:
+            ser = ArrowStreamUDFSerializer()
+        elif eval_type == PythonEvalType.SQL_COGROUPED_MAP_PANDAS_UDF:
             ser = CogroupUDFSerializer(timezone, safecheck, assign_cols_by_name)
         else:
             # Scalar Pandas UDF handles struct type arguments as pandas DataFrames instead of
@@ -442,6 +666,16 @@ def read_udfs(pickleSer, infile, eval_type):
             df2_keys = [a[1][o] for o in parsed_offsets[1][0]]
             df2_vals = [a[1][o] for o in parsed_offsets[1][1]]
             return f(df1_keys, df1_vals, df2_keys, df2_vals)
+    elif eval_type == PythonEvalType.SQL_ARROW_BATCHED_UDF:
+        udfs = []
+        for i in range(num_udfs):
+            udfs.append(read_single_udf(pickleSer, infile, eval_type, runner_conf, udf_index=i))
+
+        # Each input is (num_rows, columns) and each output is a list of (values, arrow_type),
+        # one per UDF, that ArrowStreamUDFSerializer writes as a single record batch.
+        def mapper(a):
+            num_rows, columns = a
+            return [f(num_rows, *[columns[o] for o in arg_offsets]) for (arg_offsets, f) in udfs]
     else:
         udfs = []
         for i in range(num_udfs):
@@ -541,8 +775,8 @@ def main(infile, outfile):
             v = utf8_deserializer.loads(infile)
             taskContext._localProperties[k] = v
 
-        shuffle.MemoryBytesSpilled = 0
-        shuffle.DiskBytesSpilled = 0
+        shuffle.spill_metrics.set(shuffle.SpillMetrics())
+        batching_metrics.set(BatchingMetrics())
         _accumulatorRegistry.clear()
 
         # fetch name of workdir
@@ -589,6 +823,7 @@ def main(infile, outfile):
             broadcast_sock_file.close()
 
         _accumulatorRegistry.clear()
+        metrics = WorkerMetrics() if read_bool(infile) else None
         eval_type = read_int(infile)
         if eval_type == PythonEvalType.NON_UDF:
             func, profiler, deserializer, serializer = read_command(pickleSer, infile)
@@ -598,11 +833,25 @@ def main(infile, outfile):
         init_time = time.time()
 
         def process():
-            iterator = deserializer.load_stream(infile)
+            if metrics is None:
+                iterator = deserializer.load_stream(infile)
+                out_iter = func(split_index, iterator)
+                try:
+                    serializer.dump_stream(out_iter, outfile)
+                finally:
+                    if hasattr(out_iter, 'close'):
+                        out_iter.close()
+                return
+
+            iterator = metrics.timed_input(
+                deserializer.load_stream(MeteredReader(infile, metrics)))
             out_iter = func(split_index, iterator)
+            start = time.perf_counter()
             try:
-                serializer.dump_stream(out_iter, outfile)
+                serializer.dump_stream(
+                    metrics.timed_output(out_iter), MeteredWriter(outfile, metrics))
             finally:
+                metrics.dump_time += time.perf_counter() - start
                 if hasattr(out_iter, 'close'):
                     out_iter.close()
 
@@ -638,8 +887,13 @@ def main(infile, outfile):
         sys.exit(-1)
     finish_time = time.time()
     report_times(outfile, boot_time, init_time, finish_time)
-    write_long(shuffle.MemoryBytesSpilled, outfile)
-    write_long(shuffle.DiskBytesSpilled, outfile)
+    spilled, batches = shuffle.spill_metrics.get(), batching_metrics.get()
+    write_long(spilled.memory_bytes, outfile)
+    write_long(spilled.disk_bytes, outfile)
+    for value in (batches.frames, batches.items, batches.bytes,
+                  batches.min_batch_size, batches.max_batch_size):
+        write_long(value, outfile)
+    (metrics or WorkerMetrics()).report(outfile)
 
     # Mark the beginning of the accumulators section of the output
     write_int(SpecialLengths.END_OF_DATA_SECTION, outfile)
@@ -2184,6 +2184,18 @@ object SQLConf {
       .booleanConf
       .createWithDefault(false)
 
+  val ARROW_PYSPARK_COLLECT_ENABLED =
+    buildConf("spark.sql.execution.arrow.pyspark.collect.enabled")
+      .doc("When true, make use of Apache Arrow to transfer the rows of " +
+        "pyspark.sql.DataFrame.collect, take and head to Python, which builds the Rows from " +
+        "the columns of Arrow record batches instead of unpickling them one by one. " +
+        "This applies when 'spark.sql.execution.arrow.pyspark.enabled' is set, and falls " +
+        "back to pickled rows for unsupported types as " +
+        "'spark.sql.execution.arrow.pyspark.fallback.enabled' allows.")
+      .version("3.2.0")
+      .booleanConf
+      .createWithDefault(false)
+
   val PYSPARK_JVM_STACKTRACE_ENABLED =
     buildConf("spark.sql.pyspark.jvmStacktrace.enabled")
       .doc("When true, it shows the JVM stacktrace in the user-facing PySpark exception " +
@@ -2222,6 +2234,17 @@ object SQLConf {
       .version("3.0.0")
       .fallbackConf(ARROW_FALLBACK_ENABLED)
 
+  val PYTHON_UDF_ARROW_ENABLED =
+    buildConf("spark.sql.execution.pythonUDF.arrow.enabled")
+      .doc("When true, regular Python UDFs created without an explicit 'useArrow' argument " +
+        "exchange their input and output with the Python worker as Arrow record batches " +
+        "instead of pickled rows. The user function is still called once per row. UDFs whose " +
+        "input or output types are not supported by Arrow, e.g. user-defined types, still use " +
+        "pickled rows. Requires PyArrow in the driver and the executors.")
+      .version("3.2.0")
+      .booleanConf
+      .createWithDefault(false)
+
   val ARROW_EXECUTION_MAX_RECORDS_PER_BATCH =
     buildConf("spark.sql.execution.arrow.maxRecordsPerBatch")
       .doc("When using Apache Arrow, limit the maximum number of records that can be written " +
@@ -3824,6 +3847,8 @@ class SQLConf extends Serializable with Logging {
 
   def arrowPySparkSelfDestructEnabled: Boolean = getConf(ARROW_PYSPARK_SELF_DESTRUCT_ENABLED)
 
+  def arrowPySparkCollectEnabled: Boolean = getConf(ARROW_PYSPARK_COLLECT_ENABLED)
+
   def pysparkJVMStacktraceEnabled: Boolean = getConf(PYSPARK_JVM_STACKTRACE_ENABLED)
 
   def arrowSparkREnabled: Boolean = getConf(ARROW_SPARKR_EXECUTION_ENABLED)
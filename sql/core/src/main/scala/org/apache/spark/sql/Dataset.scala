@@ -3676,6 +3676,17 @@ class Dataset[T] private[sql](
     }
   }
 
+  /**
+   * Serve the Arrow batches of a Dataset to PySpark partition by partition, with the protocol
+   * of `toPythonIterator`. Each batch is an Arrow record batch message without the schema.
+   */
+  private[sql] def toArrowBatchIterator(prefetchPartitions: Int): Array[Any] = {
+    withNewExecutionId {
+      PythonRDD.toLocalIteratorAndServe(
+        toArrowBatchRdd(queryExecution.executedPlan), prefetchPartitions)
+    }
+  }
+
   ////////////////////////////////////////////////////////////////////////////
   // Private Helpers
   ////////////////////////////////////////////////////////////////////////////
@@ -57,7 +57,7 @@ import org.apache.spark.util.Utils
  * there should be always some rows buffered in the socket or Python process, so the pulling from
  * RowQueue ALWAYS happened after pushing into it.
  */
-trait EvalPythonExec extends UnaryExecNode {
+trait EvalPythonExec extends UnaryExecNode with PythonSQLMetrics {
   def udfs: Seq[PythonUDF]
   def resultAttrs: Seq[Attribute]
 
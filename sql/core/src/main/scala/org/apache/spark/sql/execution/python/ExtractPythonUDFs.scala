@@ -27,6 +27,7 @@ import org.apache.spark.sql.catalyst.plans.logical._
 import org.apache.spark.sql.catalyst.rules.Rule
 import org.apache.spark.sql.catalyst.trees.TreePattern._
 import org.apache.spark.sql.errors.QueryCompilationErrors
+import org.apache.spark.sql.types._
 
 
 /**
@@ -167,6 +168,32 @@ object ExtractPythonUDFs extends Rule[LogicalPlan] with PredicateHelper {
     e.find(PythonUDF.isScalarPythonUDF).isDefined
   }
 
+  /**
+   * Returns whether the inputs and the result of a row-at-a-time Python UDF can be sent through
+   * Arrow. Those which cannot, e.g. of user-defined or interval types, are evaluated with pickled
+   * rows instead.
+   */
+  private def canUseArrow(udf: PythonUDF): Boolean = {
+    def isFlat(dt: DataType): Boolean = dt match {
+      case _: StructType | TimestampType => false
+      case _ => true
+    }
+    def isSupported(dt: DataType): Boolean = dt match {
+      case BooleanType | ByteType | ShortType | IntegerType | LongType | FloatType | DoubleType |
+           _: DecimalType | StringType | BinaryType | DateType | TimestampType | NullType => true
+      case ArrayType(elementType, _) => isFlat(elementType) && isSupported(elementType)
+      case MapType(keyType, valueType, _) =>
+        isFlat(keyType) && isFlat(valueType) && isSupported(keyType) && isSupported(valueType)
+      case StructType(fields) =>
+        fields.forall(f => !f.dataType.isInstanceOf[StructType] && isSupported(f.dataType))
+      case _ => false
+    }
+    isSupported(udf.dataType) && udf.children.forall {
+      case u: PythonUDF => canUseArrow(u)
+      case e => isSupported(e.dataType)
+    }
+  }
+
   private def canEvaluateInPython(e: PythonUDF): Boolean = {
     e.children match {
       // single PythonUDF child could be chained and evaluated in Python
@@ -269,7 +296,10 @@ object ExtractPythonUDFs extends Rule[LogicalPlan] with PredicateHelper {
           val evaluation = evalType match {
             case PythonEvalType.SQL_BATCHED_UDF =>
               BatchEvalPython(validUdfs, resultAttrs, child)
-            case PythonEvalType.SQL_SCALAR_PANDAS_UDF | PythonEvalType.SQL_SCALAR_PANDAS_ITER_UDF =>
+            case PythonEvalType.SQL_ARROW_BATCHED_UDF if !validUdfs.forall(canUseArrow) =>
+              BatchEvalPython(validUdfs, resultAttrs, child)
+            case PythonEvalType.SQL_SCALAR_PANDAS_UDF | PythonEvalType.SQL_SCALAR_PANDAS_ITER_UDF
+                | PythonEvalType.SQL_ARROW_BATCHED_UDF =>
               ArrowEvalPython(validUdfs, resultAttrs, child, evalType)
             case _ =>
               throw new IllegalStateException("Unexpected UDF evalType")
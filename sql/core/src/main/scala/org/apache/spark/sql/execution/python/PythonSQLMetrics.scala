@@ -0,0 +1,56 @@
+/*
+ * Licensed to the Apache Software Foundation (ASF) under one or more
+ * contributor license agreements.  See the NOTICE file distributed with
+ * this work for additional information regarding copyright ownership.
+ * The ASF licenses this file to You under the Apache License, Version 2.0
+ * (the "License"); you may not use this file except in compliance with
+ * the License.  You may obtain a copy of the License at
+ *
+ *    http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package org.apache.spark.sql.execution.python
+
+import org.apache.spark.api.python.PythonWorkerMetrics
+import org.apache.spark.internal.config.Python.PYTHON_WORKER_METRICS_ENABLED
+import org.apache.spark.sql.execution.SparkPlan
+import org.apache.spark.sql.execution.metric.{SQLMetric, SQLMetrics}
+
+/**
+ * A physical plan which runs Python functions, with the metrics its Python workers measure
+ * if enabled by `spark.python.worker.metrics.enabled`, see [[PythonWorkerMetrics]]. They are
+ * passed to the Python runners.
+ */
+trait PythonSQLMetrics extends SparkPlan {
+
+  lazy val pythonMetrics: Map[String, SQLMetric] = {
+    if (sparkContext.conf.get(PYTHON_WORKER_METRICS_ENABLED)) {
+      PythonWorkerMetrics.descriptions.map { case (name, description) =>
+        val metric = if (name.endsWith("Time")) {
+          SQLMetrics.createTimingMetric(sparkContext, description)
+        } else if (name.startsWith("pythonBytes")) {
+          SQLMetrics.createSizeMetric(sparkContext, description)
+        } else {
+          SQLMetrics.createMetric(sparkContext, description)
+        }
+        name -> metric
+      }.toMap
+    } else {
+      Map.empty
+    }
+  }
+
+  override lazy val metrics: Map[String, SQLMetric] = pythonMetrics
+
+  override protected def doPrepare(): Unit = {
+    super.doPrepare()
+    // Register the accumulators on the driver, before the plan is shipped to the executors.
+    pythonMetrics
+  }
+}